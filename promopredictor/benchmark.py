@@ -0,0 +1,281 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DATA_DIR = Path(__file__).parent / "data"
+BENCH_DIR = BASE_DATA_DIR / "benchmarks"
+BENCH_DB_PATH = BENCH_DIR / "synthetic.db"
+RESULTS_PATH = BENCH_DIR / "benchmark_results.jsonl"
+
+# O banco local precisa estar configurado antes de importar os módulos que instanciam
+# o DatabaseManager global (src.services.database), para nunca tocar o MariaDB de produção.
+os.environ['DB_URL'] = f"sqlite:///{BENCH_DB_PATH}"
+
+from src.services.database import db_manager
+from src.data_processing.synthetic_data import write_synthetic_database
+from src.data_processing.process_raw_data import extract_raw_data
+from src.data_processing.clean_data import clean_data, parse_sale_datetimes
+from src.data_processing.price_data_pipeline import aggregate_daily, add_holiday_features
+from src.data_processing.feature_engineering import add_lag_features, add_rolling_features
+from src.data_processing.unified_pipeline import build_datasets
+from src.data_processing import polars_engine
+from src.utils.utils import insert_predictions, sync_predictions
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+
+def measure(results, scale, stage, func, *args, rows_in=0, track_memory=True):
+    """
+    Executa uma etapa, acumulando tempo, pico de memória e linhas processadas em `results`.
+
+    Args:
+        results (dict): Acumulador indexado por etapa.
+        scale (int): Escala (linhas sintéticas) da rodada.
+        stage (str): Nome da etapa.
+        func (callable): Função da etapa.
+        rows_in (int): Linhas de entrada.
+        track_memory (bool): Mede o pico de memória via tracemalloc.
+
+    Returns:
+        Any: Retorno de `func`.
+    """
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    output = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if track_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    entry = results.setdefault(stage, {
+        'scale': scale, 'stage': stage, 'seconds': 0.0, 'rows_in': 0, 'rows_out': 0, 'peak_mb': 0.0
+    })
+    entry['seconds'] += elapsed
+    entry['rows_in'] += rows_in
+    entry['rows_out'] += len(output) if hasattr(output, '__len__') else 0
+    entry['peak_mb'] = max(entry['peak_mb'], peak / (1024 * 1024))
+    return output
+
+def load_prediction_model(produto_id, n_features):
+    """
+    Carrega o modelo exportado do produto, ou uma rede densa de tamanho comparável se ele não existir.
+    """
+    import tensorflow as tf
+    from src.models.predict_model_unit_price import MODEL_BASE_DIR
+
+    model_path = MODEL_BASE_DIR / f"produto_{produto_id}_unit_price_model" / f"produto_{produto_id}_unit_price_model.keras"
+    if model_path.exists():
+        return tf.keras.models.load_model(model_path)
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(n_features,)),
+        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dense(32, activation='relu'),
+        tf.keras.layers.Dense(1),
+    ])
+    model.compile(optimizer='adam', loss='mse')
+    return model
+
+def compare_engines(results, scale, produto, df_raw, track_memory=True, granularities=('sale', 'day', 'hour')):
+    """
+    Mede o pré-processamento unificado nos motores pandas e Polars (a partir do mesmo CSV bruto)
+    e verifica se as saídas são iguais.
+
+    O tracemalloc não enxerga a memória alocada pelo Polars (fora do Python); compare apenas o tempo.
+
+    Returns:
+        list: Descrição das divergências encontradas (vazia se os motores concordam).
+    """
+    raw_path = BENCH_DIR / f"raw_produto_{produto}.csv"
+    df_raw.to_csv(raw_path, index=False)
+    mismatches = []
+    try:
+        for granularity in granularities:
+            expected = measure(results, scale, f'preprocess_pandas_{granularity}',
+                               lambda path: build_datasets(pd.read_csv(path), granularity), raw_path,
+                               rows_in=len(df_raw), track_memory=track_memory)
+            actual = measure(results, scale, f'preprocess_polars_{granularity}',
+                             lambda path: polars_engine.build_datasets(path, granularity), raw_path,
+                             rows_in=len(df_raw), track_memory=False)
+            for name, left, right in zip(['quantidade', 'preço'], expected, actual):
+                try:
+                    pd.testing.assert_frame_equal(
+                        left.reset_index(drop=True), right.reset_index(drop=True),
+                        check_dtype=False, check_exact=False, rtol=1e-9
+                    )
+                except AssertionError as e:
+                    mismatches.append(f"produto {produto}, {granularity}, dataset de {name}: {e}")
+    finally:
+        raw_path.unlink(missing_ok=True)
+    return mismatches
+
+def run_scale(scale, n_products, seed=42, track_memory=True, with_prediction=True, engines=False):
+    """
+    Gera o banco sintético na escala informada e mede cada etapa do pipeline para todos os produtos.
+
+    Com `engines=True`, mede também o pré-processamento nos motores pandas e Polars e verifica a
+    equivalência das saídas; as divergências ficam em `mismatches` na etapa 'engine_equivalence'.
+
+    Returns:
+        list: Um dicionário de métricas por etapa.
+    """
+    logger.info(f"Benchmark: gerando {scale} linhas para {n_products} produtos.")
+    produtos = write_synthetic_database(db_manager, n_products=n_products, n_rows=scale, seed=seed)
+    results = {}
+
+    for produto in produtos:
+        df_raw = measure(results, scale, 'extract_raw_data', extract_raw_data, db_manager, produto,
+                         track_memory=track_memory)
+        if df_raw.empty:
+            continue
+
+        measure(results, scale, 'clean_data', clean_data, df_raw.copy(),
+                rows_in=len(df_raw), track_memory=track_memory)
+
+        if engines:
+            mismatches = compare_engines(results, scale, produto, df_raw, track_memory)
+            entry = results.setdefault('engine_equivalence', {
+                'scale': scale, 'stage': 'engine_equivalence', 'seconds': 0.0, 'rows_in': 0, 'rows_out': 0,
+                'peak_mb': 0.0, 'mismatches': [],
+            })
+            entry['mismatches'].extend(mismatches)
+
+        df_base = parse_sale_datetimes(df_raw.copy())
+        df_daily = measure(results, scale, 'aggregate_daily', aggregate_daily, df_base,
+                           rows_in=len(df_base), track_memory=track_memory)
+
+        df_daily['Dia'] = df_daily['Data'].dt.day
+        df_daily['Mes'] = df_daily['Data'].dt.month
+        df_daily['DiaDaSemana'] = df_daily['Data'].dt.dayofweek
+        df_daily = measure(results, scale, 'add_holiday_features', add_holiday_features, df_daily,
+                           rows_in=len(df_daily), track_memory=track_memory)
+
+        def build_features(df):
+            df = add_lag_features(df)
+            df = add_rolling_features(df, ['ValorUnitarioMedio', 'QuantidadeLiquida'], 7)
+            return df.dropna(subset=['ValorUnitario_lag3'])
+
+        df_feats = measure(results, scale, 'feature_building', build_features, df_daily,
+                           rows_in=len(df_daily), track_memory=track_memory)
+
+        predicted = np.zeros(len(df_feats))
+        if with_prediction and not df_feats.empty:
+            from src.models.predict_model_unit_price import prepare_features
+            X = prepare_features(df_feats)
+            model = load_prediction_model(produto, X.shape[1])
+            predicted = measure(results, scale, 'prediction', lambda x: model.predict(x, verbose=0).flatten(), X,
+                                rows_in=len(X), track_memory=track_memory)
+
+        df_pred = pd.DataFrame({
+            'DATA': df_feats['Data'],
+            'CodigoProduto': produto,
+            'TotalUNVendidas': df_feats['QuantidadeLiquida'],
+            'ValorTotalVendido': df_feats['QuantidadeLiquida'] * np.expm1(predicted),
+            'Promocao': df_feats['PrecoemPromocao'].astype(int),
+        })
+
+        def write_back(df):
+            insert_predictions(df)
+            return df
+
+        measure(results, scale, 'insert_predictions', write_back, df_pred,
+                rows_in=len(df_pred), track_memory=track_memory)
+        # Segunda gravação das mesmas previsões: a sincronização por diferença não deve escrever nada
+        def sync_back(df):
+            sync_predictions(df)
+            return df
+
+        measure(results, scale, 'sync_predictions', sync_back, df_pred,
+                rows_in=len(df_pred), track_memory=track_memory)
+
+    for entry in results.values():
+        rows = entry['rows_in'] or entry['rows_out']
+        entry['rows_per_second'] = rows / entry['seconds'] if entry['seconds'] else 0.0
+    return list(results.values())
+
+def compare_with_baseline(results, baseline_path, tolerance):
+    """
+    Compara o throughput com uma rodada de referência e retorna as etapas que regrediram.
+    """
+    baseline = {}
+    with open(baseline_path, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            baseline[(entry['scale'], entry['stage'])] = entry
+
+    regressions = []
+    for entry in results:
+        ref = baseline.get((entry['scale'], entry['stage']))
+        if not ref or not ref['rows_per_second']:
+            continue
+        ratio = entry['rows_per_second'] / ref['rows_per_second']
+        if ratio < 1 - tolerance:
+            regressions.append((entry['scale'], entry['stage'], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do pipeline com dados sintéticos.")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help="Quantidades de linhas de vendasprodutos a gerar.")
+    parser.add_argument('--products', type=int, default=5, help="Número de produtos sintéticos.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="Não mede pico de memória (reduz overhead).")
+    parser.add_argument('--no-predict', action='store_true', help="Pula a etapa de predição (TensorFlow).")
+    parser.add_argument('--engines', action='store_true',
+                        help="Compara os motores pandas e Polars do pré-processamento (tempo e equivalência).")
+    parser.add_argument('--baseline', type=Path, help="Arquivo JSONL de uma rodada anterior para comparação.")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Queda máxima aceitável de throughput em relação à baseline (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+    all_results = []
+
+    try:
+        for scale in args.scales:
+            for entry in run_scale(scale, args.products, args.seed, not args.no_memory, not args.no_predict,
+                                   engines=args.engines):
+                entry['run_id'] = run_id
+                all_results.append(entry)
+    finally:
+        db_manager.engine.dispose()
+
+    print(f"{'escala':>10} {'etapa':<22} {'linhas':>10} {'segundos':>10} {'linhas/s':>12} {'pico MB':>9}")
+    for entry in all_results:
+        print(f"{entry['scale']:>10} {entry['stage']:<22} {entry['rows_in']:>10} {entry['seconds']:>10.3f} "
+              f"{entry['rows_per_second']:>12.0f} {entry['peak_mb']:>9.1f}")
+
+    exit_code = 0
+    for entry in all_results:
+        for mismatch in entry.get('mismatches', []):
+            print(f"DIVERGÊNCIA entre motores: {mismatch}")
+            exit_code = 1
+
+    if args.baseline:
+        regressions = compare_with_baseline(all_results, args.baseline, args.tolerance)
+        for scale, stage, ratio in regressions:
+            print(f"REGRESSÃO: escala {scale}, etapa {stage}: {ratio:.0%} do throughput da baseline")
+        if regressions:
+            exit_code = 1
+
+    with open(RESULTS_PATH, 'a', encoding='utf-8') as f:
+        for entry in all_results:
+            f.write(json.dumps(entry) + '\n')
+    logger.info(f"Resultados do benchmark salvos em {RESULTS_PATH}.")
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -1,109 +1,626 @@
 from src.services.database import DatabaseManager
+from src.services.local_replica import sync_replica
+from src.services.scheduler import ProductScheduler, get_product_stats
+from src.services.job_queue import JobQueue, LeaseLost
 from src.data_processing.process_raw_data import extract_raw_data, save_raw_data
-from src.data_processing.price_data_pipeline import run_price_pipeline
-from src.data_processing.clean_data import process_clean_data
-from src.models.train_model_unit_price import train_model_unit_price
-from src.models.train_model_quantity import train_model
-from src.models.predict_model_unit_price import predict_price
-from src.models.predict_model_quantity import predict
-from src.visualizations.generate_reports_unit_price import generate_reports_unit_price
-from src.visualizations.generate_reports import generate_reports
+from src.data_processing.unified_pipeline import run_unified_pipeline
+from src.data_processing.promotions import run_promotion_detection
+from src.data_processing.clean_data import DEFAULT_MAX_MEMORY_MB, DEFAULT_QUANTITY_GRANULARITY
+from src.models.train_model_unit_price import train_model_unit_price, out_of_sample_metrics as price_error
+from src.models.train_model_quantity import train_model, out_of_sample_metrics as quantity_error
+from src.models.predict_model_unit_price import predict_price, MODEL_BASE_DIR as PRICE_MODEL_DIR
+from src.models.predict_model_quantity import predict, MODEL_BASE_DIR as QUANTITY_MODEL_DIR
+from src.models.retraining_policy import RetrainingPolicy
+from src.models.forecast_engine import forecast_prices
+from src.models.packed_training import train_price_models_packed
+from src.models.hierarchical import run_hierarchical
+from src.models.elasticity import run_elasticity_estimation
+from src.models.statistical_forecast import load_demand, route_products, forecast_long_tail
+from src.models.artifact_manager import collect_garbage
+from src.visualizations.batch_reports import generate_all_reports
 from src.utils.logging_config import get_logger
+from src.utils.instrumentation import RunReport
+from src.utils.utils import sync_predictions, quantity_to_predictions
+import argparse
 import os
+import time
+from datetime import date
+import pandas as pd
 from pathlib import Path
 
 logger = get_logger(__name__)
 BASE_DATA_DIR = Path(__file__).parent / "data"
+# Teto de memória (MB) da limpeza em chunks para produtos muito grandes
+CLEAN_MAX_MEMORY_MB = int(os.getenv('CLEAN_MAX_MEMORY_MB', DEFAULT_MAX_MEMORY_MB))
+# Granularidade do dataset de quantidade: 'sale' (padrão, por item de venda), 'day' (demanda diária) ou 'hour'
+# (usa 'Hora'); ao mudar, retreine os modelos de quantidade (FORCE_RETRAIN=1), que foram treinados em outro formato
+QUANTITY_GRANULARITY = os.getenv('QUANTITY_GRANULARITY', DEFAULT_QUANTITY_GRANULARITY)
+# Motor do pré-processamento: 'pandas' (padrão) ou 'polars' (plano lazy, exige o pacote polars)
+DATAFRAME_ENGINE = os.getenv('DATAFRAME_ENGINE', 'pandas')
+# Orçamento de tempo total da execução (horas); sem valor, processa todos os produtos
+RUN_TIME_BUDGET_SECONDS = float(os.getenv('RUN_TIME_BUDGET_HOURS')) * 3600 if os.getenv('RUN_TIME_BUDGET_HOURS') else None
+SCHEDULER_STATE_PATH = BASE_DATA_DIR / "scheduler_state.json"
+RETRAINING_STATE_PATH = BASE_DATA_DIR / "retraining_state.json"
+# Ignora a política de retreino e retreina todos os modelos (FORCE_RETRAIN=1)
+FORCE_RETRAIN = os.getenv('FORCE_RETRAIN', '0') == '1'
+# Atualiza modelos existentes por ajuste fino em vez de refazer a busca AutoKeras (INCREMENTAL_TRAINING=0 desliga)
+INCREMENTAL_TRAINING = os.getenv('INCREMENTAL_TRAINING', '1') == '1'
+# Horizonte (dias) da previsão recursiva de preços após o processamento dos produtos (0 desliga)
+FORECAST_HORIZON_DAYS = int(os.getenv('FORECAST_HORIZON_DAYS', '30'))
+# Grava as previsões de quantidade (cauda estatística e modo hierárquico) na tabela de previsões, só as
+# linhas que mudaram dentro do horizonte previsto (SYNC_PREDICTIONS=1 liga)
+SYNC_PREDICTIONS = os.getenv('SYNC_PREDICTIONS', '0') == '1'
+# Gera também os gráficos PNG por produto (em paralelo); por padrão só métricas e o painel-resumo
+REPORT_CHARTS = os.getenv('REPORT_CHARTS', '0') == '1'
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS')) if os.getenv('REPORT_WORKERS') else None
+# Detecção incremental de promoções em todo o catálogo antes dos produtos (DETECT_PROMOTIONS=0 desliga)
+DETECT_PROMOTIONS = os.getenv('DETECT_PROMOTIONS', '1') == '1'
+# Quantidade prevista por nós da hierarquia (total/seção/grupo) reconciliados e desagregados para os
+# produtos, no lugar dos modelos de quantidade por produto (HIERARCHICAL_MODE=1 liga)
+HIERARCHICAL_MODE = os.getenv('HIERARCHICAL_MODE', '0') == '1'
+# Envia a cauda longa (baixo giro ou demanda intermitente) para os previsores estatísticos em lote;
+# os produtos da cauda seguem no laço por produto (extração, preço, relatórios), só sem as etapas
+# de quantidade; a busca AutoKeras de quantidade fica com a cabeça do catálogo (STATISTICAL_ROUTING=0 desliga)
+STATISTICAL_ROUTING = os.getenv('STATISTICAL_ROUTING', '1') == '1'
+# Estima elasticidade-preço e lift de promoção de todo o catálogo na tabela `elasticidades` (ESTIMATE_ELASTICITIES=0 desliga)
+ESTIMATE_ELASTICITIES = os.getenv('ESTIMATE_ELASTICITIES', '1') == '1'
+# Treina os modelos de preço dos produtos processados em pacotes (um `fit` para vários produtos)
+# depois do laço de produtos, em vez da busca AutoKeras produto a produto (PACKED_TRAINING=1 liga)
+PACKED_TRAINING = os.getenv('PACKED_TRAINING', '0') == '1'
+# Ao final da execução, compacta os projetos AutoKeras em models/: mantém o modelo exportado e o
+# resumo das trials e poda os checkpoints das demais trials (MODEL_GC=1 liga)
+MODEL_GC = os.getenv('MODEL_GC', '0') == '1'
+# Arquiva em models/archive, em vez de apenas remover, os checkpoints podados (MODEL_GC_ARCHIVE=1 liga)
+MODEL_GC_ARCHIVE = os.getenv('MODEL_GC_ARCHIVE', '0') == '1'
+# Fila de jobs do modo worker: URL própria (ex.: sqlite:///data/job_queue.db) ou, sem ela, o banco do projeto
+JOB_QUEUE_URL = os.getenv('JOB_QUEUE_URL')
+# Intervalo (segundos) entre consultas à fila quando não há job disponível
+WORKER_POLL_SECONDS = float(os.getenv('WORKER_POLL_SECONDS', '15'))
 
 def get_produtos_mais_vendidos(db_manager):
     """
-    Obtém a lista de produtos mais vendidos do banco de dados.
+    Obtém os produtos mais vendidos do banco de dados com as estatísticas usadas pelo agendador.
 
     Parâmetros:
         db_manager (DatabaseManager): Gerenciador do banco de dados.
 
     Retorna:
-        list: Lista de códigos de produtos mais vendidos.
+        list: Tuplas (CodigoProduto, Linhas, Receita) de todos os produtos de `produtosmaisvendidos`.
     """
-    query = "SELECT CodigoProduto FROM produtosmaisvendidos WHERE CodigoProduto = 26173"
-
     try:
-        result = db_manager.execute_query(query)
-        produtos = [row[0] for row in result['data']]
-        logger.info(f"Produtos mais vendidos obtidos: {produtos}")
+        produtos = get_product_stats(db_manager)
+        logger.info(f"Produtos mais vendidos obtidos: {len(produtos)} produtos.")
         return produtos
     except Exception as e:
         logger.error(f"Erro ao obter produtos mais vendidos: {e}")
         return []
 
-def main():
+# Campos do contexto de um produto salvos na fila para retomar o job na etapa em que parou
+PRODUCT_CONTEXT_FIELDS = ('raw_rows', 'quantity_rows', 'price_rows', 'statistical')
+
+def _stage_extract(ctx):
     """
-    Orquestra os pipelines de quantidade e valor unitário utilizando o DatabaseManager.
+    Etapa 1: extrai os dados brutos do produto e salva o CSV. Retorna False se não houver dados.
     """
-    logger.info("Iniciando pipeline unificado.")
+    produto, report = ctx['produto'], ctx['report']
+    with report.stage('extract_raw_data', produto) as rec:
+        df_raw = extract_raw_data(ctx['db_manager'], produto)
+        rec['rows_out'] = len(df_raw)
+    ctx['raw_rows'] = len(df_raw)
+    if df_raw.empty:
+        logger.warning(f"Nenhum dado encontrado para o produto {produto}.")
+        return False
+    with report.stage('save_raw_data', produto) as rec:
+        save_raw_data(df_raw, produto, BASE_DATA_DIR / "raw")
+        rec['rows_in'] = rec['rows_out'] = len(df_raw)
+
+def _stage_preprocess(ctx):
+    """
+    Etapas 2 e 3: pré-processamento unificado (dataset diário de preço e dataset de quantidade na
+    granularidade QUANTITY_GRANULARITY).
+    """
+    produto = ctx['produto']
+    logger.info(f"Rodando pré-processamento unificado para o produto {produto}.")
+    with ctx['report'].stage('preprocess', produto) as rec:
+        ctx['quantity_rows'], ctx['price_rows'] = run_unified_pipeline(
+            produto, BASE_DATA_DIR, max_memory_mb=CLEAN_MAX_MEMORY_MB, granularity=QUANTITY_GRANULARITY,
+            engine=DATAFRAME_ENGINE
+        )
+        rec['rows_in'] = ctx.get('raw_rows', 0)
+        rec['rows_out'] = ctx['quantity_rows']
+
+def _read_daily(produto):
+    return pd.read_csv(BASE_DATA_DIR / "cleaned" / f"produto_{produto}_price.csv", parse_dates=['Data'])
 
-    # Criar diretórios necessários
+def _price_model_path(produto):
+    return PRICE_MODEL_DIR / f"produto_{produto}_unit_price_model" / f"produto_{produto}_unit_price_model.keras"
+
+def _stage_train_price(ctx):
+    """
+    Etapa 4: treina o modelo de preço se o erro recente ou o drift ultrapassou os limites.
+    No modo empacotado o treino (e a predição) fica para `run_packed_price`.
+    """
+    if PACKED_TRAINING:
+        return
+    produto, policy = ctx['produto'], ctx['policy']
+    df_daily = _read_daily(produto)
+    policy.record_metrics(produto, 'price', price_error(produto))
+    retrain_price, reason = policy.should_retrain(produto, 'price', _price_model_path(produto), df_daily)
+    logger.info(f"Modelo de preço do produto {produto}: retreinar={retrain_price} ({reason}).")
+    if retrain_price:
+        with ctx['report'].stage('train_model_unit_price', produto) as rec:
+            trained = train_model_unit_price(produto, window_size=7, incremental=INCREMENTAL_TRAINING)
+            rec['rows_in'] = ctx.get('price_rows', 0)
+        # Sem dias novos nada foi treinado: a referência de erro/drift da política é mantida
+        if trained:
+            policy.record_training(produto, 'price', df_daily)
+
+def _stage_train_quantity(ctx):
+    """
+    Etapa 5: treina o modelo de quantidade se o erro recente ou o drift ultrapassou os limites.
+    No modo hierárquico a quantidade vem dos modelos dos nós, e nos produtos da cauda longa dos
+    previsores estatísticos (etapa mantida para não mudar os índices).
+    """
+    if HIERARCHICAL_MODE or ctx.get('statistical'):
+        return
+    produto, policy = ctx['produto'], ctx['policy']
+    df_daily = _read_daily(produto)
+    quantity_model_path = QUANTITY_MODEL_DIR / f"produto_{produto}_quantity_model.keras"
+    policy.record_metrics(produto, 'quantity', quantity_error(produto))
+    retrain_quantity, reason = policy.should_retrain(produto, 'quantity', quantity_model_path, df_daily)
+    logger.info(f"Modelo de quantidade do produto {produto}: retreinar={retrain_quantity} ({reason}).")
+    if retrain_quantity:
+        with ctx['report'].stage('train_model_quantity', produto) as rec:
+            trained = train_model(produto, window_size=7, incremental=INCREMENTAL_TRAINING)
+            rec['rows_in'] = ctx.get('quantity_rows', 0)
+        if trained:
+            policy.record_training(produto, 'quantity', df_daily)
+
+def _stage_predict_price(ctx):
+    """
+    Etapa 6: predição para preço.
+    """
+    if PACKED_TRAINING:
+        return
+    logger.info(f"Realizando predições de preço para o produto {ctx['produto']}.")
+    with ctx['report'].stage('predict_price', ctx['produto']):
+        predict_price(ctx['produto'])
+
+def _stage_predict_quantity(ctx):
+    """
+    Etapa 7: predição para quantidade (no modo hierárquico, feita por `run_hierarchical_forecast`;
+    na cauda longa, por `run_statistical_path`).
+    """
+    if HIERARCHICAL_MODE or ctx.get('statistical'):
+        return
+    logger.info(f"Realizando predições de quantidade para o produto {ctx['produto']}.")
+    with ctx['report'].stage('predict_quantity', ctx['produto']):
+        predict(ctx['produto'])
+
+# Etapas de um produto, em ordem; um job interrompido é retomado pelo índice da etapa que falhou
+PRODUCT_STAGES = [
+    ('extract_raw_data', _stage_extract),
+    ('preprocess', _stage_preprocess),
+    ('train_model_unit_price', _stage_train_price),
+    ('train_model_quantity', _stage_train_quantity),
+    ('predict_price', _stage_predict_price),
+    ('predict_quantity', _stage_predict_quantity),
+]
+
+def process_product(db_manager, produto, report, policy, start_stage=0, context=None, on_stage_done=None):
+    """
+    Executa as etapas do pipeline de um produto (os relatórios são gerados em lote ao final da execução).
+
+    Parâmetros:
+        db_manager (DatabaseManager): Gerenciador do banco de dados.
+        produto (int): Código do produto.
+        report (RunReport): Relatório de instrumentação da execução.
+        policy (RetrainingPolicy): Política que decide se os modelos do produto são retreinados.
+        start_stage (int): Índice em PRODUCT_STAGES a partir do qual executar (retomada).
+        context (dict, optional): Valores salvos das etapas já concluídas (PRODUCT_CONTEXT_FIELDS).
+        on_stage_done (callable, optional): Chamado com (próxima etapa, contexto salvável) após cada etapa.
+
+    Retorna:
+        int: Número de linhas brutas processadas (0 se não houver dados).
+    """
+    logger.info(f"Processando o produto {produto} a partir da etapa {PRODUCT_STAGES[start_stage][0]}.")
+    ctx = {'db_manager': db_manager, 'produto': produto, 'report': report, 'policy': policy, **(context or {})}
+
+    for index in range(start_stage, len(PRODUCT_STAGES)):
+        _, stage_fn = PRODUCT_STAGES[index]
+        keep_going = stage_fn(ctx)
+        next_stage = index + 1 if keep_going is not False else len(PRODUCT_STAGES)
+        if on_stage_done is not None:
+            on_stage_done(next_stage, {k: ctx[k] for k in PRODUCT_CONTEXT_FIELDS if k in ctx})
+        if keep_going is False:
+            break
+
+    return ctx.get('raw_rows', 0)
+
+def prepare_directories():
+    """
+    Cria os diretórios de dados usados pelo pipeline.
+    """
     os.makedirs(BASE_DATA_DIR / "raw", exist_ok=True)
     os.makedirs(BASE_DATA_DIR / "cleaned", exist_ok=True)
     os.makedirs(BASE_DATA_DIR / "models", exist_ok=True)
     os.makedirs(BASE_DATA_DIR / "predictions", exist_ok=True)
     os.makedirs(BASE_DATA_DIR / "reports", exist_ok=True)
+    os.makedirs(BASE_DATA_DIR / "replica", exist_ok=True)  # Réplica local opcional (REPLICA_URL)
 
-    db_manager = DatabaseManager()  # Instancia o DatabaseManager
+def run_sync_replica(db_manager, report):
+    """
+    Atualiza a réplica local das tabelas de vendas, se configurada, e a marca d'água do cache.
+    """
+    watermark = None
+    if db_manager.replica_engine is not None:
+        with report.stage('sync_replica'):
+            watermark = sync_replica(db_manager)
+    db_manager.refresh_cache_watermark(watermark)
 
-    try:
-        # Obter a lista de produtos mais vendidos
+def run_detect_promotions(db_manager, report):
+    """
+    Detecta episódios de promoção de todo o catálogo (incremental) na tabela `promocoes`.
+    """
+    if DETECT_PROMOTIONS:
+        with report.stage('detect_promotions') as rec:
+            rec['rows_out'] = run_promotion_detection(db_manager)
+
+def run_estimate_elasticities(db_manager, report):
+    """
+    Estima as elasticidades de todo o catálogo em uma regressão em lote.
+    """
+    if ESTIMATE_ELASTICITIES:
+        with report.stage('estimate_elasticities') as rec:
+            rec['rows_out'] = run_elasticity_estimation(db_manager)
+
+def rank_products(db_manager, report, scheduler):
+    """
+    Obtém a lista de produtos mais vendidos e ordena-os por valor/custo estimado.
+    """
+    with report.stage('get_produtos_mais_vendidos') as rec:
         produtos = get_produtos_mais_vendidos(db_manager)
-        if not produtos:
-            logger.warning("Nenhum produto encontrado na consulta de produtos mais vendidos.")
-            return
+        rec['rows_out'] = len(produtos)
+    if not produtos:
+        logger.warning("Nenhum produto encontrado na consulta de produtos mais vendidos.")
+    return scheduler.rank(produtos)
 
-        for produto in produtos:
-            logger.info(f"Processando o produto {produto}.")
+def run_statistical_path(db_manager, report, ranked):
+    """
+    Roteia os produtos priorizados: prevê a quantidade da cauda longa em lote com métodos
+    estatísticos. Todos os produtos seguem no laço por produto (extração, preço e relatórios);
+    nos da cauda só as etapas de quantidade são puladas.
 
-            # Etapa 1: Extrair Dados Brutos
-            df_raw = extract_raw_data(db_manager, produto)
-            if df_raw.empty:
-                logger.warning(f"Nenhum dado encontrado para o produto {produto}.")
-                continue
-            save_raw_data(df_raw, produto, BASE_DATA_DIR / "raw")
+    Returns:
+        set: Produtos da cauda longa (quantidade prevista pelo caminho estatístico).
+    """
+    if not STATISTICAL_ROUTING or not ranked:
+        return set()
+    with report.stage('statistical_forecast') as rec:
+        produtos, dates, Y = load_demand(db_manager)
+        if len(produtos) == 0:
+            return set()
+        _, tail = route_products(ranked, produtos, Y)
+        df_forecast = forecast_long_tail(produtos, dates, Y, selected=tail, horizon=FORECAST_HORIZON_DAYS or 30)
+        rec['rows_in'] = len(tail)
+        rec['rows_out'] = len(df_forecast)
+    return set(tail)
 
-            # Etapa 2: Pipeline de preço
-            raw_file_path = BASE_DATA_DIR / "raw" / f"produto_{produto}.csv"
-            price_file_path = BASE_DATA_DIR / "cleaned" / f"produto_{produto}_price.csv"
-            logger.info(f"Rodando pipeline de preço para o produto {produto}.")
-            run_price_pipeline(raw_file_path, price_file_path)
+def run_packed_price(processed, report, policy):
+    """
+    Modo empacotado: treina em pacotes os modelos de preço que a política manda retreinar e
+    faz a predição de preço de todos os produtos processados.
+    """
+    if not PACKED_TRAINING or not processed:
+        return
+    to_train = []
+    for produto in processed:
+        df_daily = _read_daily(produto)
+        policy.record_metrics(produto, 'price', price_error(produto))
+        retrain_price, reason = policy.should_retrain(produto, 'price', _price_model_path(produto), df_daily)
+        logger.info(f"Modelo de preço do produto {produto}: retreinar={retrain_price} ({reason}).")
+        if retrain_price:
+            to_train.append((produto, df_daily))
 
-            # Etapa 3: Pipeline de quantidade
-            logger.info(f"Rodando pipeline de quantidade para o produto {produto}.")
-            process_clean_data(produto, BASE_DATA_DIR)
+    if to_train:
+        with report.stage('train_packed_price') as rec:
+            losses = train_price_models_packed([produto for produto, _ in to_train])
+            rec['rows_in'] = len(to_train)
+            rec['rows_out'] = len(losses)
+        for produto, df_daily in to_train:
+            if produto in losses:
+                policy.record_training(produto, 'price', df_daily)
 
-            # Etapa 4: Treinamento do modelo para preço
-            logger.info(f"Treinando modelo de preço para o produto {produto}.")
-            train_model_unit_price(produto, window_size=7)
+    for produto in processed:
+        try:
+            with report.stage('predict_price', produto):
+                predict_price(produto)
+        except Exception as e:
+            logger.error(f"Erro na predição de preço do produto {produto}: {e}")
 
-            # Etapa 5: Treinamento do modelo para quantidade
-            logger.info(f"Treinando modelo de quantidade para o produto {produto}.")
-            train_model(produto, window_size=7)
+def run_reports(processed, report):
+    """
+    Relatórios de todos os produtos processados. As métricas são da janela fixa de avaliação e não
+    alimentam a política de retreino, que mede o erro fora da amostra antes de cada treino.
+    """
+    if not processed:
+        return
+    with report.stage('generate_reports') as rec:
+        generate_all_reports(processed, metrics_only=not REPORT_CHARTS, max_workers=REPORT_WORKERS)
+        rec['rows_in'] = len(processed)
+
+def run_forecast(processed, report):
+    """
+    Previsão recursiva multi-passo de todos os produtos processados, em lote.
+    """
+    if processed and FORECAST_HORIZON_DAYS > 0:
+        with report.stage('forecast_prices') as rec:
+            df_forecast = forecast_prices(processed, horizon=FORECAST_HORIZON_DAYS)
+            rec['rows_in'] = len(processed)
+            rec['rows_out'] = len(df_forecast)
+
+def run_hierarchical_forecast(db_manager, report):
+    """
+    Modo hierárquico: treina os modelos dos nós, reconcilia os níveis e desagrega para os produtos.
+    """
+    if HIERARCHICAL_MODE:
+        with report.stage('hierarchical_forecast') as rec:
+            df_forecast = run_hierarchical(
+                db_manager, horizon=FORECAST_HORIZON_DAYS or 30, incremental=INCREMENTAL_TRAINING
+            )
+            rec['rows_out'] = len(df_forecast)
+
+def load_quantity_forecasts():
+    """
+    Previsões de quantidade por produto salvas nesta execução: a cauda longa do caminho estatístico
+    e, no modo hierárquico, a desagregação para os produtos (a cauda prevalece onde houver as duas).
+    O modelo de quantidade por produto só prevê a janela de avaliação, não o horizonte futuro.
+
+    Returns:
+        tuple: (previsões de quantidade, previsões recursivas de valor unitário dos mesmos produtos).
+    """
+    predictions_dir = BASE_DATA_DIR / "predictions"
+    frames = []
+    hierarchical_path = predictions_dir / "hierarchical_forecast.csv"
+    if HIERARCHICAL_MODE and hierarchical_path.exists():
+        df = pd.read_csv(hierarchical_path, parse_dates=['Data'])
+        frames.append(df[df['Nivel'] == 'CodigoProduto'].rename(columns={'Codigo': 'CodigoProduto'}))
+    statistical_path = predictions_dir / "statistical_forecast.csv"
+    if STATISTICAL_ROUTING and statistical_path.exists():
+        frames.append(pd.read_csv(statistical_path, parse_dates=['Data']))
+    if not frames:
+        return pd.DataFrame(), pd.DataFrame()
+
+    df_quantity = pd.concat(frames, ignore_index=True)
+    df_quantity['CodigoProduto'] = df_quantity['CodigoProduto'].astype('int64')
+    df_quantity = df_quantity.drop_duplicates(subset=['CodigoProduto', 'Data'], keep='last')
+
+    price_frames = []
+    if FORECAST_HORIZON_DAYS > 0:
+        for produto in df_quantity['CodigoProduto'].unique():
+            price_path = predictions_dir / f"produto_{produto}_unit_price_forecast.csv"
+            if price_path.exists():
+                price_frames.append(pd.read_csv(price_path, parse_dates=['Data']))
+    df_price = pd.concat(price_frames, ignore_index=True) if price_frames else pd.DataFrame()
+    return df_quantity, df_price
+
+def run_sync_predictions(report):
+    """
+    Grava as previsões de quantidade na tabela de previsões (opcional, SYNC_PREDICTIONS=1): apenas
+    as linhas novas ou alteradas, e só remove linhas antigas dentro do horizonte previsto.
+    """
+    if not SYNC_PREDICTIONS:
+        return
+    with report.stage('sync_predictions') as rec:
+        df_quantity, df_price = load_quantity_forecasts()
+        if df_quantity.empty:
+            logger.warning("Nenhuma previsão de quantidade para gravar na tabela de previsões.")
+            return
+        summary = sync_predictions(quantity_to_predictions(df_quantity, df_price), scope='horizonte')
+        rec['rows_in'] = len(df_quantity)
+        rec['rows_out'] = summary['inseridas'] + summary['alteradas'] if summary else 0
+
+def run_model_gc(report):
+    """
+    Compacta os projetos AutoKeras conforme a política de retenção e registra o espaço liberado.
+    """
+    if MODEL_GC:
+        with report.stage('model_gc') as rec:
+            df_gc = collect_garbage(archive=MODEL_GC_ARCHIVE)
+            rec['rows_in'] = len(df_gc)
+            rec['rows_out'] = int((df_gc['acao'] != 'mantido').sum())
+            rec['bytes_freed'] = int(df_gc['bytes_liberados'].sum())
+
+def main():
+    """
+    Orquestra os pipelines de quantidade e valor unitário utilizando o DatabaseManager.
+    """
+    logger.info("Iniciando pipeline unificado.")
+    prepare_directories()
 
-            # Etapa 6: Predição para preço
-            logger.info(f"Realizando predições de preço para o produto {produto}.")
-            predict_price(produto)
+    db_manager = DatabaseManager()  # Instancia o DatabaseManager
+    report = RunReport('unificado', BASE_DATA_DIR / "reports")
 
-            # Etapa 7: Predição para quantidade
-            logger.info(f"Realizando predições de quantidade para o produto {produto}.")
-            predict(produto)
+    try:
+        run_sync_replica(db_manager, report)
+        run_detect_promotions(db_manager, report)
+        run_estimate_elasticities(db_manager, report)
 
-            # Etapa 8: Geração de Relatórios
-            logger.info(f"Gerando relatórios para o produto {produto}.")
-            generate_reports_unit_price(produto)
-            generate_reports(produto)
+        scheduler = ProductScheduler(SCHEDULER_STATE_PATH, time_budget_seconds=RUN_TIME_BUDGET_SECONDS)
+        ranked = rank_products(db_manager, report, scheduler)
+        if not ranked:
+            return
+        statistical = run_statistical_path(db_manager, report, ranked)
+        policy = RetrainingPolicy(RETRAINING_STATE_PATH, force=FORCE_RETRAIN)
+
+        processed = []
+        for produto in scheduler.iter_products(ranked):
+            started = time.monotonic()
+            try:
+                raw_rows = process_product(db_manager, produto, report, policy,
+                                           context={'statistical': True} if produto in statistical else None)
+                scheduler.record(produto, time.monotonic() - started, rows=raw_rows)
+                processed.append(produto)
+            except Exception as e:
+                # Uma falha em um produto não interrompe os demais
+                logger.error(f"Erro ao processar o produto {produto}: {e}")
+                scheduler.record(produto, time.monotonic() - started, error=e)
+
+        run_packed_price(processed, report, policy)
+        run_reports(processed, report)
+        run_forecast(processed, report)
+        run_hierarchical_forecast(db_manager, report)
+        run_sync_predictions(report)
+        run_model_gc(report)
 
         logger.info("Pipeline unificado concluído com sucesso.")
     except Exception as e:
         logger.error(f"Erro durante o pipeline: {e}")
     finally:
-        db_manager.engine.dispose()  # Fecha as conexões com o banco
+        if db_manager.query_cache is not None:
+            logger.info(f"Cache de consultas: {db_manager.query_cache.stats()}")
+        db_manager.dispose()  # Fecha as conexões com o banco e com a réplica local
+        report.write_prometheus()
+
+# Fases da execução no modo worker: cada fase só começa quando a anterior terminou em todos os workers
+RUN_JOBS = [
+    {'chave': 'sync_replica', 'fase': 0, 'tipo': 'sync_replica'},
+    {'chave': 'detect_promotions', 'fase': 1, 'tipo': 'detect_promotions'},
+    {'chave': 'estimate_elasticities', 'fase': 1, 'tipo': 'estimate_elasticities'},
+    {'chave': 'plan_products', 'fase': 1, 'tipo': 'plan_products'},
+    # Fase 2: um job 'produto' por produto, cadastrado por plan_products
+    {'chave': 'packed_price', 'fase': 3, 'tipo': 'packed_price'},
+    {'chave': 'generate_reports', 'fase': 4, 'tipo': 'generate_reports'},
+    {'chave': 'forecast_prices', 'fase': 4, 'tipo': 'forecast_prices'},
+    {'chave': 'hierarchical_forecast', 'fase': 4, 'tipo': 'hierarchical_forecast'},
+    {'chave': 'sync_predictions', 'fase': 5, 'tipo': 'sync_predictions'},
+    {'chave': 'model_gc', 'fase': 5, 'tipo': 'model_gc'},
+]
+PRODUCT_PHASE = 2
+
+def execute_job(job, queue, db_manager, report, lease):
+    """
+    Executa um job reivindicado da fila, conforme o tipo.
+
+    `lease` (de `queue.keep_alive`) é conferido entre as etapas de produto: se o job passou para
+    outro worker, LeaseLost interrompe a execução antes de gravar a próxima etapa.
+    """
+    if job.tipo == 'sync_replica':
+        run_sync_replica(db_manager, report)
+    elif job.tipo == 'detect_promotions':
+        run_detect_promotions(db_manager, report)
+    elif job.tipo == 'estimate_elasticities':
+        run_estimate_elasticities(db_manager, report)
+    elif job.tipo == 'plan_products':
+        scheduler = ProductScheduler(SCHEDULER_STATE_PATH)
+        ranked = rank_products(db_manager, report, scheduler)
+        statistical = run_statistical_path(db_manager, report, ranked)
+        queue.add_jobs(job.run_id, [
+            {'chave': f"produto:{item['produto']}", 'fase': PRODUCT_PHASE, 'tipo': 'produto',
+             'produto': item['produto'], 'prioridade': item['priority'],
+             'contexto': {'statistical': True} if item['produto'] in statistical else None}
+            for item in ranked
+        ])
+    elif job.tipo == 'produto':
+        # Estado relido a cada job: outros workers gravam os demais produtos nos mesmos arquivos
+        scheduler = ProductScheduler(SCHEDULER_STATE_PATH)
+        policy = RetrainingPolicy(RETRAINING_STATE_PATH, force=FORCE_RETRAIN)
+        started = time.monotonic()
+
+        def on_stage_done(etapa, contexto):
+            lease.check()
+            queue.complete_stage(job, etapa, contexto)
+
+        try:
+            raw_rows = process_product(
+                db_manager, job.produto, report, policy, start_stage=job.etapa, context=job.contexto,
+                on_stage_done=on_stage_done
+            )
+        except LeaseLost:
+            raise
+        except Exception as e:
+            scheduler.record(job.produto, time.monotonic() - started, error=e)
+            raise
+        scheduler.record(job.produto, time.monotonic() - started, rows=raw_rows)
+    elif job.tipo == 'packed_price':
+        policy = RetrainingPolicy(RETRAINING_STATE_PATH, force=FORCE_RETRAIN)
+        run_packed_price(queue.products(job.run_id), report, policy)
+    elif job.tipo == 'generate_reports':
+        run_reports(queue.products(job.run_id), report)
+    elif job.tipo == 'forecast_prices':
+        run_forecast(queue.products(job.run_id), report)
+    elif job.tipo == 'hierarchical_forecast':
+        run_hierarchical_forecast(db_manager, report)
+    elif job.tipo == 'sync_predictions':
+        run_sync_predictions(report)
+    elif job.tipo == 'model_gc':
+        run_model_gc(report)
+    else:
+        raise ValueError(f"Tipo de job desconhecido: {job.tipo}")
+
+def run_worker(run_id):
+    """
+    Executa o pipeline como worker de uma fila compartilhada: reivindica jobs da execução
+    `run_id` até que todos terminem. Vários workers (em uma ou mais máquinas) podem rodar ao
+    mesmo tempo; o diretório de dados e os modelos precisam estar em armazenamento compartilhado.
+    """
+    logger.info(f"Iniciando worker da execução {run_id}.")
+    prepare_directories()
+
+    db_manager = DatabaseManager()
+    report = RunReport('unificado', BASE_DATA_DIR / "reports")
+    queue = JobQueue(url=JOB_QUEUE_URL) if JOB_QUEUE_URL else JobQueue(engine=db_manager.engine)
+    queue.add_jobs(run_id, RUN_JOBS)
+    deadline = time.monotonic() + RUN_TIME_BUDGET_SECONDS if RUN_TIME_BUDGET_SECONDS else None
+    watermark_ready = False
+
+    try:
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                queue.defer_pending(run_id, PRODUCT_PHASE)
+
+            job = queue.claim(run_id)
+            if job is None:
+                if queue.is_finished(run_id):
+                    break
+                time.sleep(WORKER_POLL_SECONDS)
+                continue
+
+            # A marca d'água do cache deste worker acompanha a réplica sincronizada na fase 0
+            if job.fase > 0 and not watermark_ready:
+                db_manager.refresh_cache_watermark()
+                watermark_ready = True
+
+            logger.info(f"Executando {job}.")
+            with queue.keep_alive(job) as lease:
+                try:
+                    execute_job(job, queue, db_manager, report, lease)
+                    lease.check()
+                except LeaseLost as e:
+                    # Outro worker retomou o job: abandona sem concluí-lo nem registrar falha
+                    logger.warning(f"{e} Job abandonado por este worker.")
+                    continue
+                except Exception as e:
+                    logger.error(f"Erro no job {job.chave}: {e}")
+                    queue.fail(job, e)
+                    continue
+            queue.complete(job)
+
+        logger.info(f"Execução {run_id} concluída: {queue.summary(run_id)}.")
+    finally:
+        if db_manager.query_cache is not None:
+            logger.info(f"Cache de consultas: {db_manager.query_cache.stats()}")
+        db_manager.dispose()
+        report.write_prometheus()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Pipeline unificado do PromoPredictor.")
+    parser.add_argument('--worker', action='store_true', help="Executa como worker da fila de jobs compartilhada.")
+    parser.add_argument('--run-id', default=os.getenv('RUN_ID', date.today().isoformat()),
+                        help="Execução compartilhada pelos workers (padrão: data de hoje).")
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.run_id)
+    else:
+        main()
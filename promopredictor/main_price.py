@@ -6,6 +6,7 @@ from src.models.train_model_unit_price import train_model_unit_price
 from src.models.predict_model_unit_price import predict_price
 from src.visualizations.generate_reports_unit_price import generate_reports_unit_price
 from src.utils.logging_config import get_logger
+from src.utils.instrumentation import RunReport
 
 logger = get_logger(__name__)
 
@@ -16,6 +17,7 @@ BASE_DATA_DIR = Path(__file__).parent / "data"
 def main():
     produto = 26173
     logger.info("Iniciando pipeline de preço do produto %s", produto)
+    report = RunReport('preco', DATA_DIR / "reports")
 
     # 1) Criar diretórios se necessário
     os.makedirs(BASE_DATA_DIR / "raw", exist_ok=True)
@@ -32,31 +34,40 @@ def main():
 
     try:
         # Extraindo dados brutos para o produto
-        df_raw = extract_raw_data(connection, produto)
+        with report.stage('extract_raw_data', produto) as rec:
+            df_raw = extract_raw_data(connection, produto)
+            rec['rows_out'] = len(df_raw)
 
         if df_raw.empty:
             logger.warning(f"Nenhum dado encontrado para o produto {produto}. Encerrando pipeline.")
             return
         else:
             # Salvando CSV bruto em data/raw
-            save_raw_data(df_raw, produto, BASE_DATA_DIR / "raw")
+            with report.stage('save_raw_data', produto) as rec:
+                save_raw_data(df_raw, produto, BASE_DATA_DIR / "raw")
+                rec['rows_in'] = rec['rows_out'] = len(df_raw)
     finally:
         connection.dispose()
 
     # 3) Rodar pipeline de dados de preço
     raw_file_path = BASE_DATA_DIR / "raw" / f"produto_{produto}.csv"
     price_file_path = BASE_DATA_DIR / "cleaned" / f"produto_{produto}_price.csv"
-    run_price_pipeline(raw_file_path, price_file_path)
+    with report.stage('run_price_pipeline', produto) as rec:
+        rec['rows_out'] = run_price_pipeline(raw_file_path, price_file_path)
 
     # 4) Treinar modelo de valor unitário
-    train_model_unit_price()
+    with report.stage('train_model_unit_price', produto):
+        train_model_unit_price()
 
     # 5) Prever valor unitário
-    predict_price()
+    with report.stage('predict_price', produto):
+        predict_price()
 
     # 6) Gerar relatórios de valor unitário
-    generate_reports_unit_price()
+    with report.stage('generate_reports_unit_price', produto):
+        generate_reports_unit_price()
 
+    report.write_prometheus()
     logger.info("Pipeline de preço (com extração) finalizado com sucesso.")
 
 if __name__ == "__main__":
@@ -1,17 +1,24 @@
 import os
+import time
 from pathlib import Path
-from src.data_processing.process_raw_data import create_db_connection, extract_raw_data, save_raw_data
+from src.services.database import DatabaseManager
+from src.services.scheduler import ProductScheduler, get_product_stats
+from src.data_processing.process_raw_data import extract_raw_data, save_raw_data
 from src.data_processing.clean_data import process_clean_data
 from src.models.train_model_quantity import train_model
 from src.models.predict_model_quantity import predict
 from src.visualizations.generate_reports import generate_reports
 from src.utils.logging_config import get_logger
+from src.utils.instrumentation import RunReport
 
 # Configuração de logging
 logger = get_logger(__name__)
 
 # Definir o caminho base para os dados
 BASE_DATA_DIR = Path(__file__).parent / "data"
+# Orçamento de tempo total da execução (horas); sem valor, processa todos os produtos
+RUN_TIME_BUDGET_SECONDS = float(os.getenv('RUN_TIME_BUDGET_HOURS')) * 3600 if os.getenv('RUN_TIME_BUDGET_HOURS') else None
+SCHEDULER_STATE_PATH = BASE_DATA_DIR / "scheduler_state.json"
 
 def main():
     """
@@ -20,11 +27,12 @@ def main():
     2. Treina o modelo usando os dados preparados.
     3. Faz predições para o período especificado.
     4. Gera relatórios e gráficos com os resultados.
+
+    Os produtos são processados na ordem definida pelo ProductScheduler, dentro do orçamento de tempo.
     """
     logger.info("Iniciando o pipeline de processamento e análise.")
 
-    # Lista de códigos de produtos para processamento
-    produtos = [26173]  # Substitua por uma lista de produtos reais
+    report = RunReport('quantidade', BASE_DATA_DIR / "reports")
 
     # Criar diretórios base, se não existirem
     os.makedirs(BASE_DATA_DIR / "raw", exist_ok=True)
@@ -33,42 +41,53 @@ def main():
     os.makedirs(BASE_DATA_DIR / "predictions", exist_ok=True)
     os.makedirs(BASE_DATA_DIR / "reports", exist_ok=True)
 
-    # Etapa 1: Processamento de Dados
-    connection = create_db_connection()
-    if connection:
-        try:
-            for produto in produtos:
-                logger.info(f"Processando o produto {produto}.")
+    db_manager = DatabaseManager()
 
-                # Extração de dados brutos
-                df_raw = extract_raw_data(connection, produto)
+    try:
+        # Lista de produtos ordenada pelo agendador (valor de negócio / custo estimado)
+        scheduler = ProductScheduler(SCHEDULER_STATE_PATH, time_budget_seconds=RUN_TIME_BUDGET_SECONDS)
+        ranked = scheduler.rank(get_product_stats(db_manager))
 
-                # Salvamento de dados brutos
-                if not df_raw.empty:
-                    save_raw_data(df_raw, produto, BASE_DATA_DIR / "raw")
-                else:
+        for produto in scheduler.iter_products(ranked):
+            logger.info(f"Processando o produto {produto}.")
+            started = time.monotonic()
+            try:
+                # Etapa 1: Processamento de Dados (extração, limpeza e engenharia de recursos)
+                with report.stage('extract_raw_data', produto) as rec:
+                    df_raw = extract_raw_data(db_manager, produto)
+                    rec['rows_out'] = len(df_raw)
+
+                if df_raw.empty:
                     logger.warning(f"Nenhum dado encontrado para o produto {produto}.")
                     continue  # Pula para o próximo produto se não houver dados
 
-                # Limpeza e engenharia de recursos
-                process_clean_data(produto, BASE_DATA_DIR)
-        finally:
-            connection.dispose()
-    else:
-        logger.error("Falha ao estabelecer conexão com o banco de dados.")
-        return
-
-    # Etapa 2: Treinamento do Modelo
-    logger.info("Iniciando o treinamento do modelo.")
-    train_model()
-
-    # Etapa 3: Predição
-    logger.info("Iniciando a geração de predições.")
-    predict()
-
-    # Etapa 4: Geração de Relatórios
-    logger.info("Gerando relatórios e gráficos.")
-    generate_reports()
+                with report.stage('save_raw_data', produto) as rec:
+                    save_raw_data(df_raw, produto, BASE_DATA_DIR / "raw")
+                    rec['rows_in'] = rec['rows_out'] = len(df_raw)
+
+                with report.stage('process_clean_data', produto) as rec:
+                    rec['rows_in'] = len(df_raw)
+                    rec['rows_out'] = process_clean_data(produto, BASE_DATA_DIR)
+
+                # Etapa 2: Treinamento do Modelo
+                with report.stage('train_model_quantity', produto):
+                    train_model(produto)
+
+                # Etapa 3: Predição
+                with report.stage('predict_quantity', produto):
+                    predict(produto)
+
+                # Etapa 4: Geração de Relatórios
+                with report.stage('generate_reports', produto):
+                    generate_reports(produto)
+
+                scheduler.record(produto, time.monotonic() - started, rows=len(df_raw))
+            except Exception as e:
+                logger.error(f"Erro ao processar o produto {produto}: {e}")
+                scheduler.record(produto, time.monotonic() - started, error=e)
+    finally:
+        db_manager.dispose()
+        report.write_prometheus()
 
     logger.info("Pipeline completo concluído com sucesso.")
 
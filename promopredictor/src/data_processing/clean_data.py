@@ -7,18 +7,35 @@ from src.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
-def clean_data(df):
+# Teto de memória padrão (MB) para o processamento em chunks
+DEFAULT_MAX_MEMORY_MB = 512
+# Fator de segurança para as cópias intermediárias feitas durante a limpeza
+CHUNK_MEMORY_OVERHEAD = 4
+MIN_CHUNK_ROWS = 1000
+# Granularidade padrão do dataset de quantidade: 'sale' (uma linha por item de venda, formato com que
+# os modelos existentes foram treinados); 'day' e 'hour' são opcionais
+DEFAULT_QUANTITY_GRANULARITY = 'sale'
+QUANTITY_GRANULARITIES = ('sale', 'day', 'hour')
+
+# Agregações do dataset de quantidade; as médias são somas divididas por 'Linhas' no fim, para
+# que parciais de chunks diferentes possam ser combinadas
+QUANTITY_SUM_COLUMNS = ['Quantidade', 'QuantDevolvida', 'QuantidadeLiquida', 'ValorTotal']
+QUANTITY_MEAN_COLUMNS = ['Rentabilidade', 'DescontoAplicado', 'AcrescimoAplicado', 'ValorUnitario', 'ValorCusto']
+QUANTITY_MAX_COLUMNS = ['PrecoemPromocao', 'EmPromocao']
+
+def parse_sale_datetimes(df):
     """
-    Realiza a limpeza de dados brutos.
+    Converte e filtra as colunas de data/hora dos dados brutos.
+
+    Etapa comum aos pipelines de quantidade e de preço: converte 'Data',
+    remove datas nulas ou anteriores a 01/01/2019, normaliza 'Hora' e cria 'DataHora'.
 
     Parâmetros:
         df (pandas.DataFrame): Dados brutos.
 
     Retorna:
-        pandas.DataFrame: Dados limpos.
+        pandas.DataFrame: Dados com 'Data' e 'DataHora' válidos.
     """
-    logger.info("Iniciando limpeza de dados.")
-
     # Converter a coluna 'Data' para datetime
     df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
 
@@ -26,7 +43,7 @@ def clean_data(df):
     df = df.dropna(subset=['Data'])
 
     # Filtrar dados a partir de 01/01/2019
-    df = df[df['Data'] >= pd.to_datetime('2019-01-01')]
+    df = df[df['Data'] >= pd.to_datetime('2019-01-01')].copy()
 
     # Ajustar a coluna 'Hora' para remover "0 days"
     if 'Hora' in df.columns:
@@ -36,8 +53,35 @@ def clean_data(df):
     df['DataHora'] = pd.to_datetime(df['Data'].astype(str) + ' ' + df['Hora'], errors='coerce')
 
     # Remover linhas com 'DataHora' nula
-    df = df.dropna(subset=['DataHora'])
+    return df.dropna(subset=['DataHora'])
+
+def clean_data(df):
+    """
+    Realiza a limpeza de dados brutos.
+
+    Parâmetros:
+        df (pandas.DataFrame): Dados brutos.
+
+    Retorna:
+        pandas.DataFrame: Dados limpos.
+    """
+    logger.info("Iniciando limpeza de dados.")
+
+    df = clean_sale_columns(parse_sale_datetimes(df))
+
+    logger.info("Limpeza de dados concluída.")
+    return df
+
+def clean_sale_columns(df):
+    """
+    Ajusta as colunas binárias e preenche valores ausentes dos dados já filtrados por data.
 
+    Parâmetros:
+        df (pandas.DataFrame): Dados com 'Data' e 'DataHora' válidos.
+
+    Retorna:
+        pandas.DataFrame: Dados limpos.
+    """
     # Ajustar colunas binárias
     binary_cols = ['VendaCancelada', 'ItemCancelado', 'PrecoemPromocao']
     for col in binary_cols:
@@ -46,8 +90,6 @@ def clean_data(df):
 
     df['EmPromocao'] = df['PrecoemPromocao']
     df.fillna(0, inplace=True)
-
-    logger.info("Limpeza de dados concluída.")
     return df
 
 def feature_engineering(df):
@@ -69,8 +111,7 @@ def feature_engineering(df):
 
     # Quantidade líquida
     if 'Quantidade' in df.columns and 'QuantDevolvida' in df.columns:
-        df['QuantidadeLiquida'] = df['Quantidade'] - df['QuantDevolvida']
-        df['QuantidadeLiquida'] = df['QuantidadeLiquida'].fillna(0)
+        add_net_quantity(df)
 
     # Rentabilidade
     if 'ValorCusto' in df.columns and 'ValorUnitario' in df.columns:
@@ -83,26 +124,234 @@ def feature_engineering(df):
     logger.info("Engenharia de recursos concluída.")
     return df
 
-def process_clean_data(produto_especifico, base_dir):
+def add_net_quantity(df):
+    """
+    Cria 'QuantidadeLiquida' (Quantidade - QuantDevolvida, ou Quantidade se não houver devoluções).
+    """
+    if 'Quantidade' in df.columns and 'QuantDevolvida' in df.columns:
+        df['QuantidadeLiquida'] = df['Quantidade'] - df['QuantDevolvida']
+    else:
+        df['QuantidadeLiquida'] = df['Quantidade']
+    df['QuantidadeLiquida'] = df['QuantidadeLiquida'].fillna(0)
+    return df
+
+def aggregate_sales(df, aggregations, granularity='day'):
+    """
+    Agrupa as vendas por período (dia por 'Data' ou hora por 'DataHora').
+
+    Código comum às agregações de preço (`aggregate_daily`) e de quantidade.
+
+    Parâmetros:
+        df (pandas.DataFrame): Vendas com 'Data' (e 'DataHora' para 'hour').
+        aggregations (dict): {coluna: função} repassado ao `agg`.
+        granularity (str): 'day' ou 'hour'.
+
+    Retorna:
+        pandas.DataFrame: Uma linha por período, com 'Data' (dia) e, em 'hour', 'DataHora'.
+    """
+    if granularity == 'hour':
+        period = df['DataHora'].dt.floor('h').rename('DataHora')
+    elif granularity == 'day':
+        period = df['Data'].dt.normalize().rename('Data')
+    else:
+        raise ValueError(f"Granularidade inválida: {granularity}")
+
+    aggregations = {col: func for col, func in aggregations.items() if col in df.columns}
+    grouped = df.groupby(period).agg(aggregations).reset_index()
+    if granularity == 'hour':
+        grouped.insert(0, 'Data', grouped['DataHora'].dt.normalize())
+    return grouped
+
+def _quantity_partials(df, granularity):
+    """
+    Somas, máximos e contagem de linhas por período: parciais combináveis entre chunks.
+    """
+    aggregations = {col: 'sum' for col in QUANTITY_SUM_COLUMNS + QUANTITY_MEAN_COLUMNS}
+    aggregations.update({col: 'max' for col in QUANTITY_MAX_COLUMNS})
+    aggregations['Linhas'] = 'sum'
+    return aggregate_sales(df.assign(Linhas=1), aggregations, granularity)
+
+def _finalize_quantity(partials, granularity):
+    """
+    Combina parciais, converte as somas das colunas de média em médias e recria as variáveis de data.
+    """
+    key = 'DataHora' if granularity == 'hour' else 'Data'
+    aggregations = {col: 'sum' for col in partials.columns if col not in QUANTITY_MAX_COLUMNS + ['Data', 'DataHora']}
+    aggregations.update({col: 'max' for col in QUANTITY_MAX_COLUMNS if col in partials.columns})
+    df = partials.groupby(key).agg(aggregations).sort_index()
+
+    if granularity == 'day' and not df.empty:
+        # Demanda diária: dias sem venda entram com quantidade zero
+        df = df.reindex(pd.date_range(df.index.min(), df.index.max(), freq='D'))
+        df.index.name = 'Data'
+        filled = ['Linhas'] + [c for c in QUANTITY_SUM_COLUMNS + QUANTITY_MAX_COLUMNS if c in df.columns]
+        df[filled] = df[filled].fillna(0)
+
+    lines = df['Linhas'].replace(0, np.nan)
+    for col in QUANTITY_MEAN_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col] / lines
+    for col in ['ValorUnitario', 'ValorCusto']:
+        if col in df.columns:
+            df[col] = df[col].ffill()
+    df = df.fillna(0).reset_index()
+
+    if granularity == 'hour':
+        df.insert(0, 'Data', df['DataHora'].dt.normalize())
+        df['Hora'] = df['DataHora'].dt.hour
+    df['Dia'] = df['Data'].dt.day
+    df['DiaDaSemana'] = df['Data'].dt.dayofweek
+    df['Mes'] = df['Data'].dt.month
+    return df
+
+def aggregate_quantity(df, granularity=DEFAULT_QUANTITY_GRANULARITY):
     """
-    Lê dados brutos, limpa e realiza engenharia de recursos, salvando o resultado.
+    Agrega o dataset de quantidade (saída de `feature_engineering`) por dia ou hora.
+
+    Em 'day' os dias sem venda entram com quantidade zero, de modo que o alvo passa a ser a
+    demanda do dia e não a quantidade de cada item vendido. Em 'hour' só há linhas nas horas
+    com venda. Com 'sale' o dataset é retornado sem agregação.
+
+    Parâmetros:
+        df (pandas.DataFrame): Dados por item de venda, com colunas derivadas.
+        granularity (str): 'sale', 'day' ou 'hour'.
+
+    Retorna:
+        pandas.DataFrame: Dados agregados.
+    """
+    if granularity == 'sale':
+        return df
+    return _finalize_quantity(_quantity_partials(df, granularity), granularity)
+
+def estimate_chunk_size(raw_file_path, max_memory_mb, sample_rows=10000):
+    """
+    Estima quantas linhas cabem em um chunk respeitando o teto de memória.
+
+    Parâmetros:
+        raw_file_path (Path): Caminho do CSV bruto.
+        max_memory_mb (int): Teto de memória (MB) disponível para o processamento de um chunk.
+        sample_rows (int): Linhas lidas para estimar o custo de memória por linha.
+
+    Retorna:
+        int: Número de linhas por chunk.
+    """
+    sample = pd.read_csv(raw_file_path, nrows=sample_rows)
+    if sample.empty:
+        return MIN_CHUNK_ROWS
+
+    bytes_per_row = sample.memory_usage(deep=True).sum() / len(sample)
+
+    # clean_data e feature_engineering geram cópias intermediárias do chunk,
+    # então reservamos uma fração do teto para cada linha efetivamente lida.
+    budget_bytes = (max_memory_mb * 1024 * 1024) / CHUNK_MEMORY_OVERHEAD
+    return max(MIN_CHUNK_ROWS, int(budget_bytes / bytes_per_row))
+
+def process_clean_data_chunked(raw_file_path, output_path, max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+                               granularity=DEFAULT_QUANTITY_GRANULARITY):
+    """
+    Limpa e aplica engenharia de recursos em chunks, gravando a saída incrementalmente.
+
+    O pico de memória depende apenas do tamanho do chunk (derivado de `max_memory_mb`),
+    e não do tamanho total do arquivo bruto do produto. Com granularidade 'day' ou 'hour',
+    cada chunk vira parciais por período (somas e contagens), combinadas no final.
+
+    Parâmetros:
+        raw_file_path (Path): Caminho do CSV bruto.
+        output_path (Path): Caminho do CSV limpo de saída.
+        max_memory_mb (int): Teto de memória (MB) para cada chunk.
+        granularity (str): 'sale', 'day' ou 'hour'.
+
+    Retorna:
+        int: Total de linhas gravadas.
+    """
+    chunk_size = estimate_chunk_size(raw_file_path, max_memory_mb)
+    logger.info(f"Processando {raw_file_path} em chunks de {chunk_size} linhas (teto de {max_memory_mb} MB).")
+
+    # Grava em arquivo temporário para não deixar um CSV parcial em caso de falha
+    tmp_path = output_path.with_suffix(output_path.suffix + '.tmp')
+    total_rows = 0
+    header_written = False
+    partials = []
+    columns = []
+
+    try:
+        for idx, chunk in enumerate(pd.read_csv(raw_file_path, chunksize=chunk_size)):
+            df_processed = feature_engineering(clean_data(chunk))
+            columns = df_processed.columns
+            if df_processed.empty:
+                continue
+            if granularity != 'sale':
+                partials.append(_quantity_partials(df_processed, granularity))
+                logger.debug("Chunk %d agregado: %d linhas.", idx, len(df_processed))
+                continue
+
+            df_processed.to_csv(
+                tmp_path,
+                index=False,
+                sep=',',
+                mode='a' if header_written else 'w',
+                header=not header_written
+            )
+            header_written = True
+            total_rows += len(df_processed)
+            logger.debug("Chunk %d processado: %d linhas.", idx, len(df_processed))
+
+        if partials:
+            df_aggregated = _finalize_quantity(pd.concat(partials, ignore_index=True), granularity)
+            df_aggregated.to_csv(tmp_path, index=False, sep=',')
+            total_rows = len(df_aggregated)
+        elif not header_written:
+            # Nenhum chunk com linhas válidas: grava só o cabeçalho, para substituir o CSV anterior
+            pd.DataFrame(columns=columns).to_csv(tmp_path, index=False, sep=',')
+
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    return total_rows
+
+def process_clean_data(produto_especifico, base_dir, streaming=None, max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+                       granularity=DEFAULT_QUANTITY_GRANULARITY):
+    """
+    Lê dados brutos, limpa, realiza engenharia de recursos e agrega na granularidade pedida, salvando o resultado.
 
     Parâmetros:
         produto_especifico (int): Código do produto.
         base_dir (Path): Diretório base contendo os subdiretórios `raw` e `cleaned`.
+        streaming (bool, optional): Processa o arquivo em chunks com memória limitada.
+            Se None, o modo é escolhido automaticamente quando o CSV bruto excede `max_memory_mb`.
+        max_memory_mb (int): Teto de memória (MB) usado no modo streaming.
+        granularity (str): 'sale' (por item de venda), 'day' ou 'hour'.
+
+    Retorna:
+        int: Número de linhas gravadas no dataset limpo.
     """
     raw_file_path = base_dir / "raw" / f'produto_{produto_especifico}.csv'
     cleaned_dir = base_dir / "cleaned"
 
+    # Salva o dataset do modelo de quantidade (por venda ou agregado):
+    output_path = cleaned_dir / f'produto_{produto_especifico}_clean.csv'
+
+    if streaming is None:
+        streaming = os.path.getsize(raw_file_path) > max_memory_mb * 1024 * 1024
+
+    if streaming:
+        total_rows = process_clean_data_chunked(raw_file_path, output_path, max_memory_mb, granularity)
+        if total_rows == 0:
+            logger.warning(f"Nenhuma linha válida após a limpeza do produto {produto_especifico}.")
+        logger.info(f"Dados processados salvos em {output_path} ({total_rows} linhas, modo streaming).")
+        return total_rows
+
     df = pd.read_csv(raw_file_path)
 
     df_clean = clean_data(df)
-    df_processed = feature_engineering(df_clean)
+    df_processed = aggregate_quantity(feature_engineering(df_clean), granularity)
 
-    # Salva o dataset “normal” (por venda) para o modelo de quantidade:
-    output_path = cleaned_dir / f'produto_{produto_especifico}_clean.csv'
     df_processed.to_csv(output_path, index=False, sep=',')
     logger.info(f"Dados processados salvos em {output_path}.")
+    return len(df_processed)
 
 if __name__ == "__main__":
     process_clean_data(26173)
\ No newline at end of file
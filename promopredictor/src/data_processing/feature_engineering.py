@@ -1,5 +1,38 @@
 import pandas as pd
 
+# Features do modelo de valor unitário, na ordem usada no treino
+PRICE_FEATURES = [
+    'PrecoemPromocao',
+    'DiaDaSemana',
+    'Mes',
+    'Dia',
+    'QuantidadeLiquida',
+    'is_holiday',
+    'is_eve1',
+    'is_eve2',
+    'is_eve3',
+    'ValorCusto',
+    'ValorUnitario_lag1',
+    'ValorUnitario_lag2',
+    'ValorUnitario_lag3',
+    'QuantidadeLiquida_lag1',
+    'QuantidadeLiquida_lag2',
+    'QuantidadeLiquida_lag3',
+    'ValorUnitarioMedio_rolling_mean_7',
+    'ValorUnitarioMedio_rolling_std_7',
+    'ValorUnitarioMedio_rolling_sum_7',
+    'QuantidadeLiquida_rolling_mean_7',
+    'QuantidadeLiquida_rolling_std_7',
+    'QuantidadeLiquida_rolling_sum_7',
+]
+
+# Features do modelo de quantidade (por item de venda), na ordem usada no treino
+QUANTITY_FEATURES = [
+    'DiaDaSemana', 'Mes', 'Dia', 'QuantidadeLiquida',
+    'Rentabilidade', 'DescontoAplicado', 'AcrescimoAplicado',
+    'Quantidade_rolling_mean_7', 'Quantidade_rolling_std_7', 'Quantidade_rolling_sum_7'
+]
+
 def add_rolling_features(df, columns, window_size=7):
     """
     Adiciona variáveis de janela flutuante ao DataFrame.
@@ -17,3 +50,41 @@ def add_rolling_features(df, columns, window_size=7):
         df[f'{column}_rolling_std_{window_size}'] = df[column].rolling(window=window_size).std()
         df[f'{column}_rolling_sum_{window_size}'] = df[column].rolling(window=window_size).sum()
     return df
+
+
+def add_lag_features(df, lags=range(1, 4)):
+    """
+    Adiciona variáveis de defasagem de valor unitário e quantidade ao dataset diário.
+
+    Args:
+        df (pd.DataFrame): DataFrame diário com 'ValorUnitarioMedio' e 'QuantidadeLiquida'.
+        lags (iterable): Defasagens (em dias) a serem criadas.
+
+    Returns:
+        pd.DataFrame: DataFrame com as colunas `ValorUnitario_lag*` e `QuantidadeLiquida_lag*`.
+    """
+    for lag in lags:
+        df[f'ValorUnitario_lag{lag}'] = df['ValorUnitarioMedio'].shift(lag)
+        df[f'QuantidadeLiquida_lag{lag}'] = df['QuantidadeLiquida'].shift(lag)
+    return df
+
+
+def build_price_features(df, window_size=7):
+    """
+    Aplica ao dataset diário de preço as defasagens e janelas deslizantes usadas no treino,
+    descartando as linhas iniciais sem histórico suficiente.
+
+    Args:
+        df (pd.DataFrame): Dataset diário de preço (saída de run_price_pipeline).
+        window_size (int): Tamanho da janela deslizante.
+
+    Returns:
+        pd.DataFrame: Dataset com as features de PRICE_FEATURES.
+    """
+    df = add_lag_features(df)
+    df = add_rolling_features(
+        df,
+        columns=['ValorUnitarioMedio', 'QuantidadeLiquida'],
+        window_size=window_size
+    )
+    return df.dropna()
@@ -0,0 +1,173 @@
+# Este módulo define o motor Polars (lazy) do pré-processamento: a limpeza, a agregação diária
+# de preço e o dataset de quantidade são descritos como um plano lazy sobre o CSV bruto, e o
+# Polars aplica otimização de consulta, leitura só das colunas usadas e execução multithread.
+# As saídas são DataFrames pandas iguais às de `unified_pipeline.build_datasets`.
+
+import pandas as pd
+from pathlib import Path
+from src.data_processing.clean_data import (
+    DEFAULT_QUANTITY_GRANULARITY, QUANTITY_SUM_COLUMNS, QUANTITY_MEAN_COLUMNS, QUANTITY_MAX_COLUMNS
+)
+from src.data_processing.price_data_pipeline import feature_engineering_for_price
+from src.utils.logging_config import get_logger
+
+try:
+    import polars as pl
+except ImportError:  # Dependência opcional: só é exigida quando o motor 'polars' é escolhido
+    pl = None
+
+logger = get_logger(__name__)
+
+# Motores disponíveis para o pré-processamento
+ENGINES = ('pandas', 'polars')
+
+def require_polars():
+    if pl is None:
+        raise ImportError("O motor 'polars' exige os pacotes polars e pyarrow (pip install -r requirements-dev.txt).")
+
+def _columns(lf):
+    return lf.collect_schema().names()
+
+def parse_sale_datetimes(lf):
+    """
+    Equivalente lazy de `clean_data.parse_sale_datetimes`: converte 'Data', filtra a partir de
+    2019, normaliza 'Hora' e cria 'DataHora', descartando as linhas sem data/hora válidas.
+    """
+    data = pl.col('Data').cast(pl.Utf8)
+    lf = lf.with_columns(
+        pl.coalesce(
+            data.str.to_datetime('%Y-%m-%d %H:%M:%S', strict=False),
+            data.str.to_date('%Y-%m-%d', strict=False).cast(pl.Datetime),
+        ).cast(pl.Datetime('ns')).alias('Data')
+    ).filter(pl.col('Data') >= pl.datetime(2019, 1, 1))
+
+    # 'Hora' pode vir como timedelta textual ("0 days 08:15:00"): mantém só a parte do horário
+    lf = lf.with_columns(pl.col('Hora').cast(pl.Utf8).str.split(' ').list.last().alias('Hora'))
+    lf = lf.with_columns(
+        (pl.col('Data').dt.strftime('%Y-%m-%d') + ' ' + pl.col('Hora'))
+        .str.to_datetime('%Y-%m-%d %H:%M:%S', strict=False)
+        .cast(pl.Datetime('ns'))
+        .alias('DataHora')
+    )
+    return lf.filter(pl.col('DataHora').is_not_null())
+
+def aggregate_daily(lf):
+    """
+    Equivalente lazy de `price_data_pipeline.aggregate_daily` (só as colunas usadas são lidas).
+    """
+    columns = _columns(lf)
+    net = pl.col('Quantidade') - pl.col('QuantDevolvida') if 'QuantDevolvida' in columns else pl.col('Quantidade')
+    lf = lf.with_columns(net.fill_null(0).alias('QuantidadeLiquida'), pl.col('ValorTotal').fill_null(0))
+    lf = lf.with_columns(
+        pl.when(pl.col('QuantidadeLiquida') != 0)
+        .then(pl.col('ValorTotal') / pl.col('QuantidadeLiquida'))
+        .alias('ValorUnitarioMedio')
+    )
+    aggregations = [
+        ('ValorUnitarioMedio', 'mean'),
+        ('QuantidadeLiquida', 'sum'),
+        ('DescontoGeral', 'mean'),
+        ('AcrescimoGeral', 'mean'),
+        ('PrecoemPromocao', 'max'),
+        ('ValorCusto', 'mean'),
+    ]
+    columns = _columns(lf)
+    return lf.group_by(pl.col('Data').dt.truncate('1d')).agg(
+        [getattr(pl.col(col), func)() for col, func in aggregations if col in columns]
+    ).sort('Data')
+
+def clean_and_derive(lf):
+    """
+    Equivalente lazy de `clean_sale_columns` seguido de `feature_engineering` (dataset por venda).
+    """
+    columns = _columns(lf)
+    binary = [c for c in ['VendaCancelada', 'ItemCancelado', 'PrecoemPromocao'] if c in columns]
+    lf = lf.with_columns([pl.col(c).fill_null(0).cast(pl.Int64) for c in binary])
+    lf = lf.with_columns(pl.col('PrecoemPromocao').alias('EmPromocao'))
+    # fillna(0) do pandas: numéricas com 0 e textos com '0' (o mesmo valor gravado no CSV)
+    lf = lf.with_columns(pl.selectors.numeric().fill_null(0), pl.selectors.string().fill_null('0'))
+
+    derived = [
+        pl.col('Data').dt.day().alias('Dia'),
+        (pl.col('Data').dt.weekday() - 1).alias('DiaDaSemana'),  # Polars: segunda = 1; pandas: segunda = 0
+        pl.col('Data').dt.month().alias('Mes'),
+    ]
+    if 'Quantidade' in columns and 'QuantDevolvida' in columns:
+        derived.append((pl.col('Quantidade') - pl.col('QuantDevolvida')).fill_null(0).alias('QuantidadeLiquida'))
+    if 'ValorCusto' in columns and 'ValorUnitario' in columns:
+        derived.append(
+            ((pl.col('ValorUnitario') - pl.col('ValorCusto')) / pl.col('ValorCusto')).fill_nan(0).alias('Rentabilidade')
+        )
+    derived += [
+        (pl.col('DescontoGeral') + pl.col('Desconto')).alias('DescontoAplicado'),
+        (pl.col('AcrescimoGeral') + pl.col('Acrescimo')).alias('AcrescimoAplicado'),
+    ]
+    return lf.with_columns(derived)
+
+def aggregate_quantity(lf, granularity=DEFAULT_QUANTITY_GRANULARITY) -> pd.DataFrame:
+    """
+    Equivalente de `clean_data.aggregate_quantity` sobre o plano lazy: o agrupamento roda no
+    Polars e só o resultado agregado é materializado.
+    """
+    if granularity == 'sale':
+        return lf.collect().to_pandas()
+
+    columns = _columns(lf)
+    sums = [c for c in QUANTITY_SUM_COLUMNS + QUANTITY_MEAN_COLUMNS if c in columns]
+    maxes = [c for c in QUANTITY_MAX_COLUMNS if c in columns]
+    means = [c for c in QUANTITY_MEAN_COLUMNS if c in columns]
+    key = 'DataHora' if granularity == 'hour' else 'Data'
+    period = pl.col('DataHora').dt.truncate('1h') if granularity == 'hour' else pl.col('Data').dt.truncate('1d')
+
+    df = lf.group_by(period.alias(key)).agg(
+        [pl.col(c).sum().cast(pl.Float64) for c in sums]
+        + [pl.len().cast(pl.Float64).alias('Linhas')]
+        + [pl.col(c).max().cast(pl.Float64) for c in maxes]
+    ).sort(key).collect()
+
+    if granularity == 'day' and df.height:
+        # Demanda diária: dias sem venda entram com quantidade zero
+        calendar = pl.DataFrame({key: pl.datetime_range(df[key].min(), df[key].max(), '1d', time_unit='ns', eager=True)})
+        df = calendar.join(df, on=key, how='left').with_columns(
+            [pl.col(c).fill_null(0) for c in ['Linhas'] + [c for c in QUANTITY_SUM_COLUMNS if c in columns] + maxes]
+        )
+
+    df = df.with_columns(
+        [pl.when(pl.col('Linhas') > 0).then(pl.col(c) / pl.col('Linhas')).alias(c) for c in means]
+    ).with_columns(
+        [pl.col(c).forward_fill() for c in ['ValorUnitario', 'ValorCusto'] if c in means]
+    ).with_columns(pl.col(pl.Float64).fill_null(0))
+
+    extra = []
+    if granularity == 'hour':
+        df = df.with_columns(pl.col('DataHora').dt.truncate('1d').alias('Data'))
+        extra.append(pl.col('DataHora').dt.hour().alias('Hora'))
+    df = df.with_columns(extra + [
+        pl.col('Data').dt.day().alias('Dia'),
+        (pl.col('Data').dt.weekday() - 1).alias('DiaDaSemana'),
+        pl.col('Data').dt.month().alias('Mes'),
+    ])
+
+    # Mesma ordem de colunas do caminho pandas
+    order = ['Data'] + (['DataHora'] if granularity == 'hour' else []) + sums + ['Linhas'] + maxes
+    order += (['Hora'] if granularity == 'hour' else []) + ['Dia', 'DiaDaSemana', 'Mes']
+    return df.select(order).to_pandas()
+
+def build_datasets(raw_file_path: Path, granularity=DEFAULT_QUANTITY_GRANULARITY):
+    """
+    Gera os datasets de quantidade e de preço a partir do CSV bruto com o motor Polars.
+
+    Args:
+        raw_file_path (Path): CSV bruto do produto.
+        granularity (str): Granularidade do dataset de quantidade ('sale', 'day' ou 'hour').
+
+    Returns:
+        tuple: (DataFrame de quantidade, DataFrame diário para preço), como `unified_pipeline.build_datasets`.
+    """
+    require_polars()
+    logger.info(f"Pré-processamento com o motor Polars de {raw_file_path}.")
+    base = parse_sale_datetimes(pl.scan_csv(raw_file_path, infer_schema_length=10000))
+
+    df_daily = feature_engineering_for_price(aggregate_daily(base).collect().to_pandas())
+    df_quantity = aggregate_quantity(clean_and_derive(base), granularity)
+    return df_quantity, df_daily
@@ -3,9 +3,21 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from src.utils.logging_config import get_logger
+from src.data_processing.clean_data import (
+    parse_sale_datetimes, add_net_quantity, aggregate_sales, estimate_chunk_size, DEFAULT_MAX_MEMORY_MB
+)
 
 logger = get_logger(__name__)
 
+# Agregações do dataset diário de preço; as médias (que ignoram valores ausentes) são guardadas
+# como soma e contagem de não nulos, para que parciais de chunks diferentes possam ser combinadas
+DAILY_MEAN_COLUMNS = ['ValorUnitarioMedioItem', 'DescontoGeral', 'AcrescimoGeral', 'ValorCusto']
+DAILY_SUM_COLUMNS = ['QuantidadeLiquida']
+DAILY_MAX_COLUMNS = ['PrecoemPromocao']
+# Ordem das colunas do dataset diário
+DAILY_COLUMNS = ['ValorUnitarioMedioItem', 'QuantidadeLiquida', 'DescontoGeral', 'AcrescimoGeral',
+                 'PrecoemPromocao', 'ValorCusto']
+
 def load_raw_data(file_path: Path) -> pd.DataFrame:
     """
     Lê o CSV de dados brutos de vendas para um produto específico.
@@ -22,74 +34,56 @@ def clean_data_for_price(df: pd.DataFrame) -> pd.DataFrame:
     """
     logger.info("Iniciando limpeza de dados para preço.")
 
-    # Remover datas nulas (se tiver)
-    df = df.dropna(subset=['Data'])
-
-    # Ajustar colunas, ex: se Hora ainda tiver '0 days'
-    if 'Hora' in df.columns:
-        df['Hora'] = df['Hora'].apply(lambda x: str(x).split(" ")[-1] if pd.notnull(x) else None)
-
-    # Converter para datetime a coluna 'DataHora'
-    df['DataHora'] = pd.to_datetime(df['Data'].astype(str) + ' ' + df['Hora'], errors='coerce')
-    df = df.dropna(subset=['DataHora'])
+    # Remover datas nulas, ajustar 'Hora', criar 'DataHora' e filtrar datas antigas
+    df = parse_sale_datetimes(df)
 
     # Exemplo: remover vendas canceladas (opcional)
     # df = df[df['VendaCancelada'] == 0]
     # df = df[df['ItemCancelado'] == 0]
 
-    # Aqui você pode filtrar datas mais antigas, etc.
-    df = df[df['Data'] >= pd.to_datetime('2019-01-01')]
-
     # Preencher NaN para colunas importantes
     df['ValorUnitario'] = df['ValorUnitario'].fillna(0)
 
     logger.info("Limpeza de dados para preço concluída.")
     return df
 
-def aggregate_daily(df: pd.DataFrame) -> pd.DataFrame:
+def _daily_price_partials(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Agrupa o dataframe por DIA (df['Data']), calculando o valor médio unitário.
+    Somas, contagens de não nulos e máximos por dia: parciais combináveis entre chunks.
     """
-    logger.info("Iniciando agregação diária para valor unitário.")
-
-    # EXEMPLO de valor médio unitário: soma(ValorTotal) / soma(QuantidadeLiquida) 
-    # ou simplesmente 'mean(ValorUnitario)'. Depende de qual faz mais sentido para você.
-
-    # Antes, criar QuantidadeLiquida se precisar
-    if 'Quantidade' in df.columns and 'QuantDevolvida' in df.columns:
-        df['QuantidadeLiquida'] = df['Quantidade'] - df['QuantDevolvida']
-    else:
-        df['QuantidadeLiquida'] = df['Quantidade']
-
-    df['QuantidadeLiquida'] = df['QuantidadeLiquida'].fillna(0)
-
-    # Valor médio unitário: 
-    # (Opcional) se você quiser uma média simples:
-    #   ValorUnitarioMedio = mean(ValorUnitario)
-    # (Recomendado) se quiser algo mais realista:
-    #   ValorUnitarioMedio = soma(ValorTotal) / soma(QuantidadeLiquida)
+    # QuantidadeLiquida e valor médio do item: soma(ValorTotal) / QuantidadeLiquida de cada linha
+    add_net_quantity(df)
     df['ValorTotal'] = df['ValorTotal'].fillna(0)
     df['ValorUnitarioMedioItem'] = df['ValorTotal'] / df['QuantidadeLiquida'].replace(0, np.nan)
 
-    grouped = df.groupby(df['Data'].dt.date).agg({
-        'ValorUnitarioMedioItem': 'mean',   # média do item do dia
-        'QuantidadeLiquida': 'sum',
-        #'Rentabilidade': 'mean',           # se existir
-        'DescontoGeral': 'mean',           # ou DescontoAplicado etc.
-        'AcrescimoGeral': 'mean',
-        'PrecoemPromocao': 'max',
-        'ValorCusto': 'mean',
-    }).reset_index()
-
-    # Renomear
-    grouped.rename(columns={'ValorUnitarioMedioItem': 'ValorUnitarioMedio'}, inplace=True)
-
-    # Converte a 'Data' de volta pra datetime
-    grouped['Data'] = pd.to_datetime(grouped['Data'])
-    
-    df_2024 = df[df['Data'].dt.year == 2024]
-    #print("Linhas 2024 antes de agrupar:\n", df_2024[['Data', 'QuantidadeLiquida', 'ValorTotal']].head(50))
+    aggregations = {col: 'sum' for col in DAILY_SUM_COLUMNS}
+    aggregations.update({col: 'max' for col in DAILY_MAX_COLUMNS})
+    counts = {}
+    for col in DAILY_MEAN_COLUMNS:
+        if col in df.columns:
+            aggregations[col] = 'sum'
+            aggregations[f'{col}_n'] = 'sum'
+            counts[f'{col}_n'] = df[col].notna().astype(int)
+    return aggregate_sales(df.assign(**counts), aggregations, granularity='day')
+
+def _finalize_daily_price(partials: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combina parciais diárias e converte as somas das colunas de média em médias.
+    """
+    aggregations = {col: 'max' if col in DAILY_MAX_COLUMNS else 'sum' for col in partials.columns if col != 'Data'}
+    grouped = partials.groupby('Data').agg(aggregations).sort_index()
+    for col in DAILY_MEAN_COLUMNS:
+        if col in grouped.columns:
+            grouped[col] = grouped[col] / grouped.pop(f'{col}_n').replace(0, np.nan)
+    grouped = grouped[[col for col in DAILY_COLUMNS if col in grouped.columns]].reset_index()
+    return grouped.rename(columns={'ValorUnitarioMedioItem': 'ValorUnitarioMedio'})
 
+def aggregate_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrupa o dataframe por DIA (df['Data']), calculando o valor médio unitário.
+    """
+    logger.info("Iniciando agregação diária para valor unitário.")
+    grouped = _finalize_daily_price(_daily_price_partials(df))
     logger.info("Agregação diária concluída.")
     return grouped
 
@@ -129,6 +123,7 @@ def save_price_dataset(df: pd.DataFrame, output_file: Path):
 def run_price_pipeline(raw_file_path: Path, output_file_path: Path):
     """
     Roda todo o fluxo: carrega dados brutos -> imprime pré-limpeza -> limpa -> agrega -> feature eng. -> salva CSV final.
+    Retorna o número de dias gravados no dataset de preço.
     """
     df = load_raw_data(raw_file_path)
     
@@ -145,6 +140,30 @@ def run_price_pipeline(raw_file_path: Path, output_file_path: Path):
     df_daily = aggregate_daily(df_clean)
     df_feats = feature_engineering_for_price(df_daily)
     save_price_dataset(df_feats, output_file_path)
+    return len(df_feats)
+
+def run_price_pipeline_chunked(raw_file_path: Path, output_file_path: Path, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+    """
+    Versão em chunks de `run_price_pipeline` para produtos que excedem o teto de memória:
+    cada chunk vira parciais diárias (somas, contagens e máximos), combinadas no final.
+
+    Retorna o número de dias gravados no dataset de preço.
+    """
+    chunk_size = estimate_chunk_size(raw_file_path, max_memory_mb)
+    logger.info(f"Agregando {raw_file_path} por dia em chunks de {chunk_size} linhas (teto de {max_memory_mb} MB).")
+
+    partials = []
+    for chunk in pd.read_csv(raw_file_path, chunksize=chunk_size):
+        chunk = parse_sale_datetimes(chunk)
+        if not chunk.empty:
+            partials.append(_daily_price_partials(chunk))
+    if not partials:
+        logger.warning(f"Nenhuma venda válida em {raw_file_path} para o dataset de preço.")
+        return 0
+
+    df_feats = feature_engineering_for_price(_finalize_daily_price(pd.concat(partials, ignore_index=True)))
+    save_price_dataset(df_feats, output_file_path)
+    return len(df_feats)
 
 def add_holiday_features(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -29,17 +29,17 @@ def extract_raw_data(db_manager: DatabaseManager, produto_especifico: int) -> pd
     WHERE vp.CodigoProduto = :produto_especifico AND v.Status IN ('f', 'x')
     """
     try:
-        # Executa a query usando o DatabaseManager
-        result = db_manager.execute_query(query, params={'produto_especifico': produto_especifico})
+        # Executa a query usando o DatabaseManager (na réplica local, se configurada)
+        result = db_manager.execute_query(query, params={'produto_especifico': produto_especifico}, local=True)
         if result['data']:
             df = pd.DataFrame(result['data'], columns=result['columns'])
-            logger.info(f"Dados do produto {produto_especifico} extraídos com sucesso.")
+            logger.info("Dados do produto %s extraídos com sucesso (%d linhas).", produto_especifico, len(df))
             return df
         else:
-            logger.warning(f"Nenhum dado encontrado para o produto {produto_especifico}.")
+            logger.warning("Nenhum dado encontrado para o produto %s.", produto_especifico)
             return pd.DataFrame()
     except Exception as e:
-        logger.error(f"Erro ao extrair dados: {e}")
+        logger.error("Erro ao extrair dados: %s", e)
         return pd.DataFrame()
 
 def save_raw_data(df: pd.DataFrame, produto_especifico: int, output_dir: Path):
@@ -0,0 +1,236 @@
+# Este módulo detecta episódios de promoção em todo o catálogo: dias em que o preço médio
+# de venda caiu abaixo do preço de referência do produto sem mudança correspondente no custo.
+# Os episódios são gravados de forma incremental na tabela `promocoes`.
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from src.services.database import DatabaseManager
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Janela (dias corridos anteriores ao dia) do preço e do custo de referência (medianas)
+REFERENCE_WINDOW_DAYS = 56
+# Dias com venda mínimos na janela para haver referência
+MIN_REFERENCE_DAYS = 7
+# Queda mínima do preço em relação à referência para caracterizar promoção
+MIN_DISCOUNT = 0.05
+# Variação máxima do custo em relação à referência (acima disso a queda é repasse de custo)
+MAX_COST_CHANGE = 0.03
+# Intervalo máximo (dias) entre dias promocionais do mesmo episódio
+MAX_GAP_DAYS = 3
+# Tamanho (dias) de cada faixa de datas agregada no banco
+CHUNK_DAYS = 90
+
+PROMOTIONS_DDL = """
+CREATE TABLE IF NOT EXISTS promocoes (
+    CodigoProduto INT NOT NULL,
+    DataInicio DATE NOT NULL,
+    DataFim DATE NOT NULL,
+    DiasComVenda INT NOT NULL,
+    PrecoReferencia DECIMAL(12, 4),
+    PrecoMedioPromocao DECIMAL(12, 4),
+    DescontoMedio DECIMAL(8, 4),
+    QuantidadeTotal DECIMAL(14, 3),
+    ReceitaTotal DECIMAL(14, 2),
+    ParcelaFlagPromocao DECIMAL(5, 4),
+    DetectadoEm VARCHAR(32) NOT NULL,
+    PRIMARY KEY (CodigoProduto, DataInicio)
+)
+"""
+
+PROMOTIONS_STATE_DDL = """
+CREATE TABLE IF NOT EXISTS promocoes_estado (
+    chave VARCHAR(32) PRIMARY KEY,
+    ultima_data VARCHAR(10) NOT NULL
+)
+"""
+
+# Agregação diária por produto empurrada para o banco (uma faixa de datas por consulta)
+DAILY_PRODUCT_QUERY = """
+SELECT
+    vp.CodigoProduto,
+    v.Data,
+    SUM(vp.ValorTotal) AS ValorTotal,
+    SUM(vp.Quantidade - IFNULL(vp.QuantDevolvida, 0)) AS QuantidadeLiquida,
+    AVG(vp.ValorCusto) AS ValorCusto,
+    MAX(IFNULL(vp.PrecoemPromocao, 0)) AS PrecoemPromocao
+FROM vendasprodutos vp
+INNER JOIN vendas v ON vp.CodigoVenda = v.Codigo
+WHERE v.Status IN ('f', 'x') AND v.Data >= :inicio AND v.Data < :fim
+GROUP BY vp.CodigoProduto, v.Data
+"""
+
+def load_daily_sales(db_manager: DatabaseManager, start, end, chunk_days=CHUNK_DAYS, query=DAILY_PRODUCT_QUERY) -> pd.DataFrame:
+    """
+    Carrega as vendas diárias de todos os produtos entre `start` e `end` (inclusive), em faixas de datas.
+
+    `query` pode trocar a agregação (com os mesmos parâmetros :inicio e :fim), ex.: para incluir
+    colunas de hierarquia.
+
+    Returns:
+        pd.DataFrame: CodigoProduto, Data, ValorTotal, QuantidadeLiquida, ValorCusto e PrecoemPromocao.
+    """
+    frames = []
+    chunk_start = pd.Timestamp(start)
+    end = pd.Timestamp(end)
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + pd.Timedelta(chunk_days, unit='D'), end + pd.Timedelta(1, unit='D'))
+        result = db_manager.execute_query(query, params={
+            'inicio': chunk_start.strftime('%Y-%m-%d'), 'fim': chunk_end.strftime('%Y-%m-%d'),
+        }, local=True)
+        if result['data']:
+            frames.append(pd.DataFrame(result['data'], columns=result['columns']))
+        chunk_start = chunk_end
+
+    if not frames:
+        return pd.DataFrame(columns=['CodigoProduto', 'Data', 'ValorTotal', 'QuantidadeLiquida', 'ValorCusto', 'PrecoemPromocao'])
+
+    df = pd.concat(frames, ignore_index=True)
+    df['Data'] = pd.to_datetime(df['Data'])
+    for col in ['ValorTotal', 'QuantidadeLiquida', 'ValorCusto', 'PrecoemPromocao']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    logger.info("Vendas diárias carregadas: %d linhas de %d produtos.", len(df), df['CodigoProduto'].nunique())
+    return df
+
+def _rolling_reference(df: pd.DataFrame, column):
+    """
+    Mediana de `column` nos REFERENCE_WINDOW_DAYS anteriores ao dia (sem incluí-lo), por produto.
+    """
+    reference = (
+        df.groupby('CodigoProduto')
+        .rolling(f'{REFERENCE_WINDOW_DAYS}D', on='Data', closed='left', min_periods=MIN_REFERENCE_DAYS)[column]
+        .median()
+    )
+    return reference.reset_index(level=0, drop=True).reindex(df.index)
+
+def detect_promotions(df_daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Detecta episódios de promoção em todos os produtos de uma vez.
+
+    Um dia é promocional quando o preço médio (receita / quantidade líquida) está pelo menos
+    MIN_DISCOUNT abaixo da mediana dos dias anteriores e o custo não variou mais que
+    MAX_COST_CHANGE em relação à sua mediana. Dias promocionais do mesmo produto separados por
+    até MAX_GAP_DAYS formam um episódio.
+
+    Args:
+        df_daily (pd.DataFrame): Saída de `load_daily_sales`.
+
+    Returns:
+        pd.DataFrame: Um episódio por linha, com as colunas da tabela `promocoes`.
+    """
+    df = df_daily.sort_values(['CodigoProduto', 'Data']).reset_index(drop=True)
+    quantity = df['QuantidadeLiquida'].to_numpy()
+    df['Preco'] = np.where(quantity > 0, df['ValorTotal'].to_numpy() / np.where(quantity > 0, quantity, 1), np.nan)
+    df['PrecoReferencia'] = _rolling_reference(df, 'Preco')
+    df['CustoReferencia'] = _rolling_reference(df, 'ValorCusto')
+
+    discount = 1 - df['Preco'] / df['PrecoReferencia']
+    cost_change = (df['ValorCusto'] / df['CustoReferencia'] - 1).abs()
+    cost_stable = (df['CustoReferencia'].fillna(0) <= 0) | (cost_change <= MAX_COST_CHANGE)
+    promo = df[(discount >= MIN_DISCOUNT).to_numpy() & cost_stable.to_numpy()].copy()
+    if promo.empty:
+        return pd.DataFrame()
+    promo['Desconto'] = discount[promo.index]
+
+    # Novo episódio quando muda o produto ou o intervalo desde o dia promocional anterior excede o limite
+    same_product = promo['CodigoProduto'].eq(promo['CodigoProduto'].shift())
+    close = promo['Data'].diff() <= pd.Timedelta(MAX_GAP_DAYS, unit='D')
+    promo['Episodio'] = (~(same_product & close)).cumsum()
+
+    episodes = promo.groupby('Episodio').agg(
+        CodigoProduto=('CodigoProduto', 'first'),
+        DataInicio=('Data', 'min'),
+        DataFim=('Data', 'max'),
+        DiasComVenda=('Data', 'count'),
+        PrecoReferencia=('PrecoReferencia', 'mean'),
+        DescontoMedio=('Desconto', 'mean'),
+        QuantidadeTotal=('QuantidadeLiquida', 'sum'),
+        ReceitaTotal=('ValorTotal', 'sum'),
+        ParcelaFlagPromocao=('PrecoemPromocao', 'mean'),
+    ).reset_index(drop=True)
+    episodes['PrecoMedioPromocao'] = episodes['ReceitaTotal'] / episodes['QuantidadeTotal']
+    episodes['CodigoProduto'] = episodes['CodigoProduto'].astype(int)
+    return episodes
+
+def _get_state(connection):
+    row = connection.execute(text("SELECT ultima_data FROM promocoes_estado WHERE chave = 'vendas'")).fetchone()
+    return pd.Timestamp(row[0]) if row else None
+
+def _set_state(connection, last_date):
+    connection.execute(text("DELETE FROM promocoes_estado WHERE chave = 'vendas'"))
+    connection.execute(
+        text("INSERT INTO promocoes_estado (chave, ultima_data) VALUES ('vendas', :d)"),
+        {'d': last_date.strftime('%Y-%m-%d')}
+    )
+
+def run_promotion_detection(db_manager: DatabaseManager, full=False):
+    """
+    Atualiza a tabela `promocoes` com os episódios detectados desde a última execução.
+
+    Na primeira execução (ou com `full=True`) todo o histórico é processado. Nas seguintes, os
+    episódios que ainda podem crescer (terminados a menos de MAX_GAP_DAYS do último dia
+    processado) são apagados e redetectados junto com os dias novos; o histórico carregado
+    recua REFERENCE_WINDOW_DAYS para recompor os preços de referência.
+
+    Args:
+        db_manager (DatabaseManager): Gerenciador do banco de dados (lê da réplica local, se configurada).
+        full (bool): Reprocessa todo o histórico.
+
+    Returns:
+        int: Número de episódios gravados.
+    """
+    with db_manager.engine.begin() as connection:
+        connection.execute(text(PROMOTIONS_DDL))
+        connection.execute(text(PROMOTIONS_STATE_DDL))
+        last_date = None if full else _get_state(connection)
+        keep_from = None
+        if last_date is not None:
+            keep_from = last_date - timedelta(days=MAX_GAP_DAYS)
+            open_start = connection.execute(
+                text("SELECT MIN(DataInicio) FROM promocoes WHERE DataFim >= :d"),
+                {'d': keep_from.strftime('%Y-%m-%d')}
+            ).fetchone()[0]
+            rescan_start = min(keep_from, pd.Timestamp(open_start)) if open_start else keep_from
+
+    bounds = db_manager.execute_query("SELECT MIN(Data), MAX(Data) FROM vendas", local=True, use_cache=False)['data'][0]
+    if bounds[1] is None:
+        logger.warning("Nenhuma venda encontrada para a detecção de promoções.")
+        return 0
+    end = pd.Timestamp(bounds[1])
+    start = pd.Timestamp(bounds[0]) if keep_from is None else rescan_start - timedelta(days=REFERENCE_WINDOW_DAYS)
+
+    logger.info("Detectando promoções de %s a %s.", start.date(), end.date())
+    episodes = detect_promotions(load_daily_sales(db_manager, start, end))
+    if keep_from is not None and not episodes.empty:
+        episodes = episodes[episodes['DataFim'] >= keep_from]
+
+    with db_manager.engine.begin() as connection:
+        if keep_from is None:
+            connection.execute(text("DELETE FROM promocoes"))
+        else:
+            connection.execute(text("DELETE FROM promocoes WHERE DataFim >= :d"), {'d': keep_from.strftime('%Y-%m-%d')})
+        if not episodes.empty:
+            episodes = episodes.assign(
+                DataInicio=episodes['DataInicio'].dt.strftime('%Y-%m-%d'),
+                DataFim=episodes['DataFim'].dt.strftime('%Y-%m-%d'),
+                DetectadoEm=pd.Timestamp.now().isoformat(timespec='seconds'),
+            )
+            episodes.to_sql('promocoes', connection, if_exists='append', index=False, chunksize=10_000)
+        _set_state(connection, end)
+
+    logger.info("%d episódios de promoção gravados (vendas até %s).", len(episodes), end.date())
+    return len(episodes)
+
+def main():
+    db_manager = DatabaseManager()
+    try:
+        run_promotion_detection(db_manager)
+    finally:
+        db_manager.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from workalendar.america import Brazil
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Peso relativo de vendas por dia da semana (segunda=0 ... domingo=6)
+WEEKDAY_WEIGHTS = np.array([0.85, 0.80, 0.90, 0.95, 1.15, 1.40, 0.95])
+# Peso relativo de vendas por mês (janeiro=0 ... dezembro=11)
+MONTH_WEIGHTS = np.array([0.95, 0.90, 0.95, 1.00, 1.00, 0.95, 1.00, 1.00, 0.95, 1.00, 1.10, 1.35])
+# Multiplicador de vendas nas vésperas (1 a 3 dias) de feriados
+HOLIDAY_EVE_BOOST = 1.5
+
+PREDICTIONS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS indicadores_vendas_produtos_previsoes (
+    DATA DATETIME NOT NULL,
+    CodigoProduto INTEGER NOT NULL,
+    TotalUNVendidas DECIMAL(12, 2),
+    ValorTotalVendido DECIMAL(14, 2),
+    Promocao INTEGER,
+    PRIMARY KEY (DATA, CodigoProduto)
+)
+"""
+
+def _daily_weights(days: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Calcula o peso de vendas de cada dia (sazonalidade semanal, mensal e vésperas de feriado).
+    """
+    cal = Brazil()
+    holidays = set()
+    for year in days.year.unique():
+        holidays.update(pd.Timestamp(dt) for dt, _ in cal.holidays(int(year)))
+
+    holiday_index = pd.DatetimeIndex(sorted(holidays))
+    is_eve = np.zeros(len(days), dtype=bool)
+    for delta in range(1, 4):
+        is_eve |= (days + pd.Timedelta(delta, unit='D')).isin(holiday_index)
+
+    weights = WEEKDAY_WEIGHTS[days.dayofweek] * MONTH_WEIGHTS[days.month - 1]
+    weights = np.where(is_eve, weights * HOLIDAY_EVE_BOOST, weights)
+    # Feriados propriamente ditos têm movimento reduzido
+    weights = np.where(days.isin(holiday_index), weights * 0.5, weights)
+    return weights / weights.sum()
+
+def _promotion_calendar(rng, n_products, n_days, promo_share=0.12, mean_length=7):
+    """
+    Gera uma matriz (produtos x dias) indicando os dias em que cada produto esteve em promoção.
+    """
+    promo = np.zeros((n_products, n_days), dtype=bool)
+    n_episodes = max(1, int(n_days * promo_share / mean_length))
+    starts = rng.integers(0, n_days, size=(n_products, n_episodes))
+    lengths = rng.poisson(mean_length, size=(n_products, n_episodes)) + 1
+
+    for p in range(n_products):
+        for start, length in zip(starts[p], lengths[p]):
+            promo[p, start:start + length] = True
+    return promo
+
+def generate_synthetic_sales(n_products=10, n_rows=100_000, start='2019-01-01', end='2024-03-31',
+                             items_per_sale=3.0, seed=42):
+    """
+    Gera dados sintéticos no formato das tabelas `vendas` e `vendasprodutos`.
+
+    Os dados incluem sazonalidade semanal/mensal, vésperas de feriados, episódios de
+    promoção (`PrecoemPromocao`) com aumento de volume, devoluções e cancelamentos.
+
+    Args:
+        n_products (int): Número de produtos distintos.
+        n_rows (int): Número aproximado de linhas em `vendasprodutos`.
+        start (str): Data inicial.
+        end (str): Data final.
+        items_per_sale (float): Média de itens por venda (cupom).
+        seed (int): Semente do gerador aleatório.
+
+    Returns:
+        tuple: (DataFrame de `vendas`, DataFrame de `vendasprodutos`).
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start, end, freq='D')
+    n_days = len(days)
+
+    produtos = np.arange(1, n_products + 1) * 100 + 73
+    base_price = np.round(rng.lognormal(mean=2.0, sigma=0.8, size=n_products), 2)
+    cost_ratio = rng.uniform(0.60, 0.85, size=n_products)
+    discount = rng.choice([0.10, 0.15, 0.20, 0.30], size=n_products)
+    uplift = rng.uniform(1.5, 3.0, size=n_products)
+    popularity = rng.pareto(1.2, size=n_products) + 1
+    popularity /= popularity.sum()
+    promo = _promotion_calendar(rng, n_products, n_days)
+
+    # Hierarquia de produto fixa por produto
+    secao = rng.integers(1, 20, size=n_products)
+    grupo = secao * 100 + rng.integers(1, 10, size=n_products)
+    subgrupo = grupo * 100 + rng.integers(1, 10, size=n_products)
+    fabricante = rng.integers(1, 500, size=n_products)
+    fornecedor = rng.integers(1, 300, size=n_products)
+
+    # Cupons (vendas)
+    n_sales = max(1, int(n_rows / items_per_sale))
+    sale_day = rng.choice(n_days, size=n_sales, p=_daily_weights(days))
+    sale_seconds = np.clip(rng.normal(15 * 3600, 3 * 3600, size=n_sales), 7 * 3600, 22 * 3600).astype(int)
+    sale_status = rng.choice(np.array(['f', 'x', 'c']), size=n_sales, p=[0.93, 0.05, 0.02])
+    sale_cancelled = (sale_status == 'c') | (rng.random(n_sales) < 0.005)
+
+    # Itens: sorteia mais linhas e descarta as de dias sem promoção, para produzir o aumento de volume
+    max_uplift = uplift.max()
+    expected_keep = (promo.mean() * uplift.mean() + (1 - promo.mean())) / max_uplift
+    n_candidates = int(n_rows / expected_keep * 1.1)
+    item_sale = rng.integers(0, n_sales, size=n_candidates)
+    item_product = rng.choice(n_products, size=n_candidates, p=popularity)
+    item_day = sale_day[item_sale]
+    item_promo = promo[item_product, item_day]
+    keep_prob = np.where(item_promo, uplift[item_product], 1.0) / max_uplift
+    keep = rng.random(n_candidates) < keep_prob
+    item_sale, item_product, item_day, item_promo = (
+        item_sale[keep][:n_rows], item_product[keep][:n_rows], item_day[keep][:n_rows], item_promo[keep][:n_rows]
+    )
+    n_items = len(item_sale)
+
+    # Preço com inflação lenta e custo com reajustes esporádicos
+    inflation = 1 + 0.0002 * item_day
+    unit_price = base_price[item_product] * inflation
+    unit_price = np.round(np.where(item_promo, unit_price * (1 - discount[item_product]), unit_price), 2)
+    cost = np.round(base_price[item_product] * cost_ratio[item_product] * (1 + 0.0002 * (item_day // 90) * 90), 2)
+
+    quantity = rng.geometric(0.7, size=n_items).astype(float)
+    returned = np.where(rng.random(n_items) < 0.01, np.minimum(quantity, 1), 0)
+    item_cancelled = rng.random(n_items) < 0.01
+    item_discount = np.round(np.where(rng.random(n_items) < 0.05, unit_price * quantity * 0.05, 0), 2)
+    total = np.round(unit_price * quantity - item_discount, 2)
+
+    vendasprodutos = pd.DataFrame({
+        'CodigoVenda': item_sale + 1,
+        'CodigoProduto': produtos[item_product],
+        'Quantidade': quantity,
+        'ValorUnitario': unit_price,
+        'ValorTotal': total,
+        'Desconto': item_discount,
+        'Acrescimo': 0.0,
+        'Cancelada': item_cancelled.astype(int),
+        'QuantDevolvida': returned,
+        'PrecoemPromocao': item_promo.astype(int),
+        'CodigoSecao': secao[item_product],
+        'CodigoGrupo': grupo[item_product],
+        'CodigoSubGrupo': subgrupo[item_product],
+        'CodigoFabricante': fabricante[item_product],
+        'ValorCusto': cost,
+        'ValorCustoGerencial': cost,
+        'CodigoFornecedor': fornecedor[item_product],
+        'CodigoKitPrincipal': 0,
+        'ValorKitPrincipal': 0.0,
+    })
+
+    totals = np.bincount(item_sale, weights=total, minlength=n_sales)
+    costs = np.bincount(item_sale, weights=cost * quantity, minlength=n_sales)
+    vendas = pd.DataFrame({
+        'Codigo': np.arange(1, n_sales + 1),
+        'Data': days[sale_day].strftime('%Y-%m-%d'),
+        'Hora': pd.to_datetime(sale_seconds, unit='s').strftime('%H:%M:%S'),
+        'Status': sale_status,
+        'Cancelada': sale_cancelled.astype(int),
+        'TotalPedido': np.round(totals, 2),
+        'DescontoGeral': np.where(rng.random(n_sales) < 0.02, np.round(totals * 0.03, 2), 0.0),
+        'AcrescimoGeral': 0.0,
+        'TotalCusto': np.round(costs, 2),
+    })
+
+    logger.info(f"Dados sintéticos gerados: {len(vendas)} vendas, {n_items} itens, {n_products} produtos.")
+    return vendas, vendasprodutos
+
+def write_synthetic_database(db_manager, n_products=10, n_rows=100_000, seed=42, chunksize=50_000):
+    """
+    Grava dados sintéticos em um banco local (ex.: SQLite) com as tabelas usadas pelo pipeline.
+
+    Cria `vendas`, `vendasprodutos`, `produtosmaisvendidos` e `indicadores_vendas_produtos_previsoes`.
+
+    Args:
+        db_manager (DatabaseManager): Gerenciador apontando para o banco local.
+        n_products (int): Número de produtos distintos.
+        n_rows (int): Número aproximado de linhas em `vendasprodutos`.
+        seed (int): Semente do gerador aleatório.
+        chunksize (int): Linhas por lote na gravação.
+
+    Returns:
+        list: Códigos dos produtos gerados, do mais vendido para o menos vendido.
+    """
+    vendas, vendasprodutos = generate_synthetic_sales(n_products=n_products, n_rows=n_rows, seed=seed)
+
+    vendas.to_sql('vendas', db_manager.engine, if_exists='replace', index=False, chunksize=chunksize)
+    vendasprodutos.to_sql('vendasprodutos', db_manager.engine, if_exists='replace', index=False, chunksize=chunksize)
+
+    ranking = vendasprodutos['CodigoProduto'].value_counts()
+    pd.DataFrame({'CodigoProduto': ranking.index, 'TotalVendas': ranking.values}).to_sql(
+        'produtosmaisvendidos', db_manager.engine, if_exists='replace', index=False
+    )
+
+    with db_manager.engine.begin() as connection:
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_vp_produto ON vendasprodutos (CodigoProduto)"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_vendas_codigo ON vendas (Codigo)"))
+        connection.execute(text("DROP TABLE IF EXISTS indicadores_vendas_produtos_previsoes"))
+        connection.execute(text(PREDICTIONS_TABLE_DDL))
+
+    logger.info(f"Banco sintético gravado com {len(vendasprodutos)} itens.")
+    return ranking.index.tolist()
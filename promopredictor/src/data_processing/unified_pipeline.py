@@ -0,0 +1,86 @@
+import os
+import pandas as pd
+from pathlib import Path
+from src.data_processing.clean_data import (
+    parse_sale_datetimes, clean_sale_columns, feature_engineering, aggregate_quantity, process_clean_data,
+    DEFAULT_MAX_MEMORY_MB, DEFAULT_QUANTITY_GRANULARITY
+)
+from src.data_processing.price_data_pipeline import (
+    aggregate_daily, feature_engineering_for_price, save_price_dataset, run_price_pipeline_chunked
+)
+from src.data_processing import polars_engine
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Colunas usadas por aggregate_daily; só elas são copiadas para o ramo de preço
+PRICE_COLUMNS = [
+    'Data', 'Quantidade', 'QuantDevolvida', 'ValorTotal',
+    'DescontoGeral', 'AcrescimoGeral', 'PrecoemPromocao', 'ValorCusto',
+]
+
+def build_datasets(df_raw: pd.DataFrame, granularity=DEFAULT_QUANTITY_GRANULARITY):
+    """
+    Limpa os dados brutos uma única vez e gera os datasets de quantidade e de preço.
+
+    Args:
+        df_raw (pd.DataFrame): Dados brutos de vendas de um produto.
+        granularity (str): Granularidade do dataset de quantidade ('sale', 'day' ou 'hour').
+
+    Returns:
+        tuple: (DataFrame de quantidade na granularidade pedida, DataFrame diário para preço).
+    """
+    logger.info("Iniciando pré-processamento unificado.")
+    df_base = parse_sale_datetimes(df_raw)
+
+    # Ramo de preço: apenas as colunas necessárias, antes do fillna(0) global da quantidade,
+    # para que as médias diárias continuem ignorando valores ausentes.
+    df_price = df_base[[c for c in PRICE_COLUMNS if c in df_base.columns]].copy()
+    df_daily = feature_engineering_for_price(aggregate_daily(df_price))
+    del df_price
+
+    # Ramo de quantidade: reaproveita o frame já filtrado por data
+    df_quantity = aggregate_quantity(feature_engineering(clean_sale_columns(df_base)), granularity)
+
+    logger.info("Pré-processamento unificado concluído.")
+    return df_quantity, df_daily
+
+def run_unified_pipeline(produto_especifico, base_dir: Path, max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+                         granularity=DEFAULT_QUANTITY_GRANULARITY, engine='pandas'):
+    """
+    Lê o CSV bruto uma vez e salva o dataset de quantidade (por venda, dia ou hora) e o diário (preço).
+
+    Produtos cujo CSV bruto excede `max_memory_mb` seguem pelos pipelines separados, ambos em
+    chunks (parciais por período combinadas no final), com memória limitada pelo teto. Com `engine='polars'` o CSV é lido por um
+    plano lazy (só as colunas usadas, em paralelo) e o limite de memória não se aplica.
+
+    Args:
+        produto_especifico (int): Código do produto.
+        base_dir (Path): Diretório base contendo os subdiretórios `raw` e `cleaned`.
+        max_memory_mb (int): Teto de memória (MB) para carregar o produto inteiro.
+        granularity (str): Granularidade do dataset de quantidade ('sale', 'day' ou 'hour').
+        engine (str): Motor do pré-processamento ('pandas' ou 'polars'); as saídas são iguais.
+
+    Returns:
+        tuple: (linhas do dataset de quantidade, dias do dataset de preço).
+    """
+    raw_file_path = base_dir / "raw" / f"produto_{produto_especifico}.csv"
+    quantity_path = base_dir / "cleaned" / f"produto_{produto_especifico}_clean.csv"
+    price_path = base_dir / "cleaned" / f"produto_{produto_especifico}_price.csv"
+
+    if engine == 'polars':
+        df_quantity, df_daily = polars_engine.build_datasets(raw_file_path, granularity)
+    elif os.path.getsize(raw_file_path) > max_memory_mb * 1024 * 1024:
+        logger.info(f"Produto {produto_especifico} excede {max_memory_mb} MB; usando pipelines separados.")
+        price_rows = run_price_pipeline_chunked(raw_file_path, price_path, max_memory_mb)
+        quantity_rows = process_clean_data(produto_especifico, base_dir, streaming=True, max_memory_mb=max_memory_mb,
+                                           granularity=granularity)
+        return quantity_rows, price_rows
+    else:
+        logger.info(f"Lendo dados brutos de {raw_file_path}")
+        df_quantity, df_daily = build_datasets(pd.read_csv(raw_file_path), granularity)
+
+    save_price_dataset(df_daily, price_path)
+    df_quantity.to_csv(quantity_path, index=False, sep=',')
+    logger.info(f"Dados processados salvos em {quantity_path}.")
+    return len(df_quantity), len(df_daily)
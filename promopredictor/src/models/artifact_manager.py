@@ -0,0 +1,267 @@
+# Este módulo gerencia os artefatos dos projetos AutoKeras (diretórios do tuner): cada projeto
+# mantém o modelo exportado e um resumo compacto das trials (hiperparâmetros e scores, para
+# warm start), e os checkpoints das demais trials são removidos ou arquivados conforme a
+# política de retenção. O relatório informa o espaço liberado por projeto.
+
+import argparse
+import json
+import shutil
+import tarfile
+import time
+import pandas as pd
+from pathlib import Path
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+MODELS_DIR = Path(__file__).parent.parent.parent / "models"
+ARCHIVE_DIR = MODELS_DIR / "archive"
+
+# Subdiretórios de models/ com projetos AutoKeras
+GC_KINDS = ('quantity', 'price', 'hierarchical')
+# Trials (as de melhor score) cujos checkpoints são mantidos em cada projeto
+KEEP_BEST_TRIALS = 1
+# Projetos alterados há menos dias que isso não são tocados (podem estar em treino)
+MIN_AGE_DAYS = 1
+# Projetos sem modelo exportado e parados há mais dias que isso são considerados abandonados
+ORPHAN_AGE_DAYS = 30
+# Dias que os arquivos .tar.gz de trials podadas ficam em models/archive
+ARCHIVE_RETENTION_DAYS = 30
+
+# Resumo compacto das trials gravado na raiz do projeto
+TRIALS_SUMMARY = 'trials_summary.json'
+# Arquivos do tuner mantidos em toda trial (o oracle relê o trial.json ao retomar o projeto)
+TRIAL_KEEP_FILES = {'trial.json'}
+
+def find_projects(kinds=GC_KINDS):
+    """
+    Diretórios de projeto AutoKeras (os que têm oracle.json) dentro de models/<tipo>.
+
+    Returns:
+        list: Tuplas (tipo, diretório do projeto).
+    """
+    projects = []
+    for kind in kinds:
+        base = MODELS_DIR / kind
+        if base.exists():
+            projects += [(kind, oracle.parent) for oracle in sorted(base.rglob('oracle.json'))]
+    return projects
+
+def exported_model(project_dir: Path):
+    """
+    Modelo exportado (.keras) do projeto, conforme o layout de cada treino: ao lado do projeto
+    (quantidade), no diretório do produto que contém o projeto '_tuner' (preço), dentro do
+    projeto (layout antigo do preço) ou ao lado, sem o sufixo '_tuner' (hierárquico).
+    """
+    candidates = [
+        Path(f"{project_dir}.keras"),
+        project_dir.parent / f"{project_dir.parent.name}.keras",
+        project_dir / f"{project_dir.name}.keras",
+        project_dir.parent / f"{project_dir.name.removesuffix('_tuner')}.keras",
+    ]
+    return next((path for path in candidates if path.exists()), None)
+
+def _size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+def _last_modified(path: Path) -> float:
+    return max([path.stat().st_mtime] + [f.stat().st_mtime for f in path.rglob('*')])
+
+def read_trials(project_dir: Path):
+    """
+    Lê o trial.json de cada trial do projeto.
+
+    Returns:
+        list: Dicionários com trial_id, status, score, best_step e hiperparâmetros,
+        ordenados do melhor para o pior score (sem score por último).
+    """
+    trials = []
+    for trial_file in project_dir.glob('trial_*/trial.json'):
+        try:
+            with open(trial_file, encoding='utf-8') as f:
+                trial = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Trial ilegível em {trial_file}: {e}")
+            continue
+        trials.append({
+            'trial_id': trial.get('trial_id', trial_file.parent.name.removeprefix('trial_')),
+            'dir': trial_file.parent.name,
+            'status': trial.get('status'),
+            'score': trial.get('score'),
+            'best_step': trial.get('best_step'),
+            'hyperparameters': trial.get('hyperparameters', {}).get('values', {}),
+        })
+
+    direction = _objective_direction(project_dir)
+    ranked = sorted((t for t in trials if t['score'] is not None),
+                    key=lambda t: t['score'], reverse=direction == 'max')
+    return ranked + [t for t in trials if t['score'] is None]
+
+def _objective_direction(project_dir: Path) -> str:
+    """
+    Direção do objetivo do oracle ('min' para val_loss, o padrão do AutoKeras).
+    """
+    try:
+        with open(project_dir / 'oracle.json', encoding='utf-8') as f:
+            objective = json.load(f).get('objective') or {}
+        return objective.get('direction', 'min') if isinstance(objective, dict) else 'min'
+    except (OSError, json.JSONDecodeError):
+        return 'min'
+
+def write_trials_summary(project_dir: Path, trials, model_path=None):
+    """
+    Grava o resumo compacto das trials (hiperparâmetros e scores) na raiz do projeto.
+    """
+    summary = {
+        'projeto': project_dir.name,
+        'modelo_exportado': model_path.name if model_path else None,
+        'objetivo': _objective_direction(project_dir),
+        'compactado_em': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'trials': [{k: v for k, v in trial.items() if k != 'dir'} for trial in trials],
+    }
+    with open(project_dir / TRIALS_SUMMARY, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+
+def _archive(paths, archive_path: Path, root: Path):
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(archive_path, 'w:gz') as tar:
+        for path in paths:
+            tar.add(path, arcname=str(path.relative_to(root)))
+
+def _remove(paths):
+    for path in paths:
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink(missing_ok=True)
+
+def compact_project(kind, project_dir: Path, keep_best=KEEP_BEST_TRIALS, min_age_days=MIN_AGE_DAYS,
+                    orphan_age_days=ORPHAN_AGE_DAYS, archive=False, dry_run=False):
+    """
+    Aplica a política de retenção a um projeto AutoKeras.
+
+    Com modelo exportado: grava o resumo das trials e poda os checkpoints de todas as trials
+    fora das `keep_best` melhores (o trial.json de cada uma é mantido) e o `best_model` do
+    tuner, que o modelo exportado substitui. Sem modelo exportado e parado há mais de
+    `orphan_age_days` dias: o projeto inteiro é removido (treino abandonado).
+
+    Args:
+        kind (str): Tipo do projeto ('quantity', 'price', ...).
+        project_dir (Path): Diretório do projeto.
+        keep_best (int): Trials com checkpoints mantidos.
+        min_age_days (float): Idade mínima (última alteração) para o projeto ser tocado.
+        orphan_age_days (float): Idade a partir da qual projetos sem modelo exportado são removidos.
+        archive (bool): Compacta o que for podado em models/archive antes de remover.
+        dry_run (bool): Só calcula o que seria liberado.
+
+    Returns:
+        dict: Linha do relatório (projeto, ação, trials, bytes antes e depois).
+    """
+    age_days = (time.time() - _last_modified(project_dir)) / 86400
+    model_path = exported_model(project_dir)
+    row = {
+        'tipo': kind, 'projeto': str(project_dir.relative_to(MODELS_DIR)), 'acao': 'mantido',
+        'trials': 0, 'trials_podadas': 0, 'bytes_antes': _size(project_dir), 'bytes_depois': None,
+    }
+
+    if age_days < min_age_days:
+        row['acao'] = 'recente'
+        row['bytes_depois'] = row['bytes_antes']
+        return row
+
+    if model_path is None:
+        if age_days < orphan_age_days:
+            row['acao'] = 'sem_modelo'
+            row['bytes_depois'] = row['bytes_antes']
+            return row
+        row['acao'] = 'removido'
+        prune = [project_dir]
+    else:
+        trials = read_trials(project_dir)
+        keep = {trial['dir'] for trial in trials[:keep_best]}
+        prune = [
+            path
+            for trial in trials if trial['dir'] not in keep
+            for path in (project_dir / trial['dir']).iterdir() if path.name not in TRIAL_KEEP_FILES
+        ]
+        best_model = project_dir / 'best_model'
+        if best_model.exists():
+            prune.append(best_model)
+        row.update(acao='compactado', trials=len(trials), trials_podadas=len(trials) - len(keep))
+        if not dry_run:
+            write_trials_summary(project_dir, trials, model_path)
+
+    freed = sum(_size(path) for path in prune)
+    row['bytes_depois'] = row['bytes_antes'] - freed
+    if dry_run or not prune:
+        return row
+
+    if archive:
+        stamp = pd.Timestamp.now().strftime('%Y%m%d%H%M%S')
+        archive_path = ARCHIVE_DIR / kind / f"{project_dir.name}_{stamp}.tar.gz"
+        _archive(prune, archive_path, project_dir.parent)
+        row['arquivo'] = str(archive_path.relative_to(MODELS_DIR))
+    _remove(prune)
+    return row
+
+def expire_archives(retention_days=ARCHIVE_RETENTION_DAYS, dry_run=False):
+    """
+    Remove os arquivos de trials podadas mais antigos que `retention_days`.
+
+    Returns:
+        int: Bytes liberados.
+    """
+    if not ARCHIVE_DIR.exists():
+        return 0
+    cutoff = time.time() - retention_days * 86400
+    expired = [path for path in ARCHIVE_DIR.rglob('*.tar.gz') if path.stat().st_mtime < cutoff]
+    freed = sum(path.stat().st_size for path in expired)
+    if not dry_run:
+        _remove(expired)
+    return freed
+
+def collect_garbage(kinds=GC_KINDS, keep_best=KEEP_BEST_TRIALS, min_age_days=MIN_AGE_DAYS,
+                    orphan_age_days=ORPHAN_AGE_DAYS, archive=False, archive_retention_days=ARCHIVE_RETENTION_DAYS,
+                    dry_run=False) -> pd.DataFrame:
+    """
+    Aplica a política de retenção a todos os projetos AutoKeras e expira os arquivos antigos.
+
+    Returns:
+        pd.DataFrame: Uma linha por projeto (ver `compact_project`), com o espaço liberado.
+    """
+    rows = []
+    for kind, project_dir in find_projects(kinds):
+        try:
+            rows.append(compact_project(kind, project_dir, keep_best, min_age_days, orphan_age_days, archive, dry_run))
+        except OSError as e:
+            logger.error(f"Erro ao compactar o projeto {project_dir}: {e}")
+
+    df = pd.DataFrame(rows, columns=['tipo', 'projeto', 'acao', 'trials', 'trials_podadas',
+                                     'bytes_antes', 'bytes_depois', 'arquivo'])
+    df['bytes_liberados'] = df['bytes_antes'] - df['bytes_depois']
+    expired = expire_archives(archive_retention_days, dry_run)
+
+    prefix = "Simulação: seriam liberados" if dry_run else "Liberados"
+    logger.info(
+        f"{prefix} {(df['bytes_liberados'].sum() + expired) / 1024 ** 3:.2f} GB "
+        f"({(df['acao'] == 'compactado').sum()} projetos compactados, {(df['acao'] == 'removido').sum()} removidos, "
+        f"{expired / 1024 ** 3:.2f} GB de arquivos expirados)."
+    )
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compacta os projetos AutoKeras e libera espaço em models/.")
+    parser.add_argument('--kinds', nargs='+', default=list(GC_KINDS), help="Subdiretórios de models/ a compactar.")
+    parser.add_argument('--keep-best', type=int, default=KEEP_BEST_TRIALS, help="Trials com checkpoints mantidos.")
+    parser.add_argument('--min-age-days', type=float, default=MIN_AGE_DAYS)
+    parser.add_argument('--orphan-age-days', type=float, default=ORPHAN_AGE_DAYS)
+    parser.add_argument('--archive', action='store_true', help="Arquiva em models/archive o que for podado.")
+    parser.add_argument('--archive-retention-days', type=float, default=ARCHIVE_RETENTION_DAYS)
+    parser.add_argument('--dry-run', action='store_true', help="Só informa o espaço que seria liberado.")
+    args = parser.parse_args()
+
+    report = collect_garbage(args.kinds, args.keep_best, args.min_age_days, args.orphan_age_days,
+                             args.archive, args.archive_retention_days, args.dry_run)
+    logger.info("Resultado da compactação:\n" + report.sort_values('bytes_liberados', ascending=False).to_string(index=False))
@@ -0,0 +1,223 @@
+# Este módulo define o backtesting com origem deslizante (rolling origin): as features do
+# dataset diário são calculadas uma única vez e cada corte (cutoff) usa apenas fatias (views)
+# das mesmas matrizes, para comparar modelos em vários períodos sem reler os CSVs.
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from src.utils.logging_config import get_logger
+from src.data_processing.feature_engineering import PRICE_FEATURES, build_price_features
+
+logger = get_logger(__name__)
+
+BASE_DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+# Dias mínimos de treino antes do primeiro corte
+DEFAULT_INITIAL_TRAIN_DAYS = 365
+# Dias avaliados após cada corte
+DEFAULT_HORIZON_DAYS = 30
+# Distância (dias) entre cortes consecutivos
+DEFAULT_STEP_DAYS = 30
+# Regularização da regressão ridge de referência
+RIDGE_ALPHA = 1.0
+
+def naive_model(X_train, y_train, X_test, features):
+    """
+    Referência ingênua: repete o valor unitário do dia anterior (ValorUnitario_lag1), em log.
+    """
+    return np.log1p(np.abs(X_test[:, features.index('ValorUnitario_lag1')]))
+
+def rolling_mean_model(X_train, y_train, X_test, features):
+    """
+    Referência: média móvel do valor unitário na janela (ValorUnitarioMedio_rolling_mean_7), em log.
+    """
+    return np.log1p(np.abs(X_test[:, features.index('ValorUnitarioMedio_rolling_mean_7')]))
+
+def ridge_model(X_train, y_train, X_test, features):
+    """
+    Regressão ridge em forma fechada sobre as features padronizadas.
+    """
+    mean = X_train.mean(axis=0)
+    std = X_train.std(axis=0)
+    std[std == 0] = 1.0
+    A = np.hstack([(X_train - mean) / std, np.ones((len(X_train), 1))])
+    reg = RIDGE_ALPHA * np.eye(A.shape[1])
+    reg[-1, -1] = 0.0  # O intercepto não é regularizado
+    coef = np.linalg.solve(A.T @ A + reg, A.T @ y_train)
+    B = np.hstack([(X_test - mean) / std, np.ones((len(X_test), 1))])
+    return B @ coef
+
+DEFAULT_MODELS = {
+    'naive': naive_model,
+    'rolling_mean': rolling_mean_model,
+    'ridge': ridge_model,
+}
+
+def rolling_origins(dates, initial_train_days=DEFAULT_INITIAL_TRAIN_DAYS, horizon_days=DEFAULT_HORIZON_DAYS,
+                    step_days=DEFAULT_STEP_DAYS, max_folds=None):
+    """
+    Gera os cortes do backtesting como faixas de índices sobre `dates` (ordenadas).
+
+    Args:
+        dates (np.ndarray): Datas das linhas, em ordem crescente.
+        initial_train_days (int): Dias de histórico antes do primeiro corte.
+        horizon_days (int): Dias avaliados após cada corte.
+        step_days (int): Avanço entre cortes.
+        max_folds (int, optional): Mantém apenas os cortes mais recentes.
+
+    Returns:
+        list: Tuplas (cutoff, fim_treino, fim_teste), com os índices do fim do treino e do teste.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if len(dates) == 0:
+        return []
+    folds = []
+    cutoff = dates[0] + pd.Timedelta(initial_train_days, unit='D')
+    while cutoff < dates[-1]:
+        train_end = dates.searchsorted(cutoff, side='left')
+        test_end = dates.searchsorted(cutoff + pd.Timedelta(horizon_days, unit='D'), side='left')
+        if test_end > train_end:
+            folds.append((cutoff, int(train_end), int(test_end)))
+        cutoff += pd.Timedelta(step_days, unit='D')
+    return folds[-max_folds:] if max_folds else folds
+
+def _evaluate_fold(model_name, model_fn, X, y, actual, cutoff, train_end, test_end, features, expanding, train_days, dates):
+    """
+    Treina e avalia um modelo em um corte. X, y e actual são fatiados sem cópia.
+    """
+    train_start = 0
+    if not expanding:
+        train_start = int(dates.searchsorted(cutoff - pd.Timedelta(train_days, unit='D'), side='left'))
+
+    started = time.perf_counter()
+    y_pred_log = model_fn(X[train_start:train_end], y[train_start:train_end], X[train_end:test_end], features)
+    seconds = time.perf_counter() - started
+
+    y_true = actual[train_end:test_end]
+    y_pred = np.expm1(np.asarray(y_pred_log, dtype=np.float64).reshape(-1))
+    abs_error = np.abs(y_true - y_pred)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel_error = np.where(y_true == 0, 0, abs_error / y_true * 100)
+
+    return {
+        'model': model_name,
+        'cutoff': cutoff.strftime('%Y-%m-%d'),
+        'train_rows': train_end - train_start,
+        'test_rows': test_end - train_end,
+        'mae': float(abs_error.mean()),
+        'mape': float(rel_error.mean()),
+        'seconds': seconds,
+    }
+
+def backtest(df, models=None, features=PRICE_FEATURES, target='LogValorUnitarioMedio', actual='ValorUnitarioMedio',
+             initial_train_days=DEFAULT_INITIAL_TRAIN_DAYS, horizon_days=DEFAULT_HORIZON_DAYS,
+             step_days=DEFAULT_STEP_DAYS, max_folds=None, expanding=True, max_workers=None):
+    """
+    Avalia modelos em vários cortes com origem deslizante sobre um dataset com features prontas.
+
+    As matrizes de features e alvo são montadas uma única vez; cada corte usa fatias contíguas
+    delas. Os cortes rodam em paralelo em threads (numpy e TensorFlow liberam o GIL nas operações
+    pesadas), o que evita copiar as matrizes para outros processos.
+
+    Args:
+        df (pd.DataFrame): Dataset com 'Data', `features`, `target` e `actual`.
+        models (dict, optional): {nome: função(X_train, y_train, X_test, features) -> previsões em log}.
+            Padrão: DEFAULT_MODELS.
+        features (list): Colunas de entrada.
+        target (str): Alvo de treino (em log).
+        actual (str): Valor real na escala original, usado nas métricas.
+        initial_train_days (int): Dias de histórico antes do primeiro corte.
+        horizon_days (int): Dias avaliados após cada corte.
+        step_days (int): Avanço entre cortes.
+        max_folds (int, optional): Mantém apenas os cortes mais recentes.
+        expanding (bool): Janela de treino crescente; com False, usa apenas os últimos
+            `initial_train_days` dias antes de cada corte.
+        max_workers (int, optional): Threads usadas para os cortes.
+
+    Returns:
+        pd.DataFrame: Uma linha por modelo e corte (cutoff, linhas, MAE, MAPE e tempo).
+    """
+    models = models or DEFAULT_MODELS
+    df = df.sort_values('Data')
+    dates = pd.DatetimeIndex(df['Data'])
+    X = np.ascontiguousarray(df[features].fillna(0).to_numpy(dtype=np.float64))
+    y = df[target].fillna(0).to_numpy(dtype=np.float64)
+    y_actual = df[actual].to_numpy(dtype=np.float64)
+
+    folds = rolling_origins(dates, initial_train_days, horizon_days, step_days, max_folds)
+    if not folds:
+        logger.warning("Histórico insuficiente para o backtesting.")
+        return pd.DataFrame(columns=['model', 'cutoff', 'train_rows', 'test_rows', 'mae', 'mape', 'seconds'])
+
+    tasks = [(name, fn, *fold) for name, fn in models.items() for fold in folds]
+    logger.info(f"Backtesting de {len(models)} modelos em {len(folds)} cortes ({len(tasks)} avaliações).")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda task: _evaluate_fold(
+                task[0], task[1], X, y, y_actual, task[2], task[3], task[4],
+                list(features), expanding, initial_train_days, dates
+            ),
+            tasks
+        ))
+    return pd.DataFrame(results)
+
+def summarize_backtest(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Resume o backtesting por modelo: médias de MAE/MAPE entre cortes e tempo total.
+    """
+    return results.groupby('model').agg(
+        folds=('cutoff', 'count'),
+        mae=('mae', 'mean'),
+        mape=('mape', 'mean'),
+        mape_std=('mape', 'std'),
+        seconds=('seconds', 'sum'),
+    ).sort_values('mape').reset_index()
+
+def backtest_product(produto_id, window_size=7, **kwargs):
+    """
+    Executa o backtesting do modelo de valor unitário de um produto e salva os resultados.
+
+    Args:
+        produto_id (int): Código do produto.
+        window_size (int): Tamanho da janela deslizante.
+        **kwargs: Repassados para `backtest`.
+
+    Returns:
+        pd.DataFrame: Resultados por modelo e corte.
+    """
+    file_path = BASE_DATA_DIR / "cleaned" / f"produto_{produto_id}_price.csv"
+    logger.info(f"Lendo dataset de preço de {file_path}.")
+    df = build_price_features(pd.read_csv(file_path, parse_dates=['Data']), window_size=window_size)
+
+    results = backtest(df, **kwargs)
+    reports_dir = BASE_DATA_DIR / "reports"
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    output_path = reports_dir / f"backtest_produto_{produto_id}.csv"
+    results.to_csv(output_path, index=False)
+    logger.info(f"Backtesting do produto {produto_id} salvo em {output_path}.")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtesting com origem deslizante do modelo de valor unitário.")
+    parser.add_argument('produtos', type=int, nargs='+', help="Códigos dos produtos.")
+    parser.add_argument('--horizon-days', type=int, default=DEFAULT_HORIZON_DAYS)
+    parser.add_argument('--step-days', type=int, default=DEFAULT_STEP_DAYS)
+    parser.add_argument('--initial-train-days', type=int, default=DEFAULT_INITIAL_TRAIN_DAYS)
+    parser.add_argument('--max-folds', type=int, default=None)
+    parser.add_argument('--sliding', action='store_true', help="Janela de treino fixa em vez de crescente.")
+    args = parser.parse_args()
+
+    for produto in args.produtos:
+        results = backtest_product(
+            produto,
+            horizon_days=args.horizon_days,
+            step_days=args.step_days,
+            initial_train_days=args.initial_train_days,
+            max_folds=args.max_folds,
+            expanding=not args.sliding,
+        )
+        if not results.empty:
+            logger.info(f"Produto {produto}:\n" + summarize_backtest(results).to_string(index=False))
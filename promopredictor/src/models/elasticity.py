@@ -0,0 +1,212 @@
+# Este módulo estima a elasticidade-preço (log-log) e o efeito das promoções de todo o catálogo
+# em uma única regressão ridge em lote: as estatísticas suficientes (X'X, X'y) de cada produto
+# são acumuladas em blocos de linhas e todos os sistemas são resolvidos de uma vez.
+
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from src.services.database import DatabaseManager
+from src.data_processing.promotions import load_daily_sales
+from src.data_processing.price_data_pipeline import add_holiday_features
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Dias de histórico usados na estimação
+HISTORY_DAYS = 730
+# Dias com venda mínimos para estimar um produto
+MIN_DAYS = 30
+# Regularização ridge relativa: a penalidade de cada coluna é RIDGE_ALPHA vezes a sua soma de quadrados
+# centrada no produto (equivale à ridge sobre features padronizadas), então log-preços com pouca
+# variação não são encolhidos para 0; o intercepto não é regularizado
+RIDGE_ALPHA = 0.01
+# Linhas por bloco no acúmulo de X'X (limita a memória dos produtos externos)
+ROW_CHUNK = 100_000
+
+# Colunas de X, na ordem; dias da semana como indicadores com segunda-feira como base
+ELASTICITY_FEATURES = (
+    ['Intercepto', 'LogPreco', 'PrecoemPromocao']
+    + [f'DiaDaSemana_{d}' for d in range(1, 7)]
+    + ['is_holiday', 'is_eve1']
+)
+
+ELASTICITIES_DDL = """
+CREATE TABLE IF NOT EXISTS elasticidades (
+    CodigoProduto INT NOT NULL PRIMARY KEY,
+    Elasticidade DECIMAL(10, 4),
+    LiftPromocao DECIMAL(10, 4),
+    Intercepto DECIMAL(12, 4),
+    R2 DECIMAL(6, 4),
+    Dias INT NOT NULL,
+    DesvioLogPreco DECIMAL(10, 6),
+    DataInicio DATE,
+    DataFim DATE,
+    EstimadoEm VARCHAR(32) NOT NULL
+)
+"""
+
+def build_design(df: pd.DataFrame):
+    """
+    Monta X (log-preço, promoção e calendário) e y (log da quantidade), ordenados por produto.
+
+    Args:
+        df (pd.DataFrame): Agregados diários com CodigoProduto, Data, ValorUnitarioMedio,
+            QuantidadeLiquida e PrecoemPromocao (como os de `aggregate_daily`).
+
+    Returns:
+        tuple: (produtos das linhas, X (N, F), y (N,)), apenas dias com preço e quantidade positivos.
+    """
+    df = df[(df['ValorUnitarioMedio'] > 0) & (df['QuantidadeLiquida'] > 0)].sort_values(['CodigoProduto', 'Data'])
+
+    # Calendário calculado uma vez por data e propagado para as linhas
+    calendar = add_holiday_features(pd.DataFrame({'Data': df['Data'].drop_duplicates()}))
+    calendar = calendar.set_index('Data')[['is_holiday', 'is_eve1']]
+    dates = pd.DatetimeIndex(df['Data'])
+    weekday = dates.dayofweek.to_numpy()
+
+    X = np.zeros((len(df), len(ELASTICITY_FEATURES)))
+    X[:, 0] = 1.0
+    X[:, 1] = np.log(df['ValorUnitarioMedio'].to_numpy(dtype=np.float64))
+    X[:, 2] = (df['PrecoemPromocao'].fillna(0).to_numpy(dtype=np.float64) > 0)
+    rows = np.flatnonzero(weekday > 0)
+    X[rows, 2 + weekday[rows]] = 1.0  # coluna 2 + d é DiaDaSemana_d
+    X[:, -2:] = calendar.reindex(dates).to_numpy(dtype=np.float64)
+    y = np.log(df['QuantidadeLiquida'].to_numpy(dtype=np.float64))
+    return df['CodigoProduto'].to_numpy(), X, y
+
+def stacked_ridge(groups, X, y, alpha=RIDGE_ALPHA):
+    """
+    Resolve uma regressão ridge por grupo, para todos os grupos de uma vez.
+
+    Args:
+        groups (np.ndarray): Grupo de cada linha, com linhas do mesmo grupo contíguas.
+        X (np.ndarray): (N, F) com o intercepto na coluna 0.
+        y (np.ndarray): (N,).
+        alpha (float): Regularização das colunas 1..F-1, relativa à soma de quadrados centrada
+            de cada coluna no grupo.
+
+    Returns:
+        tuple: (grupos (G,), coeficientes (G, F), linhas por grupo (G,), R² (G,)).
+    """
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    keys, counts = groups[starts], np.diff(np.r_[starts, len(groups)])
+    G, F = len(keys), X.shape[1]
+    group_index = np.repeat(np.arange(G), counts)
+
+    XtX = np.zeros((G, F, F))
+    Xty = np.zeros((G, F))
+    y_sum = np.bincount(group_index, weights=y, minlength=G)
+    y_sq = np.bincount(group_index, weights=y ** 2, minlength=G)
+    for begin in range(0, len(y), ROW_CHUNK):
+        end = min(begin + ROW_CHUNK, len(y))
+        g = group_index[begin:end]
+        local = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        Xc = X[begin:end]
+        XtX[g[local]] += np.add.reduceat(np.einsum('ni,nj->nij', Xc, Xc), local, axis=0)
+        Xty[g[local]] += np.add.reduceat(Xc * y[begin:end, None], local, axis=0)
+
+    # Soma de quadrados centrada de cada coluna no grupo: X'X[j, j] - (X'X[0, j])² / n, pois a
+    # coluna 0 é o intercepto; colunas constantes no grupo ficam com a penalidade absoluta alpha
+    scale = np.einsum('gff->gf', XtX) - XtX[:, 0, :] ** 2 / counts[:, None]
+    scale = np.where(scale > 1e-12, scale, 1.0)
+    scale[:, 0] = 0.0
+    penalty = alpha * scale[:, :, None] * np.eye(F)
+    coef = np.linalg.solve(XtX + penalty, Xty[..., None])[..., 0]
+
+    # R² a partir das estatísticas suficientes: SSE = y'y - 2b'X'y + b'X'Xb
+    sse = y_sq - 2 * np.einsum('gf,gf->g', coef, Xty) + np.einsum('gf,gfh,gh->g', coef, XtX, coef)
+    sst = y_sq - y_sum ** 2 / counts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(sst > 0, 1 - sse / sst, 0.0)
+    return keys, coef, counts, r2
+
+def estimate_elasticities(df: pd.DataFrame, alpha=RIDGE_ALPHA, min_days=MIN_DAYS) -> pd.DataFrame:
+    """
+    Estima elasticidade-preço e lift de promoção de todos os produtos do DataFrame.
+
+    log(Quantidade) = a + e·log(Preço) + g·Promoção + dias da semana + feriados, por produto.
+
+    Args:
+        df (pd.DataFrame): Agregados diários (ver `build_design`).
+        alpha (float): Regularização ridge.
+        min_days (int): Dias com venda mínimos por produto.
+
+    Returns:
+        pd.DataFrame: CodigoProduto, Elasticidade, LiftPromocao (variação relativa da quantidade
+        em promoção), Intercepto, R2, Dias, DesvioLogPreco, DataInicio e DataFim.
+    """
+    started = time.perf_counter()
+    produtos, X, y = build_design(df)
+    if len(y) == 0:
+        return pd.DataFrame()
+
+    keys, coef, counts, r2 = stacked_ridge(produtos, X, y, alpha)
+    log_price = pd.Series(X[:, 1]).groupby(produtos).std()
+    dates = df.groupby('CodigoProduto')['Data'].agg(['min', 'max'])
+
+    result = pd.DataFrame({
+        'CodigoProduto': keys.astype(int),
+        'Elasticidade': coef[:, 1],
+        'LiftPromocao': np.expm1(coef[:, 2]),
+        'Intercepto': coef[:, 0],
+        'R2': r2,
+        'Dias': counts,
+        'DesvioLogPreco': log_price.reindex(keys).fillna(0).to_numpy(),
+        'DataInicio': dates['min'].reindex(keys).to_numpy(),
+        'DataFim': dates['max'].reindex(keys).to_numpy(),
+    })
+    result = result[result['Dias'] >= min_days].reset_index(drop=True)
+    logger.info(
+        f"Elasticidades de {len(result)} produtos estimadas em {time.perf_counter() - started:.2f}s "
+        f"({len(y)} dias com venda)."
+    )
+    return result
+
+def load_catalog_daily(db_manager: DatabaseManager, history_days=HISTORY_DAYS) -> pd.DataFrame:
+    """
+    Agregados diários de todo o catálogo, com o preço médio do dia (receita / quantidade líquida).
+    """
+    end = db_manager.execute_query("SELECT MAX(Data) FROM vendas", local=True, use_cache=False)['data'][0][0]
+    if end is None:
+        return pd.DataFrame()
+    end = pd.Timestamp(end)
+    df = load_daily_sales(db_manager, end - pd.Timedelta(history_days, unit='D'), end)
+    quantity = df['QuantidadeLiquida'].to_numpy()
+    df['ValorUnitarioMedio'] = np.where(quantity > 0, df['ValorTotal'] / np.where(quantity > 0, quantity, 1), np.nan)
+    return df
+
+def run_elasticity_estimation(db_manager: DatabaseManager, history_days=HISTORY_DAYS):
+    """
+    Estima as elasticidades do catálogo e substitui o conteúdo da tabela `elasticidades`.
+
+    Returns:
+        int: Número de produtos gravados.
+    """
+    df = load_catalog_daily(db_manager, history_days)
+    result = estimate_elasticities(df) if not df.empty else pd.DataFrame()
+    if result.empty:
+        logger.warning("Nenhum produto com histórico suficiente para estimar elasticidades.")
+        return 0
+
+    result = result.assign(
+        DataInicio=pd.to_datetime(result['DataInicio']).dt.strftime('%Y-%m-%d'),
+        DataFim=pd.to_datetime(result['DataFim']).dt.strftime('%Y-%m-%d'),
+        EstimadoEm=pd.Timestamp.now().isoformat(timespec='seconds'),
+    )
+    with db_manager.engine.begin() as connection:
+        connection.execute(text(ELASTICITIES_DDL))
+        connection.execute(text("DELETE FROM elasticidades"))
+        result.to_sql('elasticidades', connection, if_exists='append', index=False, chunksize=10_000)
+    logger.info(f"{len(result)} elasticidades gravadas na tabela `elasticidades`.")
+    return len(result)
+
+def main():
+    db_manager = DatabaseManager()
+    try:
+        run_elasticity_estimation(db_manager)
+    finally:
+        db_manager.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# Este módulo define o motor de previsão recursiva multi-passo do valor unitário: a cada dia
+# do horizonte, as features de defasagem e de janela deslizante são recalculadas a partir das
+# próprias previsões anteriores, para todos os produtos de uma vez (um array por passo).
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from pathlib import Path
+from src.utils.logging_config import get_logger
+from src.data_processing.price_data_pipeline import add_holiday_features
+
+logger = get_logger(__name__)
+
+BASE_DATA_DIR = Path(__file__).parent.parent.parent / "data"
+MODEL_BASE_DIR = Path(__file__).parent.parent.parent / "models" / "price"
+
+# Defasagens usadas no treino (add_lag_features)
+LAGS = (1, 2, 3)
+# Features exógenas por produto; sem plano informado, o último valor observado é repetido
+PRODUCT_EXOG = ['PrecoemPromocao', 'ValorCusto']
+# Features de calendário, iguais para todos os produtos no mesmo dia
+CALENDAR_EXOG = ['DiaDaSemana', 'Mes', 'Dia', 'is_holiday', 'is_eve1', 'is_eve2', 'is_eve3']
+
+def build_calendar(dates: pd.DatetimeIndex) -> pd.DataFrame:
+    """
+    Monta as features de calendário (dia, mês, dia da semana e feriados) para as datas do horizonte.
+    """
+    df = pd.DataFrame({'Data': dates})
+    df['Dia'] = df['Data'].dt.day
+    df['Mes'] = df['Data'].dt.month
+    df['DiaDaSemana'] = df['Data'].dt.dayofweek
+    return add_holiday_features(df)
+
+def _window_stats(values):
+    """
+    Média, desvio (ddof=1, como o rolling do pandas) e soma por linha de uma matriz (P, janela).
+    """
+    return values.mean(axis=1), values.std(axis=1, ddof=1), values.sum(axis=1)
+
+def recursive_forecast(history_price, history_quantity, product_exog, calendar_exog, predict_fn,
+                       window_size=7, quantity_plan=None, use_log=True):
+    """
+    Previsão recursiva do valor unitário para P produtos em H dias.
+
+    A cada passo, as features de todos os produtos são montadas como uma matriz (P, F), na ordem
+    de PRICE_FEATURES (usada no treino), e `predict_fn` é chamado uma única vez.
+    A previsão do dia volta para o buffer de histórico e alimenta as defasagens e janelas dos
+    dias seguintes. Como o valor do próprio dia é desconhecido, as janelas deslizantes terminam
+    no dia anterior.
+
+    Args:
+        history_price (np.ndarray): (P, W) últimos W valores unitários observados, em ordem cronológica.
+        history_quantity (np.ndarray): (P, W) últimas W quantidades líquidas observadas.
+        product_exog (np.ndarray): (P, H, len(PRODUCT_EXOG)) features exógenas por produto e dia.
+        calendar_exog (np.ndarray): (H, len(CALENDAR_EXOG)) features de calendário por dia.
+        predict_fn (callable): Recebe (P, F) float32 e retorna P previsões.
+        window_size (int): Tamanho da janela deslizante.
+        quantity_plan (np.ndarray, optional): (P, H) quantidades previstas/planejadas. Padrão: média
+            da janela anterior de cada produto.
+        use_log (bool): O modelo prevê log1p do valor unitário.
+
+    Returns:
+        tuple: (preços previstos (P, H), quantidades usadas como feature (P, H)).
+    """
+    n_products, n_history = history_price.shape
+    horizon = calendar_exog.shape[0]
+    if n_history < max(window_size, max(LAGS)):
+        raise ValueError(f"Histórico de {n_history} dias é menor que a janela/defasagem exigida.")
+
+    price_buf = np.empty((n_products, n_history + horizon), dtype=np.float64)
+    quantity_buf = np.empty_like(price_buf)
+    price_buf[:, :n_history] = history_price
+    quantity_buf[:, :n_history] = history_quantity
+
+    n_features = len(PRODUCT_EXOG) + len(CALENDAR_EXOG) + 1 + 2 * len(LAGS) + 6
+    X = np.empty((n_products, n_features), dtype=np.float32)
+
+    for h in range(horizon):
+        c = n_history + h
+        price_window = price_buf[:, c - window_size:c]
+        quantity_window = quantity_buf[:, c - window_size:c]
+        quantity_now = quantity_plan[:, h] if quantity_plan is not None else quantity_window.mean(axis=1)
+        quantity_buf[:, c] = quantity_now
+
+        dia_semana, mes, dia, is_holiday, is_eve1, is_eve2, is_eve3 = calendar_exog[h]
+        columns = [
+            product_exog[:, h, 0],  # PrecoemPromocao
+            dia_semana, mes, dia,
+            quantity_now,
+            is_holiday, is_eve1, is_eve2, is_eve3,
+            product_exog[:, h, 1],  # ValorCusto
+            *(price_buf[:, c - lag] for lag in LAGS),
+            *(quantity_buf[:, c - lag] for lag in LAGS),
+            *_window_stats(price_window),
+            *_window_stats(quantity_window),
+        ]
+        for j, column in enumerate(columns):
+            X[:, j] = column
+
+        y = np.asarray(predict_fn(X), dtype=np.float64).reshape(n_products)
+        price_buf[:, c] = np.expm1(y) if use_log else y
+
+    return price_buf[:, n_history:], quantity_buf[:, n_history:]
+
+def make_stacked_predictor(models):
+    """
+    Junta os modelos por produto em uma única função de grafo: a linha i de X vai para o modelo i.
+
+    O laço sobre os modelos só roda no traçado do tf.function; cada passo do horizonte executa
+    um único grafo para todos os produtos.
+    """
+    @tf.function(reduce_retracing=True)
+    def predict_fn(X):
+        return tf.concat([model(X[i:i + 1], training=False) for i, model in enumerate(models)], axis=0)
+
+    return lambda X: predict_fn(tf.convert_to_tensor(X)).numpy()
+
+def _product_exog(df_history, dates, plan):
+    """
+    Features exógenas do produto no horizonte: valores do plano (se houver) ou o último observado.
+    """
+    last = df_history[PRODUCT_EXOG].ffill().iloc[-1].fillna(0)
+    exog = pd.DataFrame({col: last[col] for col in PRODUCT_EXOG}, index=dates)
+    if plan is not None and not plan.empty:
+        planned = plan.set_index('Data').reindex(dates)
+        for col in PRODUCT_EXOG:
+            if col in planned.columns:
+                exog[col] = planned[col].fillna(exog[col])
+    return exog.to_numpy(dtype=np.float64)
+
+def _align_history(df_history, end):
+    """
+    Reindexa o histórico diário do produto até `end` (véspera do primeiro dia previsto), para que
+    as defasagens de todos os produtos terminem no mesmo dia: dias sem venda entram com quantidade
+    zero e o último preço/exógena observado. Preços ausentes (dias com quantidade líquida zero)
+    recebem o último preço válido, para não propagar NaN pelas defasagens e janelas.
+    """
+    df = df_history.set_index('Data')
+    df = df[~df.index.duplicated(keep='last')]
+    df = df.reindex(pd.date_range(df.index.min(), end, freq='D'))
+    df['QuantidadeLiquida'] = df['QuantidadeLiquida'].fillna(0)
+    df['ValorUnitarioMedio'] = df['ValorUnitarioMedio'].ffill().bfill()
+    exog = [col for col in PRODUCT_EXOG if col in df.columns]
+    df[exog] = df[exog].ffill()
+    return df.rename_axis('Data').reset_index()
+
+def forecast_prices(produtos, horizon=30, start=None, window_size=7, plan=None, save=True):
+    """
+    Projeta o valor unitário de vários produtos para os próximos `horizon` dias.
+
+    Args:
+        produtos (list): Códigos dos produtos (com dataset de preço e modelo treinados).
+        horizon (int): Número de dias previstos.
+        start (str/Timestamp, optional): Primeiro dia previsto. Padrão: dia seguinte ao último
+            dia observado entre os produtos.
+        window_size (int): Tamanho da janela deslizante usada no treino.
+        plan (pd.DataFrame, optional): Plano com 'CodigoProduto', 'Data' e qualquer coluna de
+            PRODUCT_EXOG (ex.: promoções ou custos previstos).
+        save (bool): Salva um CSV de previsão por produto em data/predictions.
+
+    Returns:
+        pd.DataFrame: Previsões (Data, CodigoProduto, QuantidadeLiquida, Predicted_ValorUnitario).
+    """
+    n_history = max(window_size, max(LAGS))
+    histories, used = [], []
+    for produto in produtos:
+        model_path = MODEL_BASE_DIR / f"produto_{produto}_unit_price_model" / f"produto_{produto}_unit_price_model.keras"
+        data_path = BASE_DATA_DIR / "cleaned" / f"produto_{produto}_price.csv"
+        if not model_path.exists() or not data_path.exists():
+            logger.warning(f"Produto {produto} sem modelo ou dataset de preço; fora da previsão recursiva.")
+            continue
+        df = pd.read_csv(data_path, parse_dates=['Data']).sort_values('Data')
+        if len(df) < n_history or df['ValorUnitarioMedio'].isna().all():
+            logger.warning(
+                f"Produto {produto} com {len(df)} dias de histórico (ou sem preço válido); fora da previsão recursiva."
+            )
+            continue
+        histories.append(df)
+        used.append(int(produto))
+
+    if not used:
+        return pd.DataFrame(columns=['Data', 'CodigoProduto', 'QuantidadeLiquida', 'Predicted_ValorUnitario'])
+
+    start = pd.Timestamp(start) if start is not None else max(df['Data'].max() for df in histories) + pd.Timedelta(1, 'D')
+    dates = pd.date_range(start, periods=horizon, freq='D')
+
+    # Históricos alinhados à véspera de `start`: a defasagem 1 de todos os produtos é o mesmo dia
+    histories = [_align_history(df, start - pd.Timedelta(1, 'D')) for df in histories]
+    keep = [i for i, df in enumerate(histories) if len(df) >= n_history]
+    if len(keep) < len(used):
+        logger.warning(f"{len(used) - len(keep)} produtos sem histórico antes de {start.date()}; fora da previsão recursiva.")
+    histories, used = [histories[i] for i in keep], [used[i] for i in keep]
+    if not used:
+        return pd.DataFrame(columns=['Data', 'CodigoProduto', 'QuantidadeLiquida', 'Predicted_ValorUnitario'])
+    models = [tf.keras.models.load_model(
+        MODEL_BASE_DIR / f"produto_{produto}_unit_price_model" / f"produto_{produto}_unit_price_model.keras"
+    ) for produto in used]
+    calendar_exog = build_calendar(dates)[CALENDAR_EXOG].to_numpy(dtype=np.float64)
+
+    history_price = np.stack([df['ValorUnitarioMedio'].to_numpy(dtype=np.float64)[-n_history:] for df in histories])
+    history_quantity = np.stack([df['QuantidadeLiquida'].to_numpy(dtype=np.float64)[-n_history:] for df in histories])
+    product_exog = np.stack([
+        _product_exog(df, dates, plan[plan['CodigoProduto'] == produto] if plan is not None else None)
+        for df, produto in zip(histories, used)
+    ])
+
+    logger.info(f"Previsão recursiva de {len(used)} produtos para {horizon} dias a partir de {start.date()}.")
+    prices, quantities = recursive_forecast(
+        history_price, history_quantity, product_exog, calendar_exog,
+        make_stacked_predictor(models), window_size=window_size
+    )
+
+    df_forecast = pd.DataFrame({
+        'Data': np.tile(dates, len(used)),
+        'CodigoProduto': np.repeat(used, horizon),
+        'QuantidadeLiquida': quantities.ravel(),
+        'Predicted_ValorUnitario': prices.ravel(),
+    })
+
+    if save:
+        output_dir = BASE_DATA_DIR / "predictions"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for produto, df_produto in df_forecast.groupby('CodigoProduto'):
+            output_path = output_dir / f"produto_{produto}_unit_price_forecast.csv"
+            df_produto.to_csv(output_path, index=False)
+        logger.info(f"Previsões recursivas salvas em {output_dir}.")
+
+    return df_forecast
@@ -0,0 +1,328 @@
+# Este módulo define o modo hierárquico de previsão de quantidade: modelos treinados por nó da
+# hierarquia de produtos (total, seção, grupo), previsões reconciliadas entre os níveis e
+# desagregadas para os produtos por participações históricas.
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from autokeras import AutoModel, RegressionHead, Input
+from pathlib import Path
+from src.utils.logging_config import get_logger
+from src.data_processing.promotions import load_daily_sales
+from src.models.forecast_engine import CALENDAR_EXOG, build_calendar, make_stacked_predictor
+from src.models.incremental_training import fine_tune, save_metadata, SEARCH_REQUIRED
+
+logger = get_logger(__name__)
+
+BASE_DATA_DIR = Path(__file__).parent.parent.parent / "data"
+MODEL_BASE_DIR = Path(__file__).parent.parent.parent / "models" / "hierarchical"
+
+# Níveis com modelo próprio, do mais agregado ao mais detalhado; os produtos vêm do último
+DEFAULT_LEVELS = ('total', 'CodigoSecao', 'CodigoGrupo')
+# Dias de histórico carregados para treino e previsão
+HISTORY_DAYS = 3 * 365
+# Dias finais do histórico usados como validação
+VALIDATION_DAYS = 90
+# Dias recentes usados nas participações dos produtos e na promoção futura padrão
+SHARE_WINDOW_DAYS = 56
+# Defasagens (dias) da quantidade em log usadas como features
+HIERARCHY_LAGS = tuple(range(1, 8))
+# Janela da média/desvio móveis
+ROLLING_WINDOW = 7
+# Tentativas da busca AutoKeras por nó (os nós são poucos; a busca é menor que a por produto)
+HIERARCHY_MAX_TRIALS = 20
+
+HIERARCHY_DAILY_QUERY = """
+SELECT
+    vp.CodigoProduto,
+    v.Data,
+    MAX(vp.CodigoSecao) AS CodigoSecao,
+    MAX(vp.CodigoGrupo) AS CodigoGrupo,
+    MAX(vp.CodigoSubGrupo) AS CodigoSubGrupo,
+    SUM(vp.ValorTotal) AS ValorTotal,
+    SUM(vp.Quantidade - IFNULL(vp.QuantDevolvida, 0)) AS QuantidadeLiquida,
+    AVG(vp.ValorCusto) AS ValorCusto,
+    MAX(IFNULL(vp.PrecoemPromocao, 0)) AS PrecoemPromocao
+FROM vendasprodutos vp
+INNER JOIN vendas v ON vp.CodigoVenda = v.Codigo
+WHERE v.Status IN ('f', 'x') AND v.Data >= :inicio AND v.Data < :fim
+GROUP BY vp.CodigoProduto, v.Data
+"""
+
+def load_hierarchy_data(db_manager, history_days=HISTORY_DAYS, levels=DEFAULT_LEVELS):
+    """
+    Carrega as vendas diárias por produto com a hierarquia atual de cada produto.
+
+    A hierarquia de um produto é a da venda mais recente, para que produtos reclassificados
+    fiquem em um único nó.
+
+    Returns:
+        tuple: (vendas diárias, mapa produto -> códigos de cada nível).
+    """
+    end = db_manager.execute_query("SELECT MAX(Data) FROM vendas", local=True, use_cache=False)['data'][0][0]
+    end = pd.Timestamp(end)
+    df = load_daily_sales(db_manager, end - pd.Timedelta(history_days, unit='D'), end, query=HIERARCHY_DAILY_QUERY)
+    df['total'] = 0
+
+    # Produtos sem classificação ficam no nó -1 do nível
+    mapping = df.sort_values('Data').groupby('CodigoProduto')[list(levels)].last().fillna(-1).astype(int)
+    df = df.drop(columns=list(levels)).join(mapping, on='CodigoProduto')
+    return df, mapping
+
+def build_node_series(df, levels, dates):
+    """
+    Séries diárias (datas × nós) de quantidade e de participação de itens em promoção, de todos os níveis.
+
+    Returns:
+        tuple: (lista de nós (nível, código), quantidades (T, N), promoção (T, N)).
+    """
+    nodes, quantity, promo = [], [], []
+    for level in levels:
+        pivot_q = df.pivot_table(index='Data', columns=level, values='QuantidadeLiquida', aggfunc='sum')
+        pivot_p = df.pivot_table(index='Data', columns=level, values='PrecoemPromocao', aggfunc='mean')
+        pivot_q = pivot_q.reindex(dates).fillna(0).clip(lower=0)
+        pivot_p = pivot_p.reindex(index=dates, columns=pivot_q.columns).fillna(0)
+        nodes.extend((level, code) for code in pivot_q.columns)
+        quantity.append(pivot_q.to_numpy(dtype=np.float64))
+        promo.append(pivot_p.to_numpy(dtype=np.float64))
+    return nodes, np.hstack(quantity), np.hstack(promo)
+
+def build_node_features(Z, promo, calendar):
+    """
+    Monta as features de todos os nós de uma vez a partir das séries em log1p.
+
+    Features por dia e nó: calendário, participação em promoção, defasagens e média/desvio
+    móveis da janela que termina no dia anterior (como na previsão recursiva).
+
+    Args:
+        Z (np.ndarray): (T, N) quantidades em log1p.
+        promo (np.ndarray): (T, N) participação em promoção.
+        calendar (np.ndarray): (T, len(CALENDAR_EXOG)) features de calendário.
+
+    Returns:
+        tuple: (X (T - k, N, F), y (T - k, N)) com k = max(defasagens, janela).
+    """
+    T, N = Z.shape
+    k = max(max(HIERARCHY_LAGS), ROLLING_WINDOW)
+    rows = T - k
+    cumsum = np.vstack([np.zeros((1, N)), np.cumsum(Z, axis=0)])
+    cumsum_sq = np.vstack([np.zeros((1, N)), np.cumsum(Z ** 2, axis=0)])
+    t = np.arange(k, T)
+    window_sum = cumsum[t] - cumsum[t - ROLLING_WINDOW]
+    window_sum_sq = cumsum_sq[t] - cumsum_sq[t - ROLLING_WINDOW]
+    mean = window_sum / ROLLING_WINDOW
+    std = np.sqrt(np.clip((window_sum_sq - ROLLING_WINDOW * mean ** 2) / (ROLLING_WINDOW - 1), 0, None))
+
+    X = np.empty((rows, N, len(CALENDAR_EXOG) + 1 + len(HIERARCHY_LAGS) + 2), dtype=np.float32)
+    X[:, :, :len(CALENDAR_EXOG)] = calendar[t][:, None, :]
+    X[:, :, len(CALENDAR_EXOG)] = promo[t]
+    for j, lag in enumerate(HIERARCHY_LAGS):
+        X[:, :, len(CALENDAR_EXOG) + 1 + j] = Z[t - lag]
+    X[:, :, -2] = mean
+    X[:, :, -1] = std
+    return X, Z[t]
+
+def node_model_path(level, code):
+    return MODEL_BASE_DIR / f"{level}_{code}.keras"
+
+def train_node_models(dates, nodes, X, y, incremental=True):
+    """
+    Treina (ou ajusta) um modelo AutoKeras por nó da hierarquia.
+
+    Args:
+        dates (pd.DatetimeIndex): Datas das linhas de X/y.
+        nodes (list): Nós (nível, código).
+        X (np.ndarray): (T, N, F) features.
+        y (np.ndarray): (T, N) alvo em log1p.
+        incremental (bool): Tenta o ajuste fino do modelo existente antes da busca completa.
+    """
+    MODEL_BASE_DIR.mkdir(parents=True, exist_ok=True)
+    split = int(np.searchsorted(dates, dates[-1] - pd.Timedelta(VALIDATION_DAYS, unit='D'), side='right'))
+    train_data = pd.DataFrame({'Data': dates[:split]})
+
+    for n, (level, code) in enumerate(nodes):
+        model_path = node_model_path(level, code)
+        X_train, y_train = X[:split, n, :], y[:split, n]
+        X_val, y_val = X[split:, n, :], y[split:, n]
+        if incremental and fine_tune(model_path, train_data, X_train, y_train, X_val, y_val) != SEARCH_REQUIRED:
+            continue
+
+        logger.info(f"Iniciando treinamento do nó {level}={code}.")
+        model = AutoModel(
+            inputs=Input(),
+            outputs=RegressionHead(),
+            max_trials=HIERARCHY_MAX_TRIALS,
+            overwrite=True,
+            project_name=str(MODEL_BASE_DIR / f"{level}_{code}_tuner")
+        )
+        model.fit(
+            X_train, y_train,
+            validation_data=(X_val, y_val),
+            epochs=50,
+            batch_size=32,
+            callbacks=[tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True)]
+        )
+        evaluation = model.evaluate(X_val, y_val, return_dict=True)
+        model.export_model().save(model_path)
+        save_metadata(model_path, dates[split - 1], evaluation['loss'], 'busca')
+        logger.info(f"Modelo do nó {level}={code} salvo em {model_path} ({evaluation}).")
+
+def forecast_nodes(Z, promo_future, calendar_future, predict_fn):
+    """
+    Previsão recursiva de todos os nós ao mesmo tempo: uma matriz (N, F) e uma chamada por dia.
+
+    Args:
+        Z (np.ndarray): (T, N) histórico em log1p.
+        promo_future (np.ndarray): (H, N) participação em promoção prevista.
+        calendar_future (np.ndarray): (H, len(CALENDAR_EXOG)) calendário do horizonte.
+        predict_fn (callable): Recebe (N, F) e retorna N previsões em log1p.
+
+    Returns:
+        np.ndarray: (N, H) quantidades previstas.
+    """
+    k = max(max(HIERARCHY_LAGS), ROLLING_WINDOW)
+    horizon, N = promo_future.shape
+    buffer = np.concatenate([Z[-k:].T, np.zeros((N, horizon))], axis=1)
+    X = np.empty((N, len(CALENDAR_EXOG) + 1 + len(HIERARCHY_LAGS) + 2), dtype=np.float32)
+
+    for h in range(horizon):
+        c = k + h
+        window = buffer[:, c - ROLLING_WINDOW:c]
+        X[:, :len(CALENDAR_EXOG)] = calendar_future[h]
+        X[:, len(CALENDAR_EXOG)] = promo_future[h]
+        for j, lag in enumerate(HIERARCHY_LAGS):
+            X[:, len(CALENDAR_EXOG) + 1 + j] = buffer[:, c - lag]
+        X[:, -2] = window.mean(axis=1)
+        X[:, -1] = window.std(axis=1, ddof=1)
+        buffer[:, c] = np.clip(np.asarray(predict_fn(X), dtype=np.float64).reshape(N), 0, None)
+
+    return np.expm1(buffer[:, k:])
+
+def summing_matrix(nodes, mapping, levels):
+    """
+    Matriz de agregação S (nós × nós do nível mais detalhado): S[i, j] = 1 se o nó j pertence ao nó i.
+    """
+    bottom_level = levels[-1]
+    bottom = [code for level, code in nodes if level == bottom_level]
+    parents = mapping.drop_duplicates(bottom_level).set_index(bottom_level).reindex(bottom)
+    S = np.zeros((len(nodes), len(bottom)))
+    for i, (level, code) in enumerate(nodes):
+        S[i] = (parents.index.to_numpy() == code) if level == bottom_level else (parents[level].to_numpy() == code)
+    return S, bottom
+
+def reconcile(base, S):
+    """
+    Reconciliação por mínimos quadrados ordinários (OLS): projeta as previsões-base de todos os
+    níveis em previsões coerentes (cada nó igual à soma dos seus filhos), para todo o horizonte.
+
+    Args:
+        base (np.ndarray): (N, H) previsões-base de todos os nós.
+        S (np.ndarray): (N, B) matriz de agregação.
+
+    Returns:
+        np.ndarray: (B, H) previsões reconciliadas do nível mais detalhado.
+    """
+    bottom, *_ = np.linalg.lstsq(S, base, rcond=None)
+    return np.clip(bottom, 0, None)
+
+def product_shares(df, mapping, bottom_level, bottom, end):
+    """
+    Participação de cada produto no seu nó do nível mais detalhado, por dia da semana, nos
+    últimos SHARE_WINDOW_DAYS. Dias da semana sem venda no nó usam a participação geral.
+
+    Returns:
+        tuple: (produtos, índice do nó de cada produto, participações (P, 7)).
+    """
+    recent = df[df['Data'] > end - pd.Timedelta(SHARE_WINDOW_DAYS, unit='D')].assign(
+        DiaDaSemana=lambda d: d['Data'].dt.dayofweek
+    )
+    by_weekday = recent.pivot_table(index='CodigoProduto', columns='DiaDaSemana', values='QuantidadeLiquida',
+                                    aggfunc='sum').reindex(columns=range(7)).fillna(0).clip(lower=0)
+    produtos = by_weekday.index.to_numpy()
+    node_of = mapping.loc[produtos, bottom_level].to_numpy()
+    node_index = pd.Index(bottom).get_indexer(node_of)
+    known = node_index >= 0
+    by_weekday, produtos, node_index = by_weekday[known], produtos[known], node_index[known]
+
+    values = by_weekday.to_numpy(dtype=np.float64)
+    node_totals = np.zeros((len(bottom), 7))
+    np.add.at(node_totals, node_index, values)
+    overall = values.sum(axis=1)
+    node_overall = np.zeros(len(bottom))
+    np.add.at(node_overall, node_index, overall)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weekday_share = values / node_totals[node_index]
+        overall_share = overall / node_overall[node_index]
+    shares = np.where(node_totals[node_index] > 0, weekday_share, overall_share[:, None])
+    return produtos, node_index, np.nan_to_num(shares)
+
+def run_hierarchical(db_manager, horizon=30, levels=DEFAULT_LEVELS, train=True, incremental=True, save=True):
+    """
+    Executa o modo hierárquico: treina os modelos dos nós, prevê todos os nós em lote,
+    reconcilia os níveis e desagrega para os produtos.
+
+    Args:
+        db_manager (DatabaseManager): Gerenciador do banco de dados.
+        horizon (int): Dias previstos.
+        levels (tuple): Níveis com modelo, do mais agregado ao mais detalhado.
+        train (bool): Treina/ajusta os modelos antes de prever.
+        incremental (bool): Usa o ajuste fino dos modelos existentes quando possível.
+        save (bool): Salva data/predictions/hierarchical_forecast.csv.
+
+    Returns:
+        pd.DataFrame: Previsões (Nivel, Codigo, Data, Predicted_QuantidadeLiquida) de todos os
+        níveis, inclusive 'CodigoProduto'.
+    """
+    df, mapping = load_hierarchy_data(db_manager, levels=levels)
+    if df.empty:
+        logger.warning("Sem vendas para o modo hierárquico.")
+        return pd.DataFrame()
+
+    end = df['Data'].max()
+    dates = pd.date_range(df['Data'].min(), end, freq='D')
+    nodes, quantity, promo = build_node_series(df, levels, dates)
+    Z = np.log1p(quantity)
+    calendar = build_calendar(dates)[CALENDAR_EXOG].to_numpy(dtype=np.float64)
+    logger.info(f"Modo hierárquico: {len(nodes)} modelos de nós para {len(mapping)} produtos.")
+
+    if train:
+        X, y = build_node_features(Z, promo, calendar)
+        train_node_models(dates[len(dates) - len(y):], nodes, X, y, incremental=incremental)
+
+    available = [n for n, node in enumerate(nodes) if node_model_path(*node).exists()]
+    if len(available) < len(nodes):
+        logger.warning(f"{len(nodes) - len(available)} nós sem modelo; ficam fora da previsão.")
+    nodes = [nodes[n] for n in available]
+    models = [tf.keras.models.load_model(node_model_path(*node)) for node in nodes]
+
+    future = pd.date_range(end + pd.Timedelta(1, 'D'), periods=horizon, freq='D')
+    calendar_future = build_calendar(future)[CALENDAR_EXOG].to_numpy(dtype=np.float64)
+    promo_future = np.repeat(promo[-SHARE_WINDOW_DAYS:, available].mean(axis=0, keepdims=True), horizon, axis=0)
+    base = forecast_nodes(Z[:, available], promo_future, calendar_future, make_stacked_predictor(models))
+
+    S, bottom = summing_matrix(nodes, mapping, levels)
+    bottom_forecast = reconcile(base, S)
+    coherent = S @ bottom_forecast
+
+    produtos, node_index, shares = product_shares(df, mapping, levels[-1], bottom, end)
+    product_forecast = bottom_forecast[node_index] * shares[:, future.dayofweek.to_numpy()]
+
+    frames = [
+        pd.DataFrame({'Nivel': level, 'Codigo': code, 'Data': future, 'Predicted_QuantidadeLiquida': coherent[i]})
+        for i, (level, code) in enumerate(nodes)
+    ]
+    frames.append(pd.DataFrame({
+        'Nivel': 'CodigoProduto',
+        'Codigo': np.repeat(produtos, horizon),
+        'Data': np.tile(future, len(produtos)),
+        'Predicted_QuantidadeLiquida': product_forecast.ravel(),
+    }))
+    df_forecast = pd.concat(frames, ignore_index=True)
+
+    if save:
+        output_path = BASE_DATA_DIR / "predictions" / "hierarchical_forecast.csv"
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        df_forecast.to_csv(output_path, index=False)
+        logger.info(f"Previsões hierárquicas salvas em {output_path}.")
+    return df_forecast
@@ -0,0 +1,190 @@
+import json
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Épocas de ajuste fino sobre os dias novos + amostra de replay
+FINE_TUNE_EPOCHS = 5
+# Taxa de aprendizado reduzida para não destruir o que o modelo já aprendeu
+FINE_TUNE_LEARNING_RATE = 1e-4
+# Fração do histórico já visto reapresentada junto com os dias novos (replay)
+REPLAY_FRACTION = 0.2
+# Piora relativa máxima aceita na perda de validação antes de cair para a busca completa
+MAX_VAL_LOSS_DEGRADATION = 0.10
+# Dias finais do histórico usados como validação; o treino vai do início do histórico até antes deles
+VALIDATION_DAYS = 365
+# Início do histórico usado no treino
+TRAIN_START = '2019-01-01'
+# Dias mais recentes, posteriores ao último treino, usados no erro fora da amostra da política de retreino
+RECENT_ERROR_DAYS = 28
+
+# Resultados de `fine_tune`
+FINE_TUNED = 'ajuste_fino'          # modelo ajustado com os dias novos e salvo
+NO_NEW_DATA = 'sem_dias_novos'      # nada a treinar: o modelo exportado já viu todos os dias de treino
+SEARCH_REQUIRED = 'busca'           # sem modelo/metadados ou a validação piorou: busca completa necessária
+
+def split_train_validation(df: pd.DataFrame, validation_days=VALIDATION_DAYS):
+    """
+    Separa treino e validação pela data: os últimos `validation_days` dias do histórico são a
+    validação e o restante (a partir de TRAIN_START) é o treino. A janela anda com os dados,
+    de modo que os dias novos chegam ao treino (e ao ajuste fino) a cada execução.
+
+    Returns:
+        tuple: (dados de treino, dados de validação).
+    """
+    cutoff = df['Data'].max() - pd.Timedelta(validation_days, unit='D')
+    train_data = df[(df['Data'] >= TRAIN_START) & (df['Data'] <= cutoff)]
+    validation_data = df[df['Data'] > cutoff]
+    return train_data, validation_data
+
+def metadata_path(model_path: Path) -> Path:
+    """
+    Caminho do arquivo de metadados (JSON) gravado ao lado do modelo exportado.
+    """
+    return Path(f"{model_path}.json")
+
+def load_metadata(model_path: Path):
+    """
+    Lê os metadados do último treino do modelo (último dia de treino e perda de validação).
+
+    Returns:
+        dict: Metadados, ou None se não existirem.
+    """
+    path = metadata_path(model_path)
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_metadata(model_path: Path, data_end, val_loss, mode):
+    """
+    Grava os metadados do treino ao lado do modelo exportado.
+
+    Args:
+        model_path (Path): Modelo exportado (.keras).
+        data_end (Timestamp): Último dia presente nos dados de treino.
+        val_loss (float): Perda de validação do modelo salvo.
+        mode (str): 'busca' (AutoKeras completo), 'ajuste_fino' ou 'empacotado' (treino empacotado).
+    """
+    with open(metadata_path(model_path), 'w', encoding='utf-8') as f:
+        json.dump({
+            'data_end': pd.Timestamp(data_end).strftime('%Y-%m-%d'),
+            'val_loss': float(val_loss),
+            'mode': mode,
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+        }, f, indent=2)
+
+def error_metrics(y_true, y_pred):
+    """
+    MAE e MAPE (%); o MAPE ignora os dias com valor real zero e é None se todos forem zero.
+    """
+    y_true, y_pred = np.asarray(y_true, dtype=float), np.asarray(y_pred, dtype=float)
+    nonzero = y_true != 0
+    mape = float(np.mean(np.abs((y_true[nonzero] - y_pred[nonzero]) / y_true[nonzero])) * 100) if nonzero.any() else None
+    return {'mae': float(np.mean(np.abs(y_true - y_pred))), 'mape': mape}
+
+def evaluate_out_of_sample(model_path: Path, dates, X, y, inverse=None, recent_days=RECENT_ERROR_DAYS):
+    """
+    Erro do modelo exportado nos dias posteriores ao último dia de treino (`data_end` dos
+    metadados), limitado aos `recent_days` mais recentes: dias que o modelo nunca ajustou.
+
+    Args:
+        model_path (Path): Modelo exportado (.keras).
+        dates: Data de cada linha de X/y.
+        X, y: Features e alvo do histórico completo.
+        inverse (callable, optional): Volta alvo e previsão para a escala original (ex.: np.expm1).
+        recent_days (int): Janela recente avaliada.
+
+    Returns:
+        dict: MAE/MAPE (`error_metrics`), ou None sem modelo, metadados ou dias novos.
+    """
+    metadata = load_metadata(model_path)
+    if not Path(model_path).exists() or metadata is None:
+        return None
+    dates = pd.to_datetime(pd.Series(dates)).reset_index(drop=True)
+    mask = ((dates > pd.Timestamp(metadata['data_end']))
+            & (dates > dates.max() - pd.Timedelta(recent_days, unit='D'))).to_numpy()
+    if not mask.any():
+        return None
+
+    model = tf.keras.models.load_model(model_path)
+    y_pred = model.predict(X[mask], verbose=0).flatten()
+    y_true = y[mask]
+    if inverse is not None:
+        y_true, y_pred = inverse(y_true), inverse(y_pred)
+    metrics = error_metrics(y_true, y_pred)
+    logger.info(f"Erro fora da amostra de {model_path} em {int(mask.sum())} linhas: {metrics}")
+    return metrics
+
+def fine_tune(model_path: Path, train_data: pd.DataFrame, X_train, y_train, X_val, y_val, batch_size=32, seed=42):
+    """
+    Ajusta o modelo exportado com os dias novos (posteriores ao último treino) e uma amostra de replay.
+
+    O modelo ajustado só substitui o anterior se a perda de validação não piorar mais que
+    MAX_VAL_LOSS_DEGRADATION em relação à do modelo carregado na mesma validação atual (a janela
+    de validação anda com os dados, então a perda registrada no último treino não é comparável).
+
+    Args:
+        model_path (Path): Modelo exportado (.keras) do produto.
+        train_data (pd.DataFrame): Dados de treino (com 'Data'), alinhados a X_train/y_train.
+        X_train, y_train: Features e alvo de treino.
+        X_val, y_val: Features e alvo de validação.
+        batch_size (int): Tamanho do lote.
+        seed (int): Semente da amostra de replay.
+
+    Returns:
+        str: FINE_TUNED (modelo ajustado e salvo), NO_NEW_DATA (nada foi treinado) ou
+        SEARCH_REQUIRED (a busca completa é necessária).
+    """
+    metadata = load_metadata(model_path)
+    if not Path(model_path).exists() or metadata is None:
+        logger.info(f"Sem modelo/metadados em {model_path}; ajuste fino indisponível.")
+        return SEARCH_REQUIRED
+
+    is_new = (train_data['Data'] > pd.Timestamp(metadata['data_end'])).to_numpy()
+    if not is_new.any():
+        logger.info(f"Nenhum dia novo desde {metadata['data_end']}; modelo {model_path} mantido.")
+        return NO_NEW_DATA
+
+    # Replay: amostra do histórico já visto, para evitar esquecimento catastrófico
+    rng = np.random.default_rng(seed)
+    old_idx = np.flatnonzero(~is_new)
+    n_replay = min(len(old_idx), max(int(len(old_idx) * REPLAY_FRACTION), int(is_new.sum())))
+    replay_idx = rng.choice(old_idx, size=n_replay, replace=False) if n_replay else old_idx[:0]
+    idx = np.concatenate([np.flatnonzero(is_new), replay_idx])
+
+    model = tf.keras.models.load_model(model_path)
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=FINE_TUNE_LEARNING_RATE),
+        loss=model.loss or 'mean_squared_error'
+    )
+    reference_loss = model.evaluate(X_val, y_val, return_dict=True, verbose=0)['loss']
+    logger.info(
+        f"Ajuste fino de {model_path}: {int(is_new.sum())} linhas novas + {n_replay} de replay, "
+        f"{FINE_TUNE_EPOCHS} épocas."
+    )
+    model.fit(
+        X_train[idx], y_train[idx],
+        validation_data=(X_val, y_val),
+        epochs=FINE_TUNE_EPOCHS,
+        batch_size=batch_size,
+        verbose=0,
+    )
+
+    val_loss = model.evaluate(X_val, y_val, return_dict=True, verbose=0)['loss']
+    limit = reference_loss * (1 + MAX_VAL_LOSS_DEGRADATION)
+    if val_loss > limit:
+        logger.warning(
+            f"Ajuste fino piorou a validação ({val_loss:.6f} > {limit:.6f}); será feita a busca completa."
+        )
+        return SEARCH_REQUIRED
+
+    model.save(model_path)
+    save_metadata(model_path, train_data['Data'].max(), val_loss, 'ajuste_fino')
+    logger.info(f"Modelo ajustado salvo em {model_path} (val_loss={val_loss:.6f}).")
+    return FINE_TUNED
@@ -0,0 +1,177 @@
+# Este módulo define o treino empacotado de modelos pequenos por produto: K redes densas
+# independentes (pesos em blocos separados) formam um único modelo Keras, treinado com um só
+# `fit` e lotes combinados; ao final cada produto é desempacotado e exportado separadamente.
+
+import argparse
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from src.utils.logging_config import get_logger
+from src.models.train_model_unit_price import MODEL_BASE_DIR, load_price_data, prepare_features_and_target
+from src.models.incremental_training import save_metadata
+
+logger = get_logger(__name__)
+
+# Produtos por modelo empacotado
+PACK_SIZE = 64
+# Camadas ocultas de cada rede (o porte das redes densas que a busca AutoKeras costuma escolher)
+PACKED_UNITS = (32, 32)
+PACKED_EPOCHS = 200
+PACKED_PATIENCE = 30
+PACKED_BATCH_SIZE = 32
+
+class PackedDense(tf.keras.layers.Layer):
+    """
+    K camadas densas independentes aplicadas em paralelo: (lote, K, entrada) -> (lote, K, unidades).
+    """
+
+    def __init__(self, units, activation=None, **kwargs):
+        super().__init__(**kwargs)
+        self.units = units
+        self.activation = tf.keras.activations.get(activation)
+
+    def build(self, input_shape):
+        packs, width = int(input_shape[1]), int(input_shape[2])
+        self.kernel = self.add_weight(name='kernel', shape=(packs, width, self.units),
+                                      initializer='glorot_uniform')
+        self.bias = self.add_weight(name='bias', shape=(packs, self.units), initializer='zeros')
+
+    def call(self, inputs):
+        return self.activation(tf.einsum('bki,kio->bko', inputs, self.kernel) + self.bias)
+
+def masked_mse(y_true, y_pred):
+    """
+    Erro quadrático médio apenas nas posições reais; y_true traz (alvo, máscara) na última dimensão.
+    """
+    target, mask = y_true[..., 0], y_true[..., 1]
+    return tf.reduce_sum(mask * tf.square(target - y_pred)) / tf.maximum(tf.reduce_sum(mask), 1.0)
+
+def pack_arrays(arrays, width):
+    """
+    Empilha K conjuntos (X, y) de tamanhos diferentes em (N, K, F) e (N, K, 2), com máscara nas sobras.
+    """
+    rows = max(len(y) for _, y in arrays)
+    X = np.zeros((rows, len(arrays), width), dtype=np.float32)
+    Y = np.zeros((rows, len(arrays), 2), dtype=np.float32)
+    for k, (x_k, y_k) in enumerate(arrays):
+        X[:len(y_k), k] = x_k
+        Y[:len(y_k), k, 0] = y_k
+        Y[:len(y_k), k, 1] = 1.0
+    return X, Y
+
+def build_packed_model(mean, std, units=PACKED_UNITS, learning_rate=1e-3):
+    """
+    Modelo com K redes independentes; a padronização de cada produto é fixada como constante.
+
+    Args:
+        mean (np.ndarray): (K, F) médias das features de treino de cada produto.
+        std (np.ndarray): (K, F) desvios (sem zeros).
+    """
+    packs, width = mean.shape
+    inputs = tf.keras.Input(shape=(packs, width))
+    x = tf.keras.layers.Normalization(axis=(-2, -1), mean=mean, variance=np.square(std))(inputs)
+    for n, size in enumerate(units):
+        x = PackedDense(size, activation='relu', name=f'packed_{n}')(x)
+    outputs = tf.keras.layers.Reshape((packs,))(PackedDense(1, name='packed_out')(x))
+    model = tf.keras.Model(inputs, outputs)
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate), loss=masked_mse)
+    return model
+
+def unpack_model(packed, k, mean, std, units=PACKED_UNITS):
+    """
+    Extrai a rede do produto k como um modelo Keras comum (F features -> 1 saída).
+    """
+    width = mean.shape[1]
+    inputs = tf.keras.Input(shape=(width,))
+    x = tf.keras.layers.Normalization(mean=mean[k], variance=np.square(std[k]))(inputs)
+    layers = [(f'packed_{n}', size, 'relu') for n, size in enumerate(units)] + [('packed_out', 1, None)]
+    for name, size, activation in layers:
+        kernel, bias = packed.get_layer(name).get_weights()
+        dense = tf.keras.layers.Dense(size, activation=activation)
+        x = dense(x)
+        dense.set_weights([kernel[k], bias[k]])
+    return tf.keras.Model(inputs, x)
+
+def train_packed(datasets, units=PACKED_UNITS, epochs=PACKED_EPOCHS, batch_size=PACKED_BATCH_SIZE):
+    """
+    Treina as redes de K produtos juntas.
+
+    Args:
+        datasets (list): Tuplas (X_train, y_train, X_val, y_val) por produto, com o mesmo número de features.
+        units (tuple): Camadas ocultas de cada rede.
+        epochs (int): Épocas máximas (parada antecipada pela perda de validação total).
+        batch_size (int): Linhas por lote; cada linha leva uma amostra de cada produto.
+
+    Returns:
+        tuple: (modelos desempacotados, perda de validação de cada produto).
+    """
+    width = datasets[0][0].shape[1]
+    X_train, Y_train = pack_arrays([(d[0], d[1]) for d in datasets], width)
+    X_val, Y_val = pack_arrays([(d[2], d[3]) for d in datasets], width)
+
+    mean = np.stack([d[0].mean(axis=0) for d in datasets])
+    std = np.stack([d[0].std(axis=0) for d in datasets])
+    std[std == 0] = 1.0
+
+    model = build_packed_model(mean, std, units)
+    model.fit(
+        X_train, Y_train,
+        validation_data=(X_val, Y_val),
+        epochs=epochs,
+        batch_size=batch_size,
+        verbose=0,
+        callbacks=[tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=PACKED_PATIENCE,
+                                                    restore_best_weights=True)]
+    )
+
+    pred = model.predict(X_val, batch_size=4096, verbose=0)
+    mask = Y_val[..., 1]
+    val_loss = (mask * np.square(Y_val[..., 0] - pred)).sum(axis=0) / np.maximum(mask.sum(axis=0), 1)
+    return [unpack_model(model, k, mean, std, units) for k in range(len(datasets))], val_loss
+
+def train_price_models_packed(produtos, pack_size=PACK_SIZE, window_size=7):
+    """
+    Treina os modelos de valor unitário dos produtos em pacotes e exporta cada um no caminho
+    usado por `train_model_unit_price` (a predição não muda).
+
+    Args:
+        produtos (list): Códigos dos produtos (com dataset de preço em data/cleaned).
+        pack_size (int): Produtos por pacote.
+        window_size (int): Tamanho da janela deslizante.
+
+    Returns:
+        dict: {produto: perda de validação}.
+    """
+    prepared = []
+    for produto in produtos:
+        train_data, val_data = load_price_data(produto, window_size)
+        if train_data.empty or val_data.empty:
+            logger.warning(f"Produto {produto} sem dados de treino/validação; fora do treino empacotado.")
+            continue
+        X_train, y_train = prepare_features_and_target(train_data, use_log=True)
+        X_val, y_val = prepare_features_and_target(val_data, use_log=True)
+        prepared.append((produto, train_data['Data'].max(), (X_train, y_train, X_val, y_val)))
+
+    losses = {}
+    for start in range(0, len(prepared), pack_size):
+        pack = prepared[start:start + pack_size]
+        logger.info(f"Treinando pacote de {len(pack)} modelos de valor unitário.")
+        models, val_loss = train_packed([item[2] for item in pack])
+        for (produto, data_end, _), model, loss in zip(pack, models, val_loss):
+            project_dir = MODEL_BASE_DIR / f"produto_{produto}_unit_price_model"
+            project_dir.mkdir(parents=True, exist_ok=True)
+            model_path = Path(f"{project_dir / f'produto_{produto}_unit_price_model'}.keras")
+            model.save(model_path)
+            save_metadata(model_path, data_end, loss, 'empacotado')
+            losses[produto] = float(loss)
+    logger.info(f"{len(losses)} modelos de valor unitário exportados pelo treino empacotado.")
+    return losses
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treino empacotado dos modelos de valor unitário.")
+    parser.add_argument('produtos', type=int, nargs='+', help="Códigos dos produtos.")
+    parser.add_argument('--pack-size', type=int, default=PACK_SIZE)
+    args = parser.parse_args()
+
+    for produto, loss in train_price_models_packed(args.produtos, pack_size=args.pack_size).items():
+        logger.info(f"Produto {produto}: val_loss={loss:.6f}")
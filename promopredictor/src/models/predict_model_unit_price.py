@@ -3,6 +3,7 @@ import numpy as np
 import tensorflow as tf
 from pathlib import Path
 from src.utils.logging_config import get_logger
+from src.data_processing.feature_engineering import add_lag_features
 
 logger = get_logger(__name__)
 
@@ -42,9 +43,7 @@ def load_future_price_data(produto_id):
     df = pd.read_csv(file_path, parse_dates=['Data'])
 
     # Adicionar variáveis de defasagem
-    for lag in range(1, 4):
-        df[f'ValorUnitario_lag{lag}'] = df['ValorUnitarioMedio'].shift(lag)
-        df[f'QuantidadeLiquida_lag{lag}'] = df['QuantidadeLiquida'].shift(lag)
+    df = add_lag_features(df)
 
     # Remover valores nulos criados pelas defasagens
     df = df.dropna()
@@ -0,0 +1,325 @@
+# Este módulo define o simulador de cenários de promoção (what-if): para vários produtos de uma
+# vez, avalia uma grade de promoções candidatas (nível de desconto, data de início e duração)
+# com os modelos de preço e de quantidade e ordena os cenários pelo ganho projetado.
+#
+# Limitação: o modelo de quantidade recebe 'QuantidadeLiquida' (praticamente o próprio alvo) entre
+# as features e não reage ao desconto, então ele só projeta a demanda sem promoção. A resposta da
+# demanda a cada nível vem da elasticidade-preço e do lift de promoção (`elasticity.py`), estimados
+# sobre o histórico diário dos próprios produtos: unidades = base × (1 - desconto)^e × (1 + lift).
+# Elasticidades positivas (em geral confundidas com sazonalidade) são tratadas como zero.
+
+import argparse
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from pathlib import Path
+from src.utils.logging_config import get_logger
+from src.data_processing.feature_engineering import PRICE_FEATURES, QUANTITY_FEATURES
+from src.models.forecast_engine import LAGS, build_calendar
+from src.models.elasticity import estimate_elasticities
+
+logger = get_logger(__name__)
+
+BASE_DATA_DIR = Path(__file__).parent.parent.parent / "data"
+MODELS_DIR = Path(__file__).parent.parent.parent / "models"
+
+# Níveis de desconto (fração do preço) avaliados em cada cenário promocional
+DEFAULT_DISCOUNT_LEVELS = tuple(np.round(np.arange(0.05, 0.55, 0.05), 2))
+# Durações (dias) das promoções candidatas
+DEFAULT_DURATIONS = (3, 5, 7, 10, 14)
+# Dias de histórico recente usados para as features de referência dos produtos
+CONTEXT_DAYS = 56
+
+def load_product_context(produto_id, window_size=7):
+    """
+    Resume o histórico recente de um produto no que o simulador precisa para montar as features.
+
+    Args:
+        produto_id (int): Código do produto.
+        window_size (int): Tamanho da janela deslizante usada no treino.
+
+    Returns:
+        dict: Históricos diários, custo, estatísticas por item de venda e itens por dia da semana,
+        ou None se faltarem dados.
+    """
+    price_path = BASE_DATA_DIR / "cleaned" / f"produto_{produto_id}_price.csv"
+    clean_path = BASE_DATA_DIR / "cleaned" / f"produto_{produto_id}_clean.csv"
+    if not price_path.exists() or not clean_path.exists():
+        return None
+
+    df_daily = pd.read_csv(price_path, parse_dates=['Data']).sort_values('Data')
+    df_items = pd.read_csv(
+        clean_path, parse_dates=['Data'],
+        usecols=['Data', 'Quantidade', 'QuantidadeLiquida', 'AcrescimoAplicado']
+    ).sort_values('Data')
+    n_history = max(window_size, max(LAGS))
+    if len(df_daily) < n_history or len(df_items) < window_size:
+        return None
+
+    last_date = df_daily['Data'].max()
+    recent_items = df_items[df_items['Data'] > last_date - pd.Timedelta(CONTEXT_DAYS, unit='D')]
+    if recent_items.empty:
+        recent_items = df_items.tail(window_size)
+
+    # Itens de venda por dia da semana (média dos dias com venda no período recente)
+    lines_per_day = recent_items.groupby('Data').size()
+    lines_per_weekday = lines_per_day.groupby(lines_per_day.index.dayofweek).mean().reindex(range(7))
+    lines_per_weekday = lines_per_weekday.fillna(lines_per_day.mean()).to_numpy(dtype=np.float64)
+
+    last_items = df_items['Quantidade'].to_numpy(dtype=np.float64)[-window_size:]
+    # Dias com quantidade líquida zero não têm preço médio: vale o último preço válido
+    price = df_daily['ValorUnitarioMedio'].ffill().bfill()
+    if price.isna().all():
+        return None
+    return {
+        'last_date': last_date,
+        'daily': df_daily[['Data', 'ValorUnitarioMedio', 'QuantidadeLiquida', 'PrecoemPromocao']],
+        'price_history': price.to_numpy(dtype=np.float64)[-n_history:],
+        'quantity_history': df_daily['QuantidadeLiquida'].to_numpy(dtype=np.float64)[-n_history:],
+        'cost': float(df_daily['ValorCusto'].replace(0, np.nan).ffill().fillna(0).iloc[-1]),
+        'item_quantity': float(recent_items['QuantidadeLiquida'].mean()),
+        'item_surcharge': float(recent_items['AcrescimoAplicado'].mean()),
+        'item_window': (last_items.mean(), last_items.std(ddof=1), last_items.sum()),
+        'lines_per_weekday': lines_per_weekday,
+    }
+
+def _make_batched_predictor(models):
+    """
+    Junta os modelos por produto em uma única função de grafo: o bloco X[i] (N, F) vai para o modelo i.
+    """
+    @tf.function(reduce_retracing=True)
+    def predict_fn(X):
+        return tf.stack([tf.reshape(model(X[i], training=False), [-1]) for i, model in enumerate(models)])
+
+    return lambda X: predict_fn(tf.convert_to_tensor(X, dtype=tf.float32)).numpy().astype(np.float64)
+
+def build_price_grid(contexts, calendar, window_size=7):
+    """
+    Features do modelo de preço para cada produto, sem (bloco 0) e com (bloco 1) o flag de promoção.
+
+    As defasagens e janelas vêm do último histórico observado e são as mesmas em todo o horizonte:
+    o simulador compara cenários entre si, não projeta a série dia a dia.
+
+    Returns:
+        np.ndarray: (P, 2 * H, len(PRICE_FEATURES)).
+    """
+    horizon = len(calendar)
+    X = np.zeros((len(contexts), 2, horizon, len(PRICE_FEATURES)), dtype=np.float32)
+    col = {name: j for j, name in enumerate(PRICE_FEATURES)}
+    for name in ['DiaDaSemana', 'Mes', 'Dia', 'is_holiday', 'is_eve1', 'is_eve2', 'is_eve3']:
+        X[:, :, :, col[name]] = calendar[name].to_numpy()
+    X[:, 1, :, col['PrecoemPromocao']] = 1
+
+    price_hist = np.stack([c['price_history'] for c in contexts])
+    quantity_hist = np.stack([c['quantity_history'] for c in contexts])
+    per_product = {
+        'QuantidadeLiquida': quantity_hist[:, -window_size:].mean(axis=1),
+        'ValorCusto': np.array([c['cost'] for c in contexts]),
+        **{f'ValorUnitario_lag{lag}': price_hist[:, -lag] for lag in LAGS},
+        **{f'QuantidadeLiquida_lag{lag}': quantity_hist[:, -lag] for lag in LAGS},
+    }
+    for prefix, hist in [('ValorUnitarioMedio', price_hist), ('QuantidadeLiquida', quantity_hist)]:
+        window = hist[:, -window_size:]
+        per_product[f'{prefix}_rolling_mean_{window_size}'] = window.mean(axis=1)
+        per_product[f'{prefix}_rolling_std_{window_size}'] = window.std(axis=1, ddof=1)
+        per_product[f'{prefix}_rolling_sum_{window_size}'] = window.sum(axis=1)
+    for name, values in per_product.items():
+        X[:, :, :, col[name]] = values[:, None, None]
+    return X.reshape(len(contexts), 2 * horizon, len(PRICE_FEATURES))
+
+def build_quantity_grid(contexts, calendar, unit_price, discount_levels):
+    """
+    Features do modelo de quantidade para cada produto, nível de desconto (0 = sem promoção) e dia.
+
+    Args:
+        unit_price (np.ndarray): (P, K + 1, H) preço unitário efetivo de cada nível e dia.
+        discount_levels (np.ndarray): (K + 1,) descontos, começando em 0.
+
+    Returns:
+        np.ndarray: (P, (K + 1) * H, len(QUANTITY_FEATURES)).
+    """
+    n_products, n_levels, horizon = unit_price.shape
+    X = np.zeros((n_products, n_levels, horizon, len(QUANTITY_FEATURES)), dtype=np.float32)
+    col = {name: j for j, name in enumerate(QUANTITY_FEATURES)}
+    for name in ['DiaDaSemana', 'Mes', 'Dia']:
+        X[:, :, :, col[name]] = calendar[name].to_numpy()
+
+    cost = np.array([c['cost'] for c in contexts])[:, None, None]
+    item_quantity = np.array([c['item_quantity'] for c in contexts])[:, None, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        X[:, :, :, col['Rentabilidade']] = np.where(cost > 0, (unit_price - cost) / cost, 0)
+    # DescontoAplicado é um valor monetário por item: desconto × preço cheio × quantidade típica do item
+    full_price = unit_price / (1 - discount_levels[None, :, None])
+    X[:, :, :, col['DescontoAplicado']] = discount_levels[None, :, None] * full_price * item_quantity
+    X[:, :, :, col['QuantidadeLiquida']] = item_quantity
+    X[:, :, :, col['AcrescimoAplicado']] = np.array([c['item_surcharge'] for c in contexts])[:, None, None]
+    window = np.array([c['item_window'] for c in contexts])
+    X[:, :, :, col['Quantidade_rolling_mean_7']] = window[:, 0, None, None]
+    X[:, :, :, col['Quantidade_rolling_std_7']] = window[:, 1, None, None]
+    X[:, :, :, col['Quantidade_rolling_sum_7']] = window[:, 2, None, None]
+    return X.reshape(n_products, n_levels * horizon, len(QUANTITY_FEATURES))
+
+def demand_response(contexts, used, discount_levels, elasticities=None):
+    """
+    Multiplicador da demanda sem promoção para cada produto e nível de desconto.
+
+    Args:
+        elasticities (pd.DataFrame, optional): CodigoProduto, Elasticidade e LiftPromocao (tabela
+            `elasticidades`). Padrão: estimadas agora sobre o histórico diário dos produtos.
+
+    Returns:
+        tuple: ((P, K + 1) multiplicadores, máscara (P,) dos produtos com elasticidade).
+    """
+    if elasticities is None:
+        daily = pd.concat([c['daily'].assign(CodigoProduto=produto) for c, produto in zip(contexts, used)],
+                          ignore_index=True)
+        elasticities = estimate_elasticities(daily)
+    if elasticities.empty:
+        return np.ones((len(used), len(discount_levels))), np.zeros(len(used), dtype=bool)
+    table = elasticities.set_index(elasticities['CodigoProduto'].astype(int))
+    e = table['Elasticidade'].reindex(used).to_numpy(dtype=np.float64)
+    lift = table['LiftPromocao'].reindex(used).to_numpy(dtype=np.float64)
+    available = ~np.isnan(e)
+    e = np.minimum(np.nan_to_num(e), 0.0)
+    lift = np.clip(np.nan_to_num(lift), -1.0, None)
+    response = (1 - discount_levels[None, :]) ** e[:, None]
+    response[:, 1:] *= 1 + lift[:, None]
+    return response, available
+
+def scenario_windows(horizon, durations):
+    """
+    Pares (início, fim exclusivo) de todas as promoções candidatas que cabem no horizonte.
+    """
+    starts, ends = [], []
+    for duration in durations:
+        s = np.arange(0, horizon - duration + 1)
+        starts.append(s)
+        ends.append(s + duration)
+    return np.concatenate(starts), np.concatenate(ends)
+
+def simulate_promotions(produtos, horizon=30, start=None, discount_levels=DEFAULT_DISCOUNT_LEVELS,
+                        durations=DEFAULT_DURATIONS, rank_by='UpliftMargem', top_n=None, window_size=7,
+                        elasticities=None):
+    """
+    Avalia, para vários produtos de uma vez, todas as promoções candidatas da grade
+    (nível de desconto × início × duração) contra o cenário sem promoção.
+
+    Os modelos são chamados uma vez por tipo sobre a grade diária, com todos os produtos em um
+    único grafo: o de quantidade projeta a demanda sem promoção e a elasticidade escala essa
+    demanda em cada nível de desconto. Como a projeção de cada dia depende só do nível de
+    desconto, os totais de cada cenário saem de somas acumuladas ao longo do horizonte, o que
+    permite milhares de cenários por produto sem novas chamadas aos modelos.
+
+    Args:
+        produtos (list): Códigos dos produtos (com datasets e modelos de preço e quantidade).
+        horizon (int): Dias à frente considerados.
+        start (str/Timestamp, optional): Primeiro dia do horizonte. Padrão: dia seguinte ao último
+            dia observado entre os produtos.
+        discount_levels (iterable): Descontos (fração do preço) avaliados.
+        durations (iterable): Durações (dias) das promoções.
+        rank_by (str): Coluna usada na ordenação (UpliftUnidades, UpliftReceita ou UpliftMargem).
+        top_n (int, optional): Mantém apenas os N melhores cenários de cada produto.
+        window_size (int): Tamanho da janela deslizante usada no treino.
+        elasticities (pd.DataFrame, optional): Elasticidades já estimadas (ver `demand_response`).
+
+    Returns:
+        pd.DataFrame: Um cenário por linha, com unidades, receita e margem projetadas no período
+        da promoção e os ganhos em relação ao cenário sem promoção.
+    """
+    contexts, price_models, quantity_models, used = [], [], [], []
+    for produto in produtos:
+        price_path = MODELS_DIR / "price" / f"produto_{produto}_unit_price_model" / f"produto_{produto}_unit_price_model.keras"
+        quantity_path = MODELS_DIR / "quantity" / f"produto_{produto}_quantity_model.keras"
+        context = load_product_context(produto, window_size) if price_path.exists() and quantity_path.exists() else None
+        if context is None:
+            logger.warning(f"Produto {produto} sem modelos ou dados suficientes; fora da simulação.")
+            continue
+        contexts.append(context)
+        price_models.append(tf.keras.models.load_model(price_path))
+        quantity_models.append(tf.keras.models.load_model(quantity_path))
+        used.append(int(produto))
+    if not used:
+        return pd.DataFrame()
+
+    start = pd.Timestamp(start) if start is not None else max(c['last_date'] for c in contexts) + pd.Timedelta(1, 'D')
+    dates = pd.date_range(start, periods=horizon, freq='D')
+    calendar = build_calendar(dates)
+    levels = np.concatenate([[0.0], np.asarray(discount_levels, dtype=np.float64)])
+    n_products = len(used)
+
+    # 1) Preço previsto sem e com o flag de promoção: (P, 2, H)
+    log_price = _make_batched_predictor(price_models)(build_price_grid(contexts, calendar, window_size))
+    base_price = np.expm1(log_price).reshape(n_products, 2, horizon)
+    # Os descontos incidem sobre o preço sem promoção (nível 0 = desconto zero). O preço previsto
+    # com o flag já embute o desconto típico das promoções passadas: serve só de conferência
+    unit_price = base_price[:, :1, :] * (1 - levels[None, :, None])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        implied = np.nanmedian(1 - base_price[:, 1, :] / base_price[:, 0, :], axis=1)
+    logger.info(
+        f"Desconto implícito do modelo de preço com promoção (mediana entre produtos): {np.nanmedian(implied):.1%}; "
+        f"níveis simulados: {', '.join(f'{level:.0%}' for level in levels[1:])}."
+    )
+
+    # 2) Quantidade por item sem promoção, escalada pelos itens esperados no dia, e resposta da
+    # demanda a cada nível pela elasticidade: (P, K + 1, H)
+    item_quantity = _make_batched_predictor(quantity_models)(
+        build_quantity_grid(contexts, calendar, unit_price[:, :1, :], levels[:1])
+    ).reshape(n_products, horizon)
+    lines = np.stack([c['lines_per_weekday'] for c in contexts])[:, dates.dayofweek.to_numpy()]
+    response, available = demand_response(contexts, used, levels, elasticities)
+    if not available.all():
+        logger.warning(
+            f"{int((~available).sum())} produtos sem elasticidade estimada; a demanda deles não reage ao desconto."
+        )
+    units = (np.clip(item_quantity, 0, None) * lines)[:, None, :] * response[:, :, None]
+    cost = np.array([c['cost'] for c in contexts])[:, None, None]
+    revenue = units * unit_price
+    margin = units * (unit_price - cost)
+
+    # 3) Totais por cenário via somas acumuladas: (P, K, S)
+    s, e = scenario_windows(horizon, durations)
+
+    def window_sums(values):
+        cumulative = np.concatenate([np.zeros(values.shape[:-1] + (1,)), np.cumsum(values, axis=-1)], axis=-1)
+        return cumulative[..., e] - cumulative[..., s]
+
+    totals = {name: window_sums(values) for name, values in
+              [('Unidades', units), ('Receita', revenue), ('Margem', margin)]}
+
+    n_levels, n_windows = len(levels) - 1, len(s)
+    shape = (n_products, n_levels, n_windows)
+    df = pd.DataFrame({
+        'CodigoProduto': np.repeat(used, n_levels * n_windows),
+        'Desconto': np.tile(np.repeat(levels[1:], n_windows), n_products),
+        'DataInicio': np.tile(dates[s].to_numpy(), n_products * n_levels),
+        'Dias': np.tile(e - s, n_products * n_levels),
+    })
+    for name, sums in totals.items():
+        promo = sums[:, 1:, :]
+        baseline = np.broadcast_to(sums[:, :1, :], shape)
+        df[name] = promo.ravel()
+        df[f'{name}SemPromocao'] = baseline.ravel()
+        df[f'Uplift{name}'] = (promo - baseline).ravel()
+
+    df = df.sort_values(['CodigoProduto', rank_by], ascending=[True, False])
+    if top_n:
+        df = df.groupby('CodigoProduto', sort=False).head(top_n)
+    logger.info(f"{len(s) * n_levels} cenários avaliados por produto em {n_products} produtos.")
+    return df.reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulação de cenários de promoção (what-if).")
+    parser.add_argument('produtos', type=int, nargs='+', help="Códigos dos produtos.")
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--rank-by', default='UpliftMargem', choices=['UpliftUnidades', 'UpliftReceita', 'UpliftMargem'])
+    parser.add_argument('--top-n', type=int, default=20)
+    args = parser.parse_args()
+
+    df_scenarios = simulate_promotions(
+        args.produtos, horizon=args.horizon, start=args.start, rank_by=args.rank_by, top_n=args.top_n
+    )
+    output_path = BASE_DATA_DIR / "reports" / "promotion_scenarios.csv"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    df_scenarios.to_csv(output_path, index=False)
+    logger.info(f"Cenários de promoção salvos em {output_path}.")
@@ -0,0 +1,153 @@
+import json
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.utils.logging_config import get_logger
+from src.utils.state_file import save_state
+
+logger = get_logger(__name__)
+
+# Colunas do dataset diário monitoradas para drift
+DRIFT_COLUMNS = ['ValorUnitarioMedio', 'QuantidadeLiquida', 'PrecoemPromocao', 'ValorCusto']
+# Janela (dias) mais recente comparada com a mesma janela no momento do último treino
+DRIFT_WINDOW_DAYS = 28
+# Diferença de médias padronizada (|média recente - média ref| / desvio ref) que caracteriza drift
+DRIFT_THRESHOLD = 0.5
+# MAPE (%) acima do qual o modelo é retreinado, independentemente da referência
+MAX_MAPE = 30.0
+# Piora relativa do MAE em relação ao MAE logo após o último treino
+MAX_MAE_DEGRADATION = 0.25
+
+class RetrainingPolicy:
+    """
+    Decide quais produtos/modelos precisam ser retreinados, com base no erro recente (MAE/MAPE
+    fora da amostra, nos dias posteriores ao último treino) e no drift das features do dataset diário.
+
+    O estado por produto e tipo de modelo ('price' ou 'quantity') fica em um arquivo JSON:
+    métricas logo após o treino (referência), métricas mais recentes e estatísticas das
+    features nos últimos dias disponíveis quando o modelo foi treinado.
+    """
+    def __init__(self, state_path: Path, force=False):
+        """
+        Args:
+            state_path (Path): Arquivo JSON com o estado da política.
+            force (bool): Retreina tudo (equivale ao comportamento anterior).
+        """
+        self.state_path = Path(state_path)
+        self.force = force
+        self.state = {}
+        if self.state_path.exists():
+            with open(self.state_path, encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def _entry(self, produto, kind):
+        return self.state.setdefault(str(produto), {}).setdefault(kind, {})
+
+    def _save(self, produto=None):
+        # Outros workers podem ter gravado outros produtos desde a leitura: mescla só este produto, sob lock
+        self.state = save_state(self.state_path, self.state, produto)
+
+    @staticmethod
+    def _recent_window(df_daily: pd.DataFrame):
+        cutoff = df_daily['Data'].max() - pd.Timedelta(DRIFT_WINDOW_DAYS, unit='D')
+        return df_daily[df_daily['Data'] > cutoff]
+
+    @staticmethod
+    def feature_stats(df_daily: pd.DataFrame):
+        """
+        Calcula a média da janela recente e o desvio do histórico completo das colunas monitoradas.
+        """
+        recent = RetrainingPolicy._recent_window(df_daily)
+        stats = {}
+        for col in DRIFT_COLUMNS:
+            if col in df_daily.columns:
+                stats[col] = {
+                    'mean': float(recent[col].astype(float).mean()),
+                    'std': float(df_daily[col].astype(float).std(ddof=0)),
+                }
+        return stats
+
+    def drift_scores(self, produto, kind, df_daily: pd.DataFrame):
+        """
+        Diferença de médias padronizada, por coluna, entre a janela recente atual e a janela
+        recente no momento do último treino.
+        """
+        reference = self._entry(produto, kind).get('feature_stats')
+        if not reference or df_daily.empty:
+            return {}
+
+        recent = self.feature_stats(df_daily)
+
+        scores = {}
+        for col, ref in reference.items():
+            if col not in recent:
+                continue
+            # Colunas quase constantes (ex.: sem promoções no treino) usam um desvio mínimo
+            scale = max(ref['std'], abs(ref['mean']) * 0.05, 1e-6)
+            scores[col] = abs(recent[col]['mean'] - ref['mean']) / scale
+        return scores
+
+    def should_retrain(self, produto, kind, model_path: Path, df_daily: pd.DataFrame):
+        """
+        Indica se o modelo do produto precisa ser (re)treinado nesta execução.
+
+        Args:
+            produto (int): Código do produto.
+            kind (str): 'price' ou 'quantity'.
+            model_path (Path): Modelo exportado (.keras) do produto.
+            df_daily (pd.DataFrame): Dataset diário do produto (com 'Data' e as colunas monitoradas).
+
+        Returns:
+            tuple: (bool, str) decisão e motivo.
+        """
+        entry = self._entry(produto, kind)
+
+        if self.force:
+            return True, "retreino forçado"
+        if not Path(model_path).exists():
+            return True, "modelo inexistente"
+        if 'trained_at' not in entry and 'baseline' not in entry:
+            return True, "modelo sem histórico na política"
+
+        # Sem dias posteriores ao último treino ainda não há erro fora da amostra: vale só o drift
+        recent, baseline = entry.get('recent', {}), entry.get('baseline', {})
+        if recent.get('mape') is not None and recent['mape'] > MAX_MAPE:
+            return True, f"MAPE recente {recent['mape']:.2f}% acima de {MAX_MAPE}%"
+        if baseline.get('mae') and recent.get('mae') is not None:
+            degradation = recent['mae'] / baseline['mae'] - 1
+            if degradation > MAX_MAE_DEGRADATION:
+                return True, f"MAE piorou {degradation:.0%} desde o último treino"
+
+        drift = {col: score for col, score in self.drift_scores(produto, kind, df_daily).items()
+                 if score > DRIFT_THRESHOLD}
+        if drift:
+            return True, f"drift nas features: {', '.join(f'{c}={s:.2f}' for c, s in drift.items())}"
+
+        return False, "erro e features estáveis"
+
+    def record_training(self, produto, kind, df_daily: pd.DataFrame):
+        """
+        Registra o treino: guarda as estatísticas das features no momento do treino e zera a
+        referência de erro, que passa a ser a primeira métrica calculada após este treino.
+        """
+        entry = self._entry(produto, kind)
+        entry['trained_at'] = datetime.now().isoformat(timespec='seconds')
+        entry['feature_stats'] = self.feature_stats(df_daily)
+        entry.pop('baseline', None)
+        entry.pop('recent', None)
+        self._save(produto)
+
+    def record_metrics(self, produto, kind, metrics):
+        """
+        Registra MAE/MAPE mais recentes do produto, medidos fora da amostra (`out_of_sample_metrics`
+        dos módulos de treino); a primeira medida após um treino vira a referência.
+        """
+        if not metrics:
+            return
+        entry = self._entry(produto, kind)
+        metrics = {k: (float(v) if v is not None and np.isfinite(v) else None) for k, v in metrics.items()}
+        metrics['at'] = datetime.now().isoformat(timespec='seconds')
+        entry['recent'] = metrics
+        entry.setdefault('baseline', metrics)
+        self._save(produto)
@@ -0,0 +1,210 @@
+# Este módulo define o caminho de modelos sequenciais (LSTM) dos notebooks, dentro do pacote:
+# as séries diárias de vários produtos ficam em um único buffer e as janelas deslizantes são
+# views por strides sobre ele (sem cópias); só os lotes sorteados a cada passo são materializados.
+
+import argparse
+import json
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from pathlib import Path
+from numpy.lib.stride_tricks import sliding_window_view
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+BASE_DATA_DIR = Path(__file__).parent.parent.parent / "data"
+MODEL_BASE_DIR = Path(__file__).parent.parent.parent / "models" / "sequence"
+
+# Dias de contexto de cada janela (como nos notebooks)
+SEQUENCE_LOOKBACK = 30
+# Dias finais de cada produto usados como validação
+VALIDATION_DAYS = 90
+# Colunas do dataset diário de preço que podem ser previstas, e o preenchimento dos dias sem venda
+SEQUENCE_TARGETS = {
+    'ValorUnitarioMedio': 'ffill',
+    'QuantidadeLiquida': 'zero',
+}
+
+def load_series(produto_id, target):
+    """
+    Série diária contínua (dias sem venda preenchidos) de `target` a partir do dataset de preço.
+
+    Returns:
+        pd.Series: Valores indexados pela data.
+    """
+    file_path = BASE_DATA_DIR / "cleaned" / f"produto_{produto_id}_price.csv"
+    df = pd.read_csv(file_path, usecols=['Data', target], parse_dates=['Data'])
+    series = df.set_index('Data')[target]
+    series = series.reindex(pd.date_range(series.index.min(), series.index.max(), freq='D'))
+    return series.fillna(0) if SEQUENCE_TARGETS[target] == 'zero' else series.ffill().bfill()
+
+class SeriesPanel:
+    """
+    Séries de vários produtos, padronizadas por produto, concatenadas em um único buffer float32.
+
+    Args:
+        series (dict): {produto: pd.Series diária}.
+        lookback (int): Dias de contexto de cada janela.
+        stats (dict, optional): {produto: (média, desvio)}; por padrão calculados fora da validação.
+    """
+
+    def __init__(self, series, lookback=SEQUENCE_LOOKBACK, stats=None):
+        self.lookback = lookback
+        self.produtos = [p for p, s in series.items() if len(s) > lookback]
+        self.dates = {p: series[p].index for p in self.produtos}
+        self.stats = stats or {}
+
+        lengths = np.array([len(series[p]) for p in self.produtos], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)])
+        self.values = np.empty(self.offsets[-1], dtype=np.float32)
+        for i, produto in enumerate(self.produtos):
+            raw = series[produto].to_numpy(dtype=np.float64)
+            if produto not in self.stats:
+                fit = raw[:max(len(raw) - VALIDATION_DAYS, lookback + 1)]
+                self.stats[produto] = (float(fit.mean()), float(fit.std()) or 1.0)
+            mean, std = self.stats[produto]
+            self.values[self.offsets[i]:self.offsets[i + 1]] = (raw - mean) / std
+
+        # (len(values) - lookback, lookback + 1): view sobre o buffer, sem cópia
+        self.windows = sliding_window_view(self.values, lookback + 1)
+
+    def window_starts(self, validation_days=VALIDATION_DAYS):
+        """
+        Índices (no buffer) das janelas que não cruzam a fronteira entre produtos.
+
+        Returns:
+            tuple: (janelas de treino, janelas de validação), pela posição do alvo na série.
+        """
+        train, validation = [], []
+        for i in range(len(self.produtos)):
+            start, end = self.offsets[i], self.offsets[i + 1]
+            starts = np.arange(start, end - self.lookback)
+            split = max(len(starts) - validation_days, 0)
+            train.append(starts[:split])
+            validation.append(starts[split:])
+        return np.concatenate(train), np.concatenate(validation)
+
+    def last_windows(self):
+        """
+        Últimas `lookback` observações de cada produto, (P, lookback, 1), para prever o dia seguinte.
+        """
+        starts = self.offsets[1:] - self.lookback
+        return sliding_window_view(self.values, self.lookback)[starts][..., None]
+
+    def denormalize(self, values):
+        mean = np.array([self.stats[p][0] for p in self.produtos])
+        std = np.array([self.stats[p][1] for p in self.produtos])
+        return np.asarray(values).reshape(len(self.produtos)) * std + mean
+
+class WindowBatches(tf.keras.utils.Sequence):
+    """
+    Lotes de janelas para o `fit`: cada lote é um gather sobre a view de janelas do painel.
+    """
+
+    def __init__(self, panel: SeriesPanel, starts, batch_size=256, shuffle=True, seed=42):
+        super().__init__()
+        self.panel = panel
+        self.starts = starts
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.order = starts.copy()
+        self.on_epoch_end()
+
+    def __len__(self):
+        return int(np.ceil(len(self.starts) / self.batch_size))
+
+    def __getitem__(self, index):
+        batch = self.panel.windows[self.order[index * self.batch_size:(index + 1) * self.batch_size]]
+        return batch[:, :-1, None], batch[:, -1]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self.rng.shuffle(self.order)
+
+def build_sequence_model(lookback=SEQUENCE_LOOKBACK, units=64, learning_rate=5e-4):
+    """
+    LSTM compartilhado entre os produtos (as séries chegam padronizadas por produto).
+    """
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(lookback, 1)),
+        tf.keras.layers.LSTM(units),
+        tf.keras.layers.Dropout(0.1),
+        tf.keras.layers.Dense(1),
+    ])
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate), loss='mae')
+    return model
+
+def _paths(target):
+    return MODEL_BASE_DIR / f"{target}_lstm.keras", MODEL_BASE_DIR / f"{target}_lstm_stats.json"
+
+def train_sequence_model(produtos, target='ValorUnitarioMedio', lookback=SEQUENCE_LOOKBACK, epochs=30, batch_size=256):
+    """
+    Treina um LSTM sobre as janelas de todos os produtos e salva o modelo e a padronização.
+
+    Args:
+        produtos (list): Códigos dos produtos (com dataset de preço em data/cleaned).
+        target (str): Coluna prevista (uma de SEQUENCE_TARGETS).
+        lookback (int): Dias de contexto.
+        epochs (int): Épocas máximas (com parada antecipada).
+        batch_size (int): Janelas por lote.
+
+    Returns:
+        dict: Perdas finais de treino e validação.
+    """
+    MODEL_BASE_DIR.mkdir(parents=True, exist_ok=True)
+    panel = SeriesPanel({p: load_series(p, target) for p in produtos}, lookback)
+    train_starts, val_starts = panel.window_starts()
+    logger.info(
+        f"Treinando LSTM de {target}: {len(panel.produtos)} produtos, "
+        f"{len(train_starts)} janelas de treino e {len(val_starts)} de validação."
+    )
+
+    model = build_sequence_model(lookback)
+    history = model.fit(
+        WindowBatches(panel, train_starts, batch_size),
+        validation_data=WindowBatches(panel, val_starts, batch_size, shuffle=False) if len(val_starts) else None,
+        epochs=epochs,
+        callbacks=[tf.keras.callbacks.EarlyStopping(monitor='val_loss' if len(val_starts) else 'loss',
+                                                    patience=5, restore_best_weights=True)]
+    )
+
+    model_path, stats_path = _paths(target)
+    model.save(model_path)
+    with open(stats_path, 'w') as f:
+        json.dump({'lookback': lookback, 'stats': {str(p): s for p, s in panel.stats.items()}}, f)
+    logger.info(f"LSTM de {target} salvo em {model_path}.")
+    return {key: values[-1] for key, values in history.history.items()}
+
+def predict_next_day(produtos, target='ValorUnitarioMedio'):
+    """
+    Prevê o dia seguinte ao último do histórico de cada produto, em uma única chamada ao modelo.
+
+    Returns:
+        pd.DataFrame: CodigoProduto, Data e Predicted_<target>.
+    """
+    model_path, stats_path = _paths(target)
+    with open(stats_path) as f:
+        saved = json.load(f)
+    stats = {int(p): tuple(s) for p, s in saved['stats'].items()}
+    panel = SeriesPanel({p: load_series(p, target) for p in produtos}, saved['lookback'], stats)
+
+    model = tf.keras.models.load_model(model_path)
+    predictions = panel.denormalize(model.predict(panel.last_windows(), verbose=0))
+    return pd.DataFrame({
+        'CodigoProduto': panel.produtos,
+        'Data': [panel.dates[p][-1] + pd.Timedelta(1, 'D') for p in panel.produtos],
+        f'Predicted_{target}': predictions,
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treina o LSTM compartilhado sobre as séries diárias dos produtos.")
+    parser.add_argument('produtos', type=int, nargs='+', help="Códigos dos produtos.")
+    parser.add_argument('--target', choices=list(SEQUENCE_TARGETS), default='ValorUnitarioMedio')
+    parser.add_argument('--lookback', type=int, default=SEQUENCE_LOOKBACK)
+    parser.add_argument('--epochs', type=int, default=30)
+    args = parser.parse_args()
+
+    losses = train_sequence_model(args.produtos, target=args.target, lookback=args.lookback, epochs=args.epochs)
+    logger.info(f"Perdas finais do LSTM compartilhado: {losses}")
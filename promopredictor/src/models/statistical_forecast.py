@@ -0,0 +1,223 @@
+# Este módulo define o caminho estatístico rápido para a cauda longa do catálogo: os produtos
+# são classificados por volume e intermitência, e os de baixo giro são previstos em lote, como
+# uma matriz (produtos × dias), por Croston/SBA, suavização exponencial e sazonal ingênuo.
+# Só a cabeça do catálogo segue para a busca AutoKeras.
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from src.utils.logging_config import get_logger
+from src.data_processing.promotions import load_daily_sales
+
+logger = get_logger(__name__)
+
+BASE_DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+# Dias de histórico usados na classificação e no ajuste
+HISTORY_DAYS = 365
+# Intervalo médio entre demandas (ADI) acima do qual a demanda é intermitente (Syntetos-Boylan)
+ADI_THRESHOLD = 1.32
+# Coeficiente de variação ao quadrado dos tamanhos acima do qual a demanda é errática/irregular
+CV2_THRESHOLD = 0.49
+# Vendas médias diárias mínimas (unidades) para um produto ir para os modelos neurais
+MIN_DAILY_UNITS = 1.0
+# Dias finais do histórico usados para escolher o método de cada produto
+SELECTION_HOLDOUT_DAYS = 28
+# Semanas médias do sazonal ingênuo (mesmo dia da semana)
+SEASONAL_WEEKS = 4
+# Grade de alfas ajustada em paralelo (uma linha por alfa)
+ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5])
+
+METHODS = ('croston_sba', 'ses', 'seasonal_naive')
+
+def sales_matrix(df_daily, start, end):
+    """
+    Matriz (produtos × dias) de quantidade líquida diária, com zeros nos dias sem venda.
+
+    Returns:
+        tuple: (códigos dos produtos, datas, matriz (P, T)).
+    """
+    dates = pd.date_range(start, end, freq='D')
+    pivot = df_daily.pivot_table(index='CodigoProduto', columns='Data', values='QuantidadeLiquida', aggfunc='sum')
+    pivot = pivot.reindex(columns=dates).fillna(0).clip(lower=0)
+    return pivot.index.to_numpy(), dates, pivot.to_numpy(dtype=np.float64)
+
+def classify_demand(Y):
+    """
+    Classifica a demanda de cada produto (linhas de Y) pelo ADI e pelo CV² dos tamanhos.
+
+    Returns:
+        pd.DataFrame: ADI, CV2, MediaDiaria e Classe ('smooth', 'erratic', 'intermittent', 'lumpy', 'sem_venda').
+    """
+    nonzero = Y > 0
+    n_nonzero = nonzero.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adi = Y.shape[1] / n_nonzero
+        size_mean = Y.sum(axis=1) / n_nonzero
+        size_var = (np.where(nonzero, Y - size_mean[:, None], 0) ** 2).sum(axis=1) / n_nonzero
+        cv2 = size_var / size_mean ** 2
+
+    intermittent = adi > ADI_THRESHOLD
+    variable = cv2 > CV2_THRESHOLD
+    classes = np.select(
+        [n_nonzero == 0, intermittent & variable, intermittent, variable],
+        ['sem_venda', 'lumpy', 'intermittent', 'erratic'],
+        default='smooth'
+    )
+    return pd.DataFrame({'ADI': adi, 'CV2': np.nan_to_num(cv2), 'MediaDiaria': Y.mean(axis=1), 'Classe': classes})
+
+def croston_sba(Y):
+    """
+    Croston com correção de Syntetos-Boylan para todos os produtos e todos os alfas de uma vez.
+
+    Returns:
+        tuple: (previsão por dia (A, P), erro quadrático um passo à frente (A, P)).
+    """
+    A, (P, T) = len(ALPHAS), Y.shape
+    alpha = ALPHAS[:, None]
+    first = np.argmax(Y > 0, axis=1)
+    z = np.broadcast_to(Y[np.arange(P), first], (A, P)).copy()
+    p = np.ones((A, P))
+    q = np.ones((A, P))
+    sse = np.zeros((A, P))
+    for t in range(T):
+        y = Y[:, t]
+        started = t > first
+        forecast = (1 - alpha / 2) * z / p
+        sse += np.where(started, (y - forecast) ** 2, 0)
+        demand = (y > 0) & started
+        z = np.where(demand, z + alpha * (y - z), z)
+        p = np.where(demand, p + alpha * (q - p), p)
+        q = np.where(demand, 1, q + started)
+    return (1 - alpha / 2) * z / p, sse
+
+def ses(Y):
+    """
+    Suavização exponencial simples para todos os produtos e todos os alfas de uma vez.
+
+    Returns:
+        tuple: (previsão por dia (A, P), erro quadrático um passo à frente (A, P)).
+    """
+    alpha = ALPHAS[:, None]
+    level = np.broadcast_to(Y[:, 0], (len(ALPHAS), Y.shape[0])).copy()
+    sse = np.zeros_like(level)
+    for t in range(1, Y.shape[1]):
+        y = Y[:, t]
+        sse += (y - level) ** 2
+        level += alpha * (y - level)
+    return level, sse
+
+def _best_alpha(forecast, sse):
+    return forecast[np.argmin(sse, axis=0), np.arange(forecast.shape[1])]
+
+def forecast_matrix(Y, dates, horizon):
+    """
+    Previsão de H dias de todos os produtos pelos três métodos.
+
+    Returns:
+        dict: {método: matriz (P, H)}.
+    """
+    future_weekday = pd.date_range(dates[-1] + pd.Timedelta(1, 'D'), periods=horizon, freq='D').dayofweek.to_numpy()
+
+    # Sazonal ingênuo: média das últimas SEASONAL_WEEKS ocorrências de cada dia da semana
+    recent = Y[:, -7 * SEASONAL_WEEKS:]
+    recent_weekday = dates[-7 * SEASONAL_WEEKS:].dayofweek.to_numpy()
+    by_weekday = np.stack([recent[:, recent_weekday == d].mean(axis=1) for d in range(7)], axis=1)
+
+    return {
+        'croston_sba': np.repeat(_best_alpha(*croston_sba(Y))[:, None], horizon, axis=1),
+        'ses': np.repeat(_best_alpha(*ses(Y))[:, None], horizon, axis=1),
+        'seasonal_naive': by_weekday[:, future_weekday],
+    }
+
+def select_methods(Y, dates):
+    """
+    Escolhe, por produto, o método com menor MAE nos últimos SELECTION_HOLDOUT_DAYS dias.
+
+    Returns:
+        tuple: (índice do método em METHODS por produto, MAE de cada método (P, len(METHODS))).
+    """
+    holdout = SELECTION_HOLDOUT_DAYS
+    forecasts = forecast_matrix(Y[:, :-holdout], dates[:-holdout], holdout)
+    mae = np.stack([np.abs(forecasts[m] - Y[:, -holdout:]).mean(axis=1) for m in METHODS], axis=1)
+    return np.argmin(mae, axis=1), mae
+
+def load_demand(db_manager, history_days=HISTORY_DAYS):
+    """
+    Carrega o último ano de vendas de todo o catálogo como matriz (produtos × dias).
+    """
+    end = db_manager.execute_query("SELECT MAX(Data) FROM vendas", local=True, use_cache=False)['data'][0][0]
+    if end is None:
+        return np.array([]), pd.DatetimeIndex([]), np.empty((0, 0))
+    end = pd.Timestamp(end)
+    start = end - pd.Timedelta(history_days - 1, unit='D')
+    return sales_matrix(load_daily_sales(db_manager, start, end), start, end)
+
+def route_products(ranked, produtos, Y):
+    """
+    Separa a lista priorizada entre a cabeça (modelos neurais) e a cauda longa (estatísticos).
+
+    Vão para a cabeça os produtos de demanda regular (ADI <= ADI_THRESHOLD) que vendem pelo
+    menos MIN_DAILY_UNITS por dia; os demais, e os sem venda no período, vão para a cauda.
+
+    Args:
+        ranked (list): Saída de `ProductScheduler.rank`.
+        produtos (np.ndarray): Produtos das linhas de Y.
+        Y (np.ndarray): Matriz (P, T) de `load_demand`.
+
+    Returns:
+        tuple: (itens da cabeça, na ordem de `ranked`; códigos dos produtos da cauda).
+    """
+    classes = classify_demand(Y).set_index(pd.Index(produtos))
+    head_products = set(classes.index[(classes['ADI'] <= ADI_THRESHOLD) & (classes['MediaDiaria'] >= MIN_DAILY_UNITS)])
+    head = [item for item in ranked if item['produto'] in head_products]
+    tail = [item['produto'] for item in ranked if item['produto'] not in head_products]
+    logger.info(f"Roteamento: {len(head)} produtos para os modelos neurais, {len(tail)} para o caminho estatístico.")
+    return head, tail
+
+def forecast_long_tail(produtos, dates, Y, selected=None, horizon=30, save=True):
+    """
+    Prevê a quantidade dos produtos da cauda longa em lote, com o melhor método de cada um.
+
+    Args:
+        produtos (np.ndarray): Produtos das linhas de Y.
+        dates (pd.DatetimeIndex): Datas das colunas de Y.
+        Y (np.ndarray): Matriz (P, T) de vendas diárias.
+        selected (list, optional): Restringe a previsão a esses produtos.
+        horizon (int): Dias previstos.
+        save (bool): Salva data/predictions/statistical_forecast.csv.
+
+    Returns:
+        pd.DataFrame: CodigoProduto, Data, Predicted_QuantidadeLiquida, Metodo e Classe.
+    """
+    if selected is not None:
+        mask = np.isin(produtos, selected)
+        produtos, Y = produtos[mask], Y[mask]
+    if len(produtos) == 0:
+        return pd.DataFrame(columns=['CodigoProduto', 'Data', 'Predicted_QuantidadeLiquida', 'Metodo', 'Classe'])
+
+    classes = classify_demand(Y)['Classe'].to_numpy()
+    best, _ = select_methods(Y, dates)
+    forecasts = forecast_matrix(Y, dates, horizon)
+    stacked = np.stack([forecasts[m] for m in METHODS], axis=0)
+    chosen = stacked[best, np.arange(len(produtos))]
+
+    future = pd.date_range(dates[-1] + pd.Timedelta(1, 'D'), periods=horizon, freq='D')
+    df_forecast = pd.DataFrame({
+        'CodigoProduto': np.repeat(produtos, horizon),
+        'Data': np.tile(future, len(produtos)),
+        'Predicted_QuantidadeLiquida': chosen.ravel(),
+        'Metodo': np.repeat(np.array(METHODS)[best], horizon),
+        'Classe': np.repeat(classes, horizon),
+    })
+    logger.info(
+        f"Cauda longa: {len(produtos)} produtos previstos "
+        f"({pd.Series(np.array(METHODS)[best]).value_counts().to_dict()})."
+    )
+
+    if save:
+        output_path = BASE_DATA_DIR / "predictions" / "statistical_forecast.csv"
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        df_forecast.to_csv(output_path, index=False)
+        logger.info(f"Previsões estatísticas salvas em {output_path}.")
+    return df_forecast
@@ -3,7 +3,10 @@ import pandas as pd
 import tensorflow as tf
 from pathlib import Path
 from src.utils.logging_config import get_logger
-from src.data_processing.feature_engineering import add_rolling_features
+from src.data_processing.feature_engineering import QUANTITY_FEATURES, add_rolling_features
+from src.models.incremental_training import (
+    fine_tune, save_metadata, split_train_validation, evaluate_out_of_sample, FINE_TUNED, SEARCH_REQUIRED
+)
 
 logger = get_logger(__name__)
 
@@ -38,11 +41,8 @@ def load_data(produto_id, window_size=7):
     # Remover valores nulos
     df = df.dropna()
     
-    # Separar dados de treinamento (até 2022) e validação (2023)
-    train_data = df[(df['Data'] >= '2019-01-01') & (df['Data'] <= '2022-12-31')]
-    validation_data = df[(df['Data'] >= '2023-01-01') & (df['Data'] <= '2023-12-31')]
-    
-    return train_data, validation_data
+    # Validação: os últimos dias do histórico; treino: o restante
+    return split_train_validation(df)
 
 def prepare_features_and_target(df):
     """
@@ -54,19 +54,33 @@ def prepare_features_and_target(df):
     Retorna:
         tuple: (numpy.ndarray, numpy.ndarray)
     """
-    features = [
-        'DiaDaSemana', 'Mes', 'Dia', 'QuantidadeLiquida',
-        'Rentabilidade', 'DescontoAplicado', 'AcrescimoAplicado',
-        'Quantidade_rolling_mean_7', 'Quantidade_rolling_std_7', 'Quantidade_rolling_sum_7'
-    ]
+    features = QUANTITY_FEATURES
     target = 'Quantidade'
     X = df[features].to_numpy()
     y = df[target].to_numpy()
     return X, y
 
-def train_model(produto_id, window_size=7):
+def out_of_sample_metrics(produto_id, window_size=7):
+    """
+    MAE/MAPE do modelo exportado do produto nos dias posteriores ao seu último treino.
+    """
+    df = pd.read_csv(BASE_DATA_DIR / "cleaned" / f"produto_{produto_id}_clean.csv", parse_dates=['Data'])
+    df = add_rolling_features(df, columns=['Quantidade'], window_size=window_size).dropna()
+    X, y = prepare_features_and_target(df)
+    return evaluate_out_of_sample(MODEL_BASE_DIR / f"produto_{produto_id}_quantity_model.keras", df['Data'], X, y)
+
+def train_model(produto_id, window_size=7, incremental=False):
     """
     Treina o modelo usando Auto-Keras e salva o melhor modelo, incorporando janela flutuante.
+
+    Args:
+        produto_id (int): Código do produto.
+        window_size (int): Tamanho da janela deslizante.
+        incremental (bool): Tenta primeiro o ajuste fino do modelo exportado com os dias novos;
+            a busca AutoKeras completa (com o tuner recriado do zero) só roda se a validação piorar.
+
+    Returns:
+        bool: True se um modelo foi treinado ou ajustado; False se não havia dias novos.
     """
     # Criar o diretório para salvar o modelo, se necessário
     MODEL_BASE_DIR.mkdir(parents=True, exist_ok=True)
@@ -82,6 +96,12 @@ def train_model(produto_id, window_size=7):
     X_train, y_train = prepare_features_and_target(train_data)
     X_val, y_val = prepare_features_and_target(validation_data)
 
+    model_path = MODEL_BASE_DIR / f"produto_{produto_id}_quantity_model"
+    status = fine_tune(Path(f"{model_path}.keras"), train_data, X_train, y_train, X_val, y_val) \
+        if incremental else SEARCH_REQUIRED
+    if status != SEARCH_REQUIRED:
+        return status == FINE_TUNED
+
     # Criar o modelo usando Auto-Keras AutoModel
     logger.info(f"Iniciando treinamento para o produto {produto_id}.")
     input_node = Input()
@@ -90,7 +110,7 @@ def train_model(produto_id, window_size=7):
         inputs=input_node, 
         outputs=output_node, 
         max_trials=50,
-        overwrite=False,  # <-- força recriar o tuner do zero
+        overwrite=incremental,  # <-- no modo incremental, recria o tuner do zero em vez de retomar estado antigo
         project_name=str(MODEL_BASE_DIR / f"produto_{produto_id}_quantity_model")
     )
 
@@ -115,10 +135,11 @@ def train_model(produto_id, window_size=7):
     logger.info(f"Resultados de validação para o produto {produto_id}: {evaluation}")
 
     # Salvar o modelo
-    model_path = MODEL_BASE_DIR / f"produto_{produto_id}_quantity_model"
     model.export_model().save(f"{model_path}.keras")
+    save_metadata(Path(f"{model_path}.keras"), train_data['Data'].max(), evaluation['loss'], 'busca')
 
     logger.info(f"Modelo para o produto {produto_id} salvo em {model_path}.keras.")
+    return True
 
 if __name__ == "__main__":
     train_model()
\ No newline at end of file
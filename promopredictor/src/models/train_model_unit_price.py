@@ -4,7 +4,10 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from src.utils.logging_config import get_logger
-from src.data_processing.feature_engineering import add_rolling_features
+from src.data_processing.feature_engineering import PRICE_FEATURES, build_price_features
+from src.models.incremental_training import (
+    fine_tune, save_metadata, split_train_validation, evaluate_out_of_sample, FINE_TUNED, SEARCH_REQUIRED
+)
 
 logger = get_logger(__name__)
 
@@ -30,56 +33,18 @@ def load_price_data(produto_id, window_size=7):
 
     df = pd.read_csv(file_path, parse_dates=['Data'])
 
-    # Adicionar variáveis de defasagem
-    for lag in range(1, 4):
-        df[f'ValorUnitario_lag{lag}'] = df['ValorUnitarioMedio'].shift(lag)
-        df[f'QuantidadeLiquida_lag{lag}'] = df['QuantidadeLiquida'].shift(lag)
+    # Adicionar defasagens e janelas deslizantes (removendo as linhas sem histórico)
+    df = build_price_features(df, window_size=window_size)
 
-    # Adicionar variáveis de janela deslizante
-    df = add_rolling_features(
-        df,
-        columns=['ValorUnitarioMedio', 'QuantidadeLiquida'],
-        window_size=window_size
-    )
-
-    # Remover valores nulos criados pelas defasagens
-    df = df.dropna()
-
-    # Filtra período
-    train_data = df[(df['Data'] >= '2019-01-01') & (df['Data'] <= '2022-12-31')]
-    val_data = df[(df['Data'] >= '2023-01-01') & (df['Data'] <= '2023-12-31')]
-
-    return train_data, val_data
+    # Validação: os últimos dias do histórico; treino: o restante
+    return split_train_validation(df)
 
 def prepare_features_and_target(df: pd.DataFrame, use_log: bool = True):
     """
     Prepara X e y para o modelo.
     Se use_log=True, então a coluna alvo é 'LogValorUnitarioMedio', senão 'ValorUnitarioMedio'.
     """
-    features = [
-        'PrecoemPromocao',
-        'DiaDaSemana',
-        'Mes',
-        'Dia',
-        'QuantidadeLiquida',   
-        'is_holiday',
-        'is_eve1',
-        'is_eve2',
-        'is_eve3',
-        'ValorCusto',
-        'ValorUnitario_lag1',
-        'ValorUnitario_lag2',
-        'ValorUnitario_lag3',
-        'QuantidadeLiquida_lag1',
-        'QuantidadeLiquida_lag2',
-        'QuantidadeLiquida_lag3',
-        'ValorUnitarioMedio_rolling_mean_7',
-        'ValorUnitarioMedio_rolling_std_7',
-        'ValorUnitarioMedio_rolling_sum_7',
-        'QuantidadeLiquida_rolling_mean_7',
-        'QuantidadeLiquida_rolling_std_7',
-        'QuantidadeLiquida_rolling_sum_7',
-    ]
+    features = PRICE_FEATURES
     if use_log:
         target = 'LogValorUnitarioMedio'
     else:
@@ -89,25 +54,48 @@ def prepare_features_and_target(df: pd.DataFrame, use_log: bool = True):
     y = df[target].fillna(0).to_numpy()
     return X, y
 
-def train_model_unit_price(produto_id, window_size=7):
+def out_of_sample_metrics(produto_id, window_size=7):
+    """
+    MAE/MAPE do modelo exportado do produto nos dias posteriores ao seu último treino, na escala original.
+    """
+    model_path = MODEL_BASE_DIR / f"produto_{produto_id}_unit_price_model" / f"produto_{produto_id}_unit_price_model.keras"
+    df = pd.read_csv(BASE_DATA_DIR / "cleaned" / f"produto_{produto_id}_price.csv", parse_dates=['Data'])
+    df = build_price_features(df, window_size=window_size)
+    X, y = prepare_features_and_target(df, use_log=True)
+    return evaluate_out_of_sample(model_path, df['Data'], X, y, inverse=np.expm1)
+
+def train_model_unit_price(produto_id, window_size=7, incremental=False):
     """
     Treina um modelo AutoKeras para valor unitário (possivelmente em log), incorporando janela flutuante.
+
+    Args:
+        produto_id (int): Código do produto.
+        window_size (int): Tamanho da janela deslizante.
+        incremental (bool): Tenta primeiro o ajuste fino do modelo exportado com os dias novos;
+            a busca AutoKeras completa (com o tuner recriado do zero) só roda se a validação piorar.
+
+    Returns:
+        bool: True se um modelo foi treinado ou ajustado; False se não havia dias novos.
     """
-    # Configurar o caminho completo para o project_name
+    # Diretório do produto (modelo exportado e metadados) e, dentro dele, o projeto do tuner:
+    # o overwrite do tuner apaga apenas o próprio projeto, nunca o modelo exportado
     project_dir = MODEL_BASE_DIR / f"produto_{produto_id}_unit_price_model"
     project_dir.mkdir(parents=True, exist_ok=True)
+    tuner_dir = project_dir / f"produto_{produto_id}_unit_price_tuner"
 
-    train_data, val_data = load_price_data(produto_id)
-    
-    # Adicionar variáveis de janela flutuante antes de preparar as features
-    rolling_columns = ['QuantidadeLiquida', 'ValorUnitarioMedio']  # Colunas para calcular rolling features
-    train_data = add_rolling_features(train_data, rolling_columns, window_size)
-    val_data = add_rolling_features(val_data, rolling_columns, window_size)
+    # As janelas deslizantes já vêm calculadas sobre a série completa (build_price_features)
+    train_data, val_data = load_price_data(produto_id, window_size)
 
     # Se quiser usar log, true
     X_train, y_train = prepare_features_and_target(train_data, use_log=True)
     X_val, y_val = prepare_features_and_target(val_data, use_log=True)
 
+    model_path = project_dir / f"produto_{produto_id}_unit_price_model"
+    status = fine_tune(Path(f"{model_path}.keras"), train_data, X_train, y_train, X_val, y_val) \
+        if incremental else SEARCH_REQUIRED
+    if status != SEARCH_REQUIRED:
+        return status == FINE_TUNED
+
     # Criar o modelo
     logger.info(f"Iniciando o treinamento do modelo de valor unitário para o produto {produto_id}.")
     input_node = Input()
@@ -116,8 +104,8 @@ def train_model_unit_price(produto_id, window_size=7):
         inputs=input_node,
         outputs=output_node,
         max_trials=300,
-        overwrite=False,  # <-- força recriar o tuner do zero
-        project_name=str(project_dir)  # <-- nome distinto
+        overwrite=incremental,  # <-- no modo incremental, recria o tuner do zero em vez de retomar estado antigo
+        project_name=str(tuner_dir)  # <-- nome distinto
     )
 
     model.fit(
@@ -139,12 +127,11 @@ def train_model_unit_price(produto_id, window_size=7):
     eval_results = model.evaluate(X_val, y_val, return_dict=True)
     logger.info(f"Resultados de validação para o produto {produto_id}: {eval_results}")
 
-    # Salvar
-    model_path = project_dir / f"produto_{produto_id}_unit_price_model"
-    
     # Salvar o modelo treinado
     model.export_model().save(f"{model_path}.keras")
+    save_metadata(Path(f"{model_path}.keras"), train_data['Data'].max(), eval_results['loss'], 'busca')
     logger.info(f"Modelo de valor unitário para o produto {produto_id} salvo em {model_path}.keras.")
+    return True
 
 if __name__ == "__main__":
     train_model_unit_price()
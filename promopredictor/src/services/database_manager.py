@@ -1,78 +1,162 @@
 # Este módulo define a classe DatabaseManager que encapsula as operações de banco de dados,
 # permitindo alternar entre diferentes conectores de banco de dados com facilidade.
 
+import hashlib
 import os
+from datetime import date, timedelta
+from pathlib import Path
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
 from src.utils.logging_config import get_logger
+from src.services.query_cache import QueryCache
 
 # Carregar as variáveis do arquivo .env
 load_dotenv()
 
 logger = get_logger(__name__)
 
+# Janela (dias) cujas vendas entram na marca d'água do cache; a mesma que sync_replica recopia,
+# onde chegam cancelamentos, devoluções e mudanças de status de vendas já registradas
+CACHE_WATERMARK_DAYS = 3
+
+# Resumo das vendas recentes: muda com vendas novas e com alterações nas existentes
+RECENT_SALES_CHECKSUM_QUERY = """
+SELECT COUNT(*), SUM(v.Cancelada), SUM(vp.Cancelada), SUM(vp.Quantidade), SUM(vp.QuantDevolvida),
+       SUM(vp.ValorTotal), SUM(v.TotalPedido)
+FROM vendas v
+JOIN vendasprodutos vp ON vp.CodigoVenda = v.Codigo
+WHERE v.Data >= :cutoff
+"""
+
 class DatabaseManager:
     """
     Gerencia as operações de banco de dados usando SQLAlchemy.
     """
-    def __init__(self, use_sqlalchemy=True):
+    def __init__(self, use_sqlalchemy=True, connection_string=None, replica_url=None, query_cache=None):
         """
         Inicializa o DatabaseManager usando SQLAlchemy.
 
         Args:
             use_sqlalchemy (bool): Deve ser True para usar SQLAlchemy.
+            connection_string (str, optional): URL SQLAlchemy do banco. Se omitida, usa a
+                variável de ambiente DB_URL ou, na ausência dela, o MariaDB configurado no .env.
+            replica_url (str, optional): URL SQLAlchemy da réplica analítica local das tabelas de
+                vendas (ex.: sqlite:///data/replica/vendas.db ou duckdb:///data/replica/vendas.duckdb).
+                Se omitida, usa a variável de ambiente REPLICA_URL; sem ela, não há réplica.
+            query_cache (QueryCache, optional): Cache de resultados de SELECT. Se omitido, é criado
+                apenas quando a variável de ambiente QUERY_CACHE_DIR está definida (opt-in).
         """
         self.use_sqlalchemy = use_sqlalchemy
 
         if self.use_sqlalchemy:
             # Configuração para SQLAlchemy usando o driver pymysql
-            self.connection_string = (
+            self.connection_string = connection_string or os.getenv('DB_URL') or (
                 f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
                 f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
             )
             self.engine = create_engine(self.connection_string, echo=False, future=True)
+
+            # Réplica local opcional, usada pelas consultas marcadas com local=True
+            self.replica_url = replica_url or os.getenv('REPLICA_URL')
+            self.replica_engine = (
+                create_engine(self.replica_url, echo=False, future=True) if self.replica_url else None
+            )
+
+            self.query_cache = query_cache
+            if self.query_cache is None and os.getenv('QUERY_CACHE_DIR'):
+                self.query_cache = QueryCache(
+                    Path(os.getenv('QUERY_CACHE_DIR')),
+                    ttl_seconds=int(os.getenv('QUERY_CACHE_TTL', 24 * 3600)),
+                    max_bytes=int(os.getenv('QUERY_CACHE_MAX_MB', 2048)) * 1024 * 1024,
+                )
         else:
             raise NotImplementedError("Somente o SQLAlchemy é suportado nesta configuração.")
 
-    def get_connection(self):
+    def get_connection(self, local=False):
         """
         Retorna uma conexão ativa ao banco de dados.
+
+        Args:
+            local (bool): Conecta na réplica local, se configurada, em vez do banco de produção.
         """
         if self.use_sqlalchemy:
+            if local and self.replica_engine is not None:
+                return self.replica_engine.connect()
             return self.engine.connect()
         else:
             raise NotImplementedError("Somente o SQLAlchemy é suportado nesta configuração.")
 
-    def execute_query(self, query, params=None):
+    def execute_query(self, query, params=None, local=False, use_cache=True):
         """
         Executa uma consulta SQL.
 
         Args:
             query (str): A consulta SQL a ser executada.
             params (dict, optional): Parâmetros para a consulta.
+            local (bool): Executa na réplica local, se configurada. Sem réplica, usa o banco de produção.
+            use_cache (bool): Consulta o cache de resultados (se habilitado) para SELECTs.
 
         Returns:
             dict: Resultado da consulta.
         """
         if self.use_sqlalchemy:
-            connection = self.get_connection()
+            is_select = query.strip().lower().startswith('select')
+            cache = self.query_cache if use_cache and is_select else None
+            namespace = 'local' if local and self.replica_engine is not None else 'producao'
+            if cache is not None:
+                cached = cache.get(query, params, namespace)
+                if cached is not None:
+                    return cached
+
+            connection = self.get_connection(local=local)
             try:
-                logger.debug(f"Executando query: {query}")
+                logger.debug("Executando query: %s", query)
                 result = connection.execute(text(query), params)
-                if query.strip().lower().startswith('select'):
+                if is_select:
                     data = result.fetchall()
                     columns = result.keys()
+                    if cache is not None:
+                        return cache.put(query, params, {'data': data, 'columns': columns}, namespace)
                     return {'data': data, 'columns': columns}
                 else:
                     # Commit após operações de modificação
                     connection.commit()
                     return {'rows_affected': result.rowcount}
             except SQLAlchemyError as e:
-                logger.error(f"Erro ao executar query com SQLAlchemy: {e}")
+                logger.error("Erro ao executar query com SQLAlchemy: %s", e)
                 connection.rollback()
                 raise
             finally:
                 connection.close()
         else:
             raise NotImplementedError("Somente o SQLAlchemy é suportado nesta configuração.")
+
+    def refresh_cache_watermark(self, watermark=None):
+        """
+        Atualiza a marca d'água do cache de resultados, invalidando-o se os dados de vendas mudaram.
+
+        A marca d'água combina o maior `vendas.Codigo` (vendas novas) com um checksum das vendas
+        dos últimos CACHE_WATERMARK_DAYS dias (cancelamentos, devoluções e alterações de vendas
+        já existentes), ambos lidos do banco de produção.
+
+        Args:
+            watermark (int, optional): Marca d'água da extração incremental (ex.: retorno de
+                sync_replica). Se omitida, usa o maior `vendas.Codigo` do banco de produção.
+        """
+        if self.query_cache is None:
+            return
+        if watermark is None:
+            watermark = self.execute_query("SELECT MAX(Codigo) FROM vendas", use_cache=False)['data'][0][0]
+        cutoff = (date.today() - timedelta(days=CACHE_WATERMARK_DAYS)).strftime('%Y-%m-%d')
+        summary = self.execute_query(RECENT_SALES_CHECKSUM_QUERY, params={'cutoff': cutoff}, use_cache=False)['data'][0]
+        checksum = hashlib.sha256(repr(tuple(summary)).encode('utf-8')).hexdigest()[:16]
+        self.query_cache.set_watermark(f"{watermark}:{checksum}")
+
+    def dispose(self):
+        """
+        Fecha as conexões com o banco de produção e com a réplica local, se houver.
+        """
+        self.engine.dispose()
+        if self.replica_engine is not None:
+            self.replica_engine.dispose()
@@ -0,0 +1,351 @@
+# Este módulo define uma fila de jobs leve, sem broker externo, guardada em uma tabela de banco
+# (um arquivo SQLite local ou o próprio banco do projeto). Vários workers, em uma ou mais
+# máquinas, disputam os jobs de uma execução com leases renovados por heartbeat, novas
+# tentativas com espera exponencial e retomada do job na etapa em que parou.
+
+import json
+import os
+import socket
+import threading
+import time
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.exc import IntegrityError
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Duração (segundos) do lease de um job; o heartbeat o renova a cada terço desse tempo
+DEFAULT_LEASE_SECONDS = 300
+# Tentativas (inclusive as interrompidas por queda do worker) antes de o job falhar de vez
+MAX_ATTEMPTS = 3
+# Espera base (segundos) antes de uma nova tentativa; dobra a cada falha
+RETRY_BACKOFF_SECONDS = 60
+
+PENDING, RUNNING, DONE, FAILED, DEFERRED = 'pendente', 'executando', 'concluido', 'falhou', 'adiado'
+# Status que mantêm a fase do job aberta
+ACTIVE_STATUSES = (PENDING, RUNNING)
+
+JOBS_DDL = """
+CREATE TABLE IF NOT EXISTS fila_jobs (
+    run_id VARCHAR(64) NOT NULL,
+    chave VARCHAR(64) NOT NULL,
+    fase INT NOT NULL,
+    tipo VARCHAR(32) NOT NULL,
+    produto INT,
+    prioridade DOUBLE NOT NULL DEFAULT 0,
+    status VARCHAR(16) NOT NULL,
+    tentativas INT NOT NULL DEFAULT 0,
+    etapa INT NOT NULL DEFAULT 0,
+    contexto TEXT,
+    worker VARCHAR(128),
+    lease_ate DOUBLE,
+    heartbeat_em DOUBLE,
+    disponivel_em DOUBLE NOT NULL DEFAULT 0,
+    erro TEXT,
+    atualizado_em DOUBLE,
+    PRIMARY KEY (run_id, chave)
+)
+"""
+
+class LeaseLost(Exception):
+    """
+    O lease do job passou para outro worker: este worker deve abandonar o job sem concluí-lo.
+    """
+
+class Job:
+    """
+    Job reivindicado por um worker: tipo, produto (se houver), próxima etapa e contexto salvo.
+    """
+    def __init__(self, run_id, chave, fase, tipo, produto, tentativas, etapa, contexto):
+        self.run_id = run_id
+        self.chave = chave
+        self.fase = fase
+        self.tipo = tipo
+        self.produto = produto
+        self.tentativas = tentativas
+        self.etapa = etapa
+        self.contexto = json.loads(contexto) if contexto else {}
+
+    def __repr__(self):
+        return f"Job({self.run_id}/{self.chave}, tentativa {self.tentativas}, etapa {self.etapa})"
+
+class JobQueue:
+    """
+    Fila de jobs por execução (run_id), organizada em fases: um job só pode ser reivindicado
+    quando todos os jobs das fases anteriores da mesma execução terminaram.
+
+    A reivindicação é otimista (UPDATE condicionado ao número de tentativas lido), o que funciona
+    tanto no SQLite quanto no MariaDB sem bloqueios explícitos. Para várias máquinas, a fila
+    deve ficar em um banco compartilhado (ex.: o MariaDB do projeto).
+    """
+    def __init__(self, engine=None, url=None, lease_seconds=DEFAULT_LEASE_SECONDS, worker_id=None):
+        """
+        Args:
+            engine (Engine, optional): Engine SQLAlchemy onde fica a tabela `fila_jobs`.
+            url (str, optional): URL SQLAlchemy da fila, usada quando `engine` não é informado.
+            lease_seconds (int): Duração do lease de um job.
+            worker_id (str, optional): Identificador do worker. Padrão: host:pid.
+        """
+        if engine is None:
+            connect_args = {'timeout': 30} if url.startswith('sqlite') else {}
+            engine = create_engine(url, echo=False, future=True, connect_args=connect_args)
+        self.engine = engine
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        with self.engine.begin() as connection:
+            connection.execute(text(JOBS_DDL))
+
+    def add_jobs(self, run_id, jobs):
+        """
+        Cadastra jobs na execução, ignorando os que já existem (vários workers podem tentar).
+
+        Args:
+            run_id (str): Identificador da execução.
+            jobs (list): Dicionários com chave, fase, tipo e, opcionalmente, produto, prioridade e
+                contexto inicial (dict entregue ao job na primeira execução).
+
+        Returns:
+            int: Número de jobs novos.
+        """
+        added = 0
+        now = time.time()
+        for job in jobs:
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(text("""
+                        INSERT INTO fila_jobs (run_id, chave, fase, tipo, produto, prioridade, status,
+                                               tentativas, etapa, contexto, disponivel_em, atualizado_em)
+                        VALUES (:run_id, :chave, :fase, :tipo, :produto, :prioridade, :status, 0, 0, :contexto, 0, :now)
+                    """), {
+                        'run_id': run_id, 'chave': job['chave'], 'fase': job['fase'], 'tipo': job['tipo'],
+                        'produto': job.get('produto'), 'prioridade': job.get('prioridade', 0),
+                        'contexto': json.dumps(job['contexto']) if job.get('contexto') else None,
+                        'status': PENDING, 'now': now,
+                    })
+                added += 1
+            except IntegrityError:
+                continue
+        if added:
+            logger.info(f"{added} jobs cadastrados na execução {run_id}.")
+        return added
+
+    def _active_phase(self, connection, run_id):
+        return connection.execute(text(
+            "SELECT MIN(fase) FROM fila_jobs WHERE run_id = :run_id AND status IN :statuses"
+        ).bindparams(bindparam('statuses', expanding=True)),
+            {'run_id': run_id, 'statuses': list(ACTIVE_STATUSES)}).fetchone()[0]
+
+    def claim(self, run_id):
+        """
+        Reivindica o próximo job disponível da fase ativa: pendente (fora da espera de nova
+        tentativa) ou em execução com lease vencido (worker caído).
+
+        Returns:
+            Job: Job reivindicado, ou None se não houver nenhum disponível agora.
+        """
+        now = time.time()
+        with self.engine.connect() as connection:
+            phase = self._active_phase(connection, run_id)
+            if phase is None:
+                return None
+            candidates = connection.execute(text("""
+                SELECT chave, tentativas, status FROM fila_jobs
+                WHERE run_id = :run_id AND fase = :fase
+                  AND ((status = :pending AND disponivel_em <= :now) OR (status = :running AND lease_ate < :now))
+                ORDER BY prioridade DESC, chave
+                LIMIT 20
+            """), {'run_id': run_id, 'fase': phase, 'pending': PENDING, 'running': RUNNING, 'now': now}).fetchall()
+
+        for chave, tentativas, status in candidates:
+            if status == RUNNING and tentativas >= MAX_ATTEMPTS:
+                self._finish(run_id, chave, FAILED, f"lease vencido após {tentativas} tentativas", owner=None)
+                continue
+
+            with self.engine.begin() as connection:
+                claimed = connection.execute(text("""
+                    UPDATE fila_jobs
+                    SET status = :running, worker = :worker, tentativas = tentativas + 1,
+                        lease_ate = :lease, heartbeat_em = :now, atualizado_em = :now
+                    WHERE run_id = :run_id AND chave = :chave AND tentativas = :tentativas
+                      AND ((status = :pending AND disponivel_em <= :now) OR (status = :running AND lease_ate < :now))
+                """), {
+                    'running': RUNNING, 'pending': PENDING, 'worker': self.worker_id,
+                    'lease': now + self.lease_seconds, 'now': now,
+                    'run_id': run_id, 'chave': chave, 'tentativas': tentativas,
+                }).rowcount
+                if not claimed:
+                    continue  # Outro worker chegou antes
+                row = connection.execute(text("""
+                    SELECT run_id, chave, fase, tipo, produto, tentativas, etapa, contexto
+                    FROM fila_jobs WHERE run_id = :run_id AND chave = :chave
+                """), {'run_id': run_id, 'chave': chave}).fetchone()
+
+            job = Job(*row)
+            if status == RUNNING:
+                logger.warning(f"Job {chave} retomado de um worker sem heartbeat, a partir da etapa {job.etapa}.")
+            return job
+        return None
+
+    def heartbeat(self, job):
+        """
+        Renova o lease do job.
+
+        Returns:
+            bool: False se o lease foi perdido (outro worker reivindicou o job).
+        """
+        now = time.time()
+        with self.engine.begin() as connection:
+            return connection.execute(text("""
+                UPDATE fila_jobs SET lease_ate = :lease, heartbeat_em = :now
+                WHERE run_id = :run_id AND chave = :chave AND worker = :worker AND status = :running
+            """), {
+                'lease': now + self.lease_seconds, 'now': now, 'run_id': job.run_id, 'chave': job.chave,
+                'worker': self.worker_id, 'running': RUNNING,
+            }).rowcount == 1
+
+    def keep_alive(self, job):
+        """
+        Context manager que mantém o lease do job renovado em uma thread enquanto ele executa.
+
+        O objeto retornado tem `check()`, que levanta LeaseLost se o job passou para outro worker;
+        chame-o entre etapas, antes de gravar resultados.
+        """
+        return _Heartbeat(self, job)
+
+    def complete_stage(self, job, etapa, contexto):
+        """
+        Registra que o job concluiu as etapas até `etapa` (exclusive), com o contexto necessário
+        para retomá-lo a partir dali.
+        """
+        job.etapa = etapa
+        job.contexto = contexto
+        with self.engine.begin() as connection:
+            connection.execute(text("""
+                UPDATE fila_jobs SET etapa = :etapa, contexto = :contexto, atualizado_em = :now
+                WHERE run_id = :run_id AND chave = :chave AND worker = :worker
+            """), {
+                'etapa': etapa, 'contexto': json.dumps(contexto), 'now': time.time(),
+                'run_id': job.run_id, 'chave': job.chave, 'worker': self.worker_id,
+            })
+
+    def complete(self, job):
+        """
+        Marca o job como concluído.
+        """
+        if not self._finish(job.run_id, job.chave, DONE, None, owner=self.worker_id):
+            logger.warning(f"Job {job.chave} não foi marcado como concluído: pertence a outro worker.")
+
+    def fail(self, job, error):
+        """
+        Registra a falha do job: volta para a fila com espera exponencial ou falha de vez
+        após MAX_ATTEMPTS tentativas. A etapa salva é mantida para a retomada.
+        """
+        if job.tentativas >= MAX_ATTEMPTS:
+            logger.error(f"Job {job.chave} falhou após {job.tentativas} tentativas: {error}")
+            self._finish(job.run_id, job.chave, FAILED, str(error), owner=self.worker_id)
+            return
+
+        delay = RETRY_BACKOFF_SECONDS * 2 ** (job.tentativas - 1)
+        logger.warning(f"Job {job.chave} falhou (tentativa {job.tentativas}); nova tentativa em {delay}s: {error}")
+        with self.engine.begin() as connection:
+            connection.execute(text("""
+                UPDATE fila_jobs SET status = :pending, worker = NULL, lease_ate = NULL, erro = :erro,
+                                     disponivel_em = :disponivel, atualizado_em = :now
+                WHERE run_id = :run_id AND chave = :chave AND worker = :worker
+            """), {
+                'pending': PENDING, 'erro': str(error), 'disponivel': time.time() + delay, 'now': time.time(),
+                'run_id': job.run_id, 'chave': job.chave, 'worker': self.worker_id,
+            })
+
+    def _finish(self, run_id, chave, status, error, owner):
+        owner_clause = "AND worker = :worker" if owner else ""
+        with self.engine.begin() as connection:
+            return connection.execute(text(f"""
+                UPDATE fila_jobs SET status = :status, erro = :erro, lease_ate = NULL, atualizado_em = :now
+                WHERE run_id = :run_id AND chave = :chave {owner_clause}
+            """), {'status': status, 'erro': error, 'now': time.time(), 'run_id': run_id, 'chave': chave, 'worker': owner}).rowcount
+
+    def defer_pending(self, run_id, fase):
+        """
+        Adia (encerra sem executar) os jobs ainda pendentes de uma fase, liberando as fases seguintes.
+
+        Returns:
+            int: Número de jobs adiados.
+        """
+        with self.engine.begin() as connection:
+            deferred = connection.execute(text("""
+                UPDATE fila_jobs SET status = :deferred, atualizado_em = :now
+                WHERE run_id = :run_id AND fase = :fase AND status = :pending
+            """), {'deferred': DEFERRED, 'now': time.time(), 'run_id': run_id, 'fase': fase, 'pending': PENDING}).rowcount
+        if deferred:
+            logger.warning(f"{deferred} jobs da fase {fase} adiados por falta de tempo no orçamento.")
+        return deferred
+
+    def is_finished(self, run_id):
+        """
+        Indica se todos os jobs da execução terminaram (concluídos, falhos ou adiados).
+        """
+        with self.engine.connect() as connection:
+            return self._active_phase(connection, run_id) is None
+
+    def products(self, run_id, status=DONE):
+        """
+        Produtos dos jobs da execução com o status informado.
+        """
+        with self.engine.connect() as connection:
+            rows = connection.execute(text("""
+                SELECT produto FROM fila_jobs
+                WHERE run_id = :run_id AND status = :status AND produto IS NOT NULL
+                ORDER BY prioridade DESC
+            """), {'run_id': run_id, 'status': status}).fetchall()
+        return [row[0] for row in rows]
+
+    def summary(self, run_id):
+        """
+        Contagem de jobs da execução por status.
+        """
+        with self.engine.connect() as connection:
+            rows = connection.execute(text(
+                "SELECT status, COUNT(*) FROM fila_jobs WHERE run_id = :run_id GROUP BY status"
+            ), {'run_id': run_id}).fetchall()
+        return {status: count for status, count in rows}
+
+class _Heartbeat:
+    """
+    Renova o lease do job em uma thread e sinaliza (`lost`) quando ele passa para outro worker.
+    """
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.job = job
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job.chave}", daemon=True)
+
+    def _run(self):
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                if not self.queue.heartbeat(self.job):
+                    self.lost = True
+                    logger.warning(f"Lease do job {self.job.chave} perdido para outro worker.")
+                    return
+            except Exception as e:
+                logger.warning(f"Falha no heartbeat do job {self.job.chave}: {e}")
+
+    def check(self):
+        """
+        Confirma (e renova) o lease na hora; levanta LeaseLost se o job já pertence a outro worker.
+        """
+        if not self.lost and not self.queue.heartbeat(self.job):
+            self.lost = True
+        if self.lost:
+            raise LeaseLost(f"Lease do job {self.job.chave} perdido para outro worker.")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
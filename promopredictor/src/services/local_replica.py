@@ -0,0 +1,163 @@
+# Este módulo mantém uma réplica analítica local (SQLite ou DuckDB) das tabelas de vendas,
+# sincronizada incrementalmente a partir do MariaDB de produção, para que extrações e
+# reexecuções não sobrecarreguem o servidor OLTP.
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pandas as pd
+from sqlalchemy import text, inspect
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Colunas replicadas: apenas as usadas por extract_raw_data
+VENDAS_COLUMNS = [
+    'Codigo', 'Data', 'Hora', 'Status', 'Cancelada', 'TotalPedido', 'DescontoGeral', 'AcrescimoGeral', 'TotalCusto',
+]
+VENDASPRODUTOS_COLUMNS = [
+    'CodigoVenda', 'CodigoProduto', 'Quantidade', 'ValorUnitario', 'ValorTotal', 'Desconto', 'Acrescimo',
+    'Cancelada', 'QuantDevolvida', 'PrecoemPromocao', 'CodigoSecao', 'CodigoGrupo', 'CodigoSubGrupo',
+    'CodigoFabricante', 'ValorCusto', 'ValorCustoGerencial', 'CodigoFornecedor', 'CodigoKitPrincipal',
+    'ValorKitPrincipal',
+]
+
+SYNC_STATE_DDL = """
+CREATE TABLE IF NOT EXISTS replica_sync_state (
+    table_name VARCHAR(64) PRIMARY KEY,
+    watermark BIGINT NOT NULL,
+    synced_at VARCHAR(32) NOT NULL
+)
+"""
+
+REPLICA_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_replica_vendas_codigo ON vendas (Codigo)",
+    "CREATE INDEX IF NOT EXISTS idx_replica_vp_produto ON vendasprodutos (CodigoProduto)",
+    "CREATE INDEX IF NOT EXISTS idx_replica_vp_venda ON vendasprodutos (CodigoVenda)",
+]
+
+def _normalize_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte tipos do MariaDB que bancos embarcados não aceitam: DECIMAL vira float
+    e TIME (timedelta) vira texto 'HH:MM:SS', no mesmo formato que clean_data espera.
+    """
+    if 'Hora' in df.columns:
+        df['Hora'] = df['Hora'].astype(str).str.split(' ').str[-1]
+    if 'Data' in df.columns:
+        df['Data'] = pd.to_datetime(df['Data'], errors='coerce').dt.strftime('%Y-%m-%d')
+
+    for col in df.columns:
+        if df[col].dtype == object:
+            sample = df[col].dropna()
+            if not sample.empty and isinstance(sample.iloc[0], Decimal):
+                df[col] = df[col].astype(float)
+    return df
+
+def _get_watermark(replica_engine, table_name):
+    with replica_engine.connect() as connection:
+        row = connection.execute(
+            text("SELECT watermark FROM replica_sync_state WHERE table_name = :t"), {'t': table_name}
+        ).fetchone()
+    return row[0] if row else 0
+
+def _set_watermark(connection, table_name, watermark):
+    connection.execute(text("DELETE FROM replica_sync_state WHERE table_name = :t"), {'t': table_name})
+    connection.execute(
+        text("INSERT INTO replica_sync_state (table_name, watermark, synced_at) VALUES (:t, :w, :s)"),
+        {'t': table_name, 'w': int(watermark), 's': pd.Timestamp.now().isoformat(timespec='seconds')}
+    )
+
+def _replica_has_table(replica_engine, table_name):
+    return inspect(replica_engine).has_table(table_name)
+
+def _copy_sales(db_manager, vendas_where, params, replica_connection):
+    """
+    Copia da produção para a réplica as vendas que satisfazem `vendas_where` (com o alias `v`
+    para a tabela `vendas`) e os itens dessas vendas.
+
+    Returns:
+        tuple: (vendas copiadas, itens copiados, maior Codigo copiado).
+    """
+    vendas_query = f"SELECT {', '.join('v.' + c for c in VENDAS_COLUMNS)} FROM vendas v WHERE {vendas_where}"
+    items_query = (
+        f"SELECT {', '.join('vp.' + c for c in VENDASPRODUTOS_COLUMNS)} FROM vendasprodutos vp "
+        f"INNER JOIN vendas v ON vp.CodigoVenda = v.Codigo WHERE {vendas_where}"
+    )
+
+    with db_manager.engine.connect() as source:
+        df_vendas = pd.read_sql(text(vendas_query), source, params=params)
+        df_items = pd.read_sql(text(items_query), source, params=params)
+
+    if df_vendas.empty:
+        return 0, 0, None
+
+    _normalize_types(df_vendas).to_sql('vendas', replica_connection, if_exists='append', index=False)
+    _normalize_types(df_items).to_sql('vendasprodutos', replica_connection, if_exists='append', index=False)
+    return len(df_vendas), len(df_items), df_vendas['Codigo'].max()
+
+def sync_replica(db_manager, batch_size=200_000, resync_days=3):
+    """
+    Sincroniza incrementalmente a réplica local das tabelas `vendas` e `vendasprodutos`.
+
+    Novas vendas são copiadas em lotes por faixa de `vendas.Codigo` acima da marca d'água
+    (watermark) gravada em `replica_sync_state`. As vendas dos últimos `resync_days` dias são
+    recopiadas para refletir cancelamentos e devoluções registrados depois da venda.
+    A tabela `produtosmaisvendidos` (pequena) é recopiada integralmente.
+
+    Args:
+        db_manager (DatabaseManager): Gerenciador com `replica_engine` configurado.
+        batch_size (int): Faixa de códigos de venda copiada por lote.
+        resync_days (int): Janela (em dias) recopiada a cada sincronização.
+
+    Returns:
+        int: Nova marca d'água (maior `vendas.Codigo` replicado).
+    """
+    replica_engine = db_manager.replica_engine
+    if replica_engine is None:
+        raise ValueError("Réplica local não configurada (defina REPLICA_URL).")
+
+    with replica_engine.begin() as connection:
+        connection.execute(text(SYNC_STATE_DDL))
+
+    watermark = _get_watermark(replica_engine, 'vendas')
+    logger.info(f"Sincronizando réplica local a partir de vendas.Codigo > {watermark}.")
+
+    # 1) Janela recente já replicada: apaga e recopia (cancelamentos/devoluções tardios)
+    if watermark and resync_days and _replica_has_table(replica_engine, 'vendas'):
+        cutoff = (date.today() - timedelta(days=resync_days)).strftime('%Y-%m-%d')
+        with replica_engine.begin() as connection:
+            connection.execute(text(
+                "DELETE FROM vendasprodutos WHERE CodigoVenda IN "
+                "(SELECT Codigo FROM vendas WHERE Data >= :cutoff)"
+            ), {'cutoff': cutoff})
+            connection.execute(text("DELETE FROM vendas WHERE Data >= :cutoff"), {'cutoff': cutoff})
+            n_vendas, n_items, _ = _copy_sales(
+                db_manager, "v.Data >= :cutoff AND v.Codigo <= :watermark",
+                {'cutoff': cutoff, 'watermark': int(watermark)}, connection
+            )
+        logger.info(f"Janela de {resync_days} dias recopiada: {n_vendas} vendas, {n_items} itens.")
+
+    # 2) Vendas novas, em lotes por faixa de código
+    source_max = db_manager.execute_query("SELECT MAX(Codigo) FROM vendas")['data'][0][0] or 0
+    while watermark < source_max:
+        upper = min(watermark + batch_size, source_max)
+        # Cada lote e sua marca d'água são gravados na mesma transação: uma falha não deixa lacunas
+        with replica_engine.begin() as connection:
+            n_vendas, n_items, _ = _copy_sales(
+                db_manager, "v.Codigo > :lower AND v.Codigo <= :upper",
+                {'lower': int(watermark), 'upper': int(upper)}, connection
+            )
+            _set_watermark(connection, 'vendas', upper)
+        logger.info(f"Lote até vendas.Codigo = {upper} replicado: {n_vendas} vendas, {n_items} itens.")
+        watermark = upper
+
+    # 3) Tabela de ranking de produtos
+    with db_manager.engine.connect() as source:
+        df_ranking = pd.read_sql(text("SELECT * FROM produtosmaisvendidos"), source)
+    with replica_engine.begin() as connection:
+        _normalize_types(df_ranking).to_sql('produtosmaisvendidos', connection, if_exists='replace', index=False)
+        for ddl in REPLICA_INDEXES:
+            connection.execute(text(ddl))
+
+    logger.info(f"Réplica local sincronizada até vendas.Codigo = {watermark}.")
+    return watermark
@@ -0,0 +1,166 @@
+# Este módulo define um cache de resultados de consultas SELECT em disco, usado de forma
+# opcional (opt-in) pelo DatabaseManager.execute_query.
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+import zlib
+from pathlib import Path
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class QueryCache:
+    """
+    Cache read-through de resultados de SELECT, chaveado pelo texto SQL + parâmetros.
+
+    Cada resultado é gravado em um arquivo binário (pickle comprimido com zlib). As entradas
+    expiram após `ttl_seconds`, são removidas por ordem de último acesso quando o diretório
+    excede `max_bytes` e são invalidadas quando a marca d'água da extração incremental muda.
+    """
+    def __init__(self, cache_dir: Path, ttl_seconds=24 * 3600, max_bytes=2 * 1024 ** 3, watermark=None):
+        """
+        Args:
+            cache_dir (Path): Diretório dos arquivos de cache.
+            ttl_seconds (int): Tempo de vida de uma entrada.
+            max_bytes (int): Tamanho máximo do diretório de cache.
+            watermark (str, optional): Marca d'água atual dos dados de vendas (ver refresh_cache_watermark).
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.watermark = watermark
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _path(self, query, params, namespace):
+        key = repr((namespace, query.strip(), sorted((params or {}).items())))
+        return self.cache_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.bin"
+
+    def get(self, query, params=None, namespace='default'):
+        """
+        Retorna o resultado em cache ou None (entrada ausente, expirada ou de outra marca d'água).
+
+        Args:
+            query (str): Consulta SQL.
+            params (dict, optional): Parâmetros da consulta.
+            namespace (str): Separa resultados de bancos diferentes (ex.: produção e réplica local).
+        """
+        path = self._path(query, params, namespace)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.loads(zlib.decompress(f.read()))
+        except (FileNotFoundError, zlib.error, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        expired = time.time() - entry['created_at'] > self.ttl_seconds
+        if expired or entry['watermark'] != self.watermark:
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+                self.evictions += 1
+            return None
+
+        # O mtime registra o último acesso, usado na remoção por tamanho
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+        return {'data': entry['data'], 'columns': entry['columns']}
+
+    def put(self, query, params, result, namespace='default'):
+        """
+        Grava o resultado de um SELECT e aplica a política de tamanho máximo.
+
+        Returns:
+            dict: O resultado materializado (listas de tuplas e nomes de colunas).
+        """
+        entry = {
+            'created_at': time.time(),
+            'watermark': self.watermark,
+            'columns': list(result['columns']),
+            'data': [tuple(row) for row in result['data']],
+        }
+        path = self._path(query, params, namespace)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), 6))
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.stores += 1
+        self._enforce_size()
+        return {'data': entry['data'], 'columns': entry['columns']}
+
+    def set_watermark(self, watermark):
+        """
+        Atualiza a marca d'água da extração incremental.
+
+        Entradas gravadas com outra marca d'água passam a ser tratadas como miss e são
+        removidas na próxima leitura (ou pela política de tamanho/TTL).
+        """
+        if watermark != self.watermark:
+            logger.info(f"Marca d'água do cache: {watermark} (anterior: {self.watermark}).")
+        self.watermark = watermark
+
+    def clear(self):
+        """
+        Remove todas as entradas do cache.
+        """
+        for path in self.cache_dir.glob('*.bin'):
+            self._remove(path)
+            with self._lock:
+                self.evictions += 1
+
+    def _enforce_size(self):
+        files = []
+        total = 0
+        for path in self.cache_dir.glob('*.bin'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        # Remove primeiro as entradas acessadas há mais tempo
+        for _, size, path in sorted(files):
+            self._remove(path)
+            total -= size
+            with self._lock:
+                self.evictions += 1
+            if total <= self.max_bytes:
+                break
+
+    def _remove(self, path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        """
+        Retorna os contadores do cache.
+
+        Returns:
+            dict: hits, misses, stores, evictions e taxa de acerto.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
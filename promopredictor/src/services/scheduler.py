@@ -0,0 +1,178 @@
+# Este módulo define o agendador de produtos: ordena o catálogo por valor de negócio e custo
+# estimado, e respeita um orçamento total de tempo para a execução.
+
+import json
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.utils.logging_config import get_logger
+from src.utils.state_file import save_state
+
+logger = get_logger(__name__)
+
+# Custo (segundos por linha de venda) usado enquanto não há histórico de execuções
+DEFAULT_SECONDS_PER_ROW = 0.002
+# Custo fixo mínimo por produto (treino/predição de modelos pequenos)
+MIN_PRODUCT_SECONDS = 60.0
+# Janela (dias) usada para estimar o valor de negócio de cada produto
+VALUE_WINDOW_DAYS = 365
+# Dias sem treino a partir dos quais o produto ganha prioridade máxima por desatualização
+STALENESS_DAYS = 30
+# Fator aplicado à prioridade de produtos que falharam na última execução
+ERROR_PENALTY = 0.25
+
+PRODUCT_STATS_QUERY = """
+SELECT
+    vp.CodigoProduto,
+    COUNT(*) AS Linhas,
+    SUM(CASE WHEN v.Data >= :inicio_valor THEN vp.ValorTotal ELSE 0 END) AS Receita
+FROM vendasprodutos vp
+INNER JOIN vendas v ON vp.CodigoVenda = v.Codigo
+WHERE vp.CodigoProduto IN (SELECT CodigoProduto FROM produtosmaisvendidos)
+  AND v.Status IN ('f', 'x')
+GROUP BY vp.CodigoProduto
+"""
+
+class ProductScheduler:
+    """
+    Ordena os produtos pelo valor de negócio por segundo de processamento estimado e
+    libera-os enquanto couberem no orçamento de tempo da execução.
+
+    O histórico (último treino, duração e último erro por produto) é mantido em um arquivo JSON,
+    usado para estimar o custo das próximas execuções.
+    """
+    def __init__(self, state_path: Path, time_budget_seconds=None):
+        """
+        Args:
+            state_path (Path): Arquivo JSON com o histórico de execuções por produto.
+            time_budget_seconds (float, optional): Orçamento total da execução. None = sem limite.
+        """
+        self.state_path = Path(state_path)
+        self.time_budget_seconds = time_budget_seconds
+        self.state = self._load_state()
+        self.started_at = time.monotonic()
+        self.deferred = []
+
+    def _load_state(self):
+        if not self.state_path.exists():
+            return {}
+        with open(self.state_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self, produto=None):
+        # Outros workers podem ter gravado outros produtos desde a leitura: mescla só este produto, sob lock
+        self.state = save_state(self.state_path, self.state, produto)
+
+    def _seconds_per_row(self):
+        """
+        Custo médio por linha observado nas execuções anteriores (mediana), ou o padrão.
+        """
+        ratios = sorted(
+            s['last_duration_seconds'] / s['rows']
+            for s in self.state.values()
+            if s.get('rows') and s.get('last_duration_seconds') and not s.get('last_error')
+        )
+        return ratios[len(ratios) // 2] if ratios else DEFAULT_SECONDS_PER_ROW
+
+    def estimate_cost(self, produto, rows):
+        """
+        Estima o tempo (segundos) de processamento de um produto.
+        """
+        history = self.state.get(str(produto), {})
+        if history.get('last_duration_seconds') and not history.get('last_error'):
+            return max(MIN_PRODUCT_SECONDS, history['last_duration_seconds'])
+        return max(MIN_PRODUCT_SECONDS, rows * self._seconds_per_row())
+
+    def rank(self, product_stats):
+        """
+        Ordena os produtos por prioridade (valor por segundo, ajustado por desatualização e erros).
+
+        Args:
+            product_stats (list): Tuplas (CodigoProduto, Linhas, Receita).
+
+        Returns:
+            list: Dicionários com produto, linhas, valor, custo estimado e prioridade, em ordem decrescente.
+        """
+        now = datetime.now()
+        ranked = []
+        for produto, rows, value in product_stats:
+            rows = int(rows or 0)
+            value = float(value or 0)
+            cost = self.estimate_cost(produto, rows)
+            history = self.state.get(str(produto), {})
+
+            if history.get('last_trained_at'):
+                age_days = (now - datetime.fromisoformat(history['last_trained_at'])).days
+                staleness = min(1.0, age_days / STALENESS_DAYS)
+            else:
+                staleness = 1.0  # Nunca treinado
+
+            priority = (value / cost) * (0.5 + 0.5 * staleness)
+            if history.get('last_error'):
+                priority *= ERROR_PENALTY
+
+            ranked.append({
+                'produto': int(produto), 'rows': rows, 'value': value,
+                'estimated_seconds': cost, 'priority': priority,
+            })
+
+        ranked.sort(key=lambda item: item['priority'], reverse=True)
+        return ranked
+
+    def remaining_seconds(self):
+        if self.time_budget_seconds is None:
+            return float('inf')
+        return self.time_budget_seconds - (time.monotonic() - self.started_at)
+
+    def iter_products(self, ranked):
+        """
+        Libera os produtos em ordem de prioridade, pulando os que não cabem no tempo restante.
+
+        Produtos pulados ficam em `self.deferred` e são registrados no log ao final.
+
+        Args:
+            ranked (list): Saída de `rank`.
+
+        Yields:
+            int: Código do próximo produto a processar.
+        """
+        for item in ranked:
+            if item['estimated_seconds'] > self.remaining_seconds():
+                self.deferred.append(item['produto'])
+                continue
+            yield item['produto']
+
+        if self.deferred:
+            logger.warning(
+                f"{len(self.deferred)} produtos adiados por falta de tempo no orçamento: {self.deferred[:20]}"
+                f"{'...' if len(self.deferred) > 20 else ''}"
+            )
+
+    def record(self, produto, duration_seconds, rows=None, error=None):
+        """
+        Registra o resultado do processamento de um produto no histórico.
+        """
+        history = self.state.setdefault(str(produto), {})
+        history['last_duration_seconds'] = duration_seconds
+        history['last_error'] = str(error) if error else None
+        if rows is not None:
+            history['rows'] = rows
+        if error is None:
+            history['last_trained_at'] = datetime.now().isoformat(timespec='seconds')
+        self._save_state(produto)
+
+def get_product_stats(db_manager, reference_date=None):
+    """
+    Obtém, para cada produto de `produtosmaisvendidos`, o número de linhas de venda e a receita recente.
+
+    Args:
+        db_manager (DatabaseManager): Gerenciador do banco de dados.
+        reference_date (datetime, optional): Data de referência para a janela de valor. Padrão: hoje.
+
+    Returns:
+        list: Tuplas (CodigoProduto, Linhas, Receita).
+    """
+    reference_date = reference_date or datetime.now()
+    inicio_valor = (reference_date - timedelta(days=VALUE_WINDOW_DAYS)).strftime('%Y-%m-%d')
+    result = db_manager.execute_query(PRODUCT_STATS_QUERY, params={'inicio_valor': inicio_valor}, local=True)
+    return [tuple(row) for row in result['data']]
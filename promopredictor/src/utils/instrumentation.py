@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import psutil
+from src.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Intervalo (segundos) de amostragem do RSS durante uma etapa
+RSS_SAMPLE_INTERVAL = 0.05
+
+class _PeakRSSSampler:
+    """
+    Amostra o RSS do processo em uma thread de fundo e guarda o maior valor observado.
+    """
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = self.process.memory_info().rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+class RunReport:
+    """
+    Registra tempo de parede, tempo de CPU, pico de memória e linhas de cada etapa por produto.
+
+    Cada etapa concluída é gravada imediatamente em JSON lines; ao final, `write_prometheus`
+    exporta as métricas no formato textfile do Prometheus (node_exporter).
+    """
+    def __init__(self, pipeline, reports_dir: Path):
+        """
+        Args:
+            pipeline (str): Nome do pipeline (ex.: 'unificado', 'preco', 'quantidade').
+            reports_dir (Path): Diretório onde os relatórios da execução serão gravados.
+        """
+        self.pipeline = pipeline
+        self.run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+        self.reports_dir = Path(reports_dir)
+        self.reports_dir.mkdir(parents=True, exist_ok=True)
+        self.jsonl_path = self.reports_dir / f"run_report_{pipeline}_{self.run_id}.jsonl"
+        self.records = []
+        self.started_at = time.perf_counter()
+
+    @contextmanager
+    def stage(self, stage, produto=None):
+        """
+        Instrumenta um bloco do pipeline.
+
+        Exemplo:
+            with report.stage('extract_raw_data', produto) as rec:
+                df_raw = extract_raw_data(db_manager, produto)
+                rec['rows_out'] = len(df_raw)
+
+        Args:
+            stage (str): Nome da etapa.
+            produto (int, optional): Código do produto processado.
+        """
+        record = {
+            'run_id': self.run_id, 'pipeline': self.pipeline, 'produto': produto, 'stage': stage,
+            'rows_in': None, 'rows_out': None, 'status': 'ok',
+        }
+        sampler = _PeakRSSSampler()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        try:
+            with sampler:
+                yield record
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = str(e)
+            raise
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            record['peak_rss_bytes'] = sampler.peak
+            record['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            self.records.append(record)
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+    def write_prometheus(self, path: Path = None):
+        """
+        Exporta as métricas da execução no formato textfile do Prometheus.
+
+        A escrita é feita em arquivo temporário e renomeada, como recomenda o textfile collector.
+
+        Args:
+            path (Path, optional): Arquivo `.prom` de destino. Padrão: `<reports_dir>/promopredictor_<pipeline>.prom`.
+
+        Returns:
+            Path: Caminho do arquivo gravado.
+        """
+        path = Path(path) if path else self.reports_dir / f"promopredictor_{self.pipeline}.prom"
+        metrics = [
+            ('wall_seconds', 'promopredictor_stage_wall_seconds', 'Tempo de parede da etapa em segundos.'),
+            ('cpu_seconds', 'promopredictor_stage_cpu_seconds', 'Tempo de CPU da etapa em segundos.'),
+            ('peak_rss_bytes', 'promopredictor_stage_peak_rss_bytes', 'Pico de RSS do processo durante a etapa.'),
+            ('rows_in', 'promopredictor_stage_rows_in', 'Linhas de entrada da etapa.'),
+            ('rows_out', 'promopredictor_stage_rows_out', 'Linhas de saída da etapa.'),
+        ]
+
+        lines = []
+        for key, name, help_text in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for record in self.records:
+                if record.get(key) is None:
+                    continue
+                labels = (
+                    f'pipeline="{self.pipeline}",stage="{record["stage"]}",'
+                    f'produto="{record["produto"] if record["produto"] is not None else ""}",'
+                    f'status="{record["status"]}"'
+                )
+                lines.append(f"{name}{{{labels}}} {record[key]}")
+
+        lines.append("# HELP promopredictor_run_duration_seconds Duração total da execução em segundos.")
+        lines.append("# TYPE promopredictor_run_duration_seconds gauge")
+        lines.append(f'promopredictor_run_duration_seconds{{pipeline="{self.pipeline}"}} '
+                     f'{time.perf_counter() - self.started_at}')
+        lines.append("# HELP promopredictor_run_last_finished_timestamp_seconds Fim da última execução (epoch).")
+        lines.append("# TYPE promopredictor_run_last_finished_timestamp_seconds gauge")
+        lines.append(f'promopredictor_run_last_finished_timestamp_seconds{{pipeline="{self.pipeline}"}} {time.time()}')
+
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+        logger.info(f"Métricas da execução exportadas em {path}.")
+        return path
@@ -1,48 +1,166 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import multiprocessing.util
+import queue
+import threading
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
 from pathlib import Path
 
+# Fila, handler de arquivo e listener são únicos por processo, compartilhados por todos os loggers
+_log_queue = None
+_queue_listener = None
+_listener_pid = None
+_setup_lock = threading.Lock()
+# Tipos de argumento que podem ser formatados depois, na thread do listener, sem risco de mudarem
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+def _get_log_level():
+    """
+    Nível de log a partir da variável de ambiente LOG_LEVEL (padrão: INFO).
+    """
+    return getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+
+def _stop_listener(listener):
+    # Pode ser chamado duas vezes (atexit e finalizadores do multiprocessing)
+    if listener._thread is not None:
+        listener.stop()
+
+def _start_queue_listener():
+    """
+    Cria (uma vez por processo) a fila de logs e a thread de fundo que grava no arquivo rotativo.
+
+    Processos filhos criados por fork (ex.: o pool de `render_charts_parallel`) herdam a fila,
+    mas não a thread do listener: ao detectar outro pid, fila e listener são recriados no filho.
+
+    Returns:
+        queue.Queue: Fila compartilhada onde os loggers depositam os registros.
+    """
+    global _log_queue, _queue_listener, _listener_pid, _setup_lock
+
+    if _log_queue is not None and _listener_pid == os.getpid():
+        return _log_queue
+    if _listener_pid is not None and _listener_pid != os.getpid():
+        # O lock herdado pode ter sido copiado travado por outra thread do processo pai
+        _setup_lock = threading.Lock()
+
+    with _setup_lock:
+        if _log_queue is not None and _listener_pid == os.getpid():
+            return _log_queue
+
+        # Define o caminho absoluto para a pasta de logs na raiz do projeto
+        project_root = Path(__file__).resolve().parents[2]  # Ajusta com base na estrutura do seu projeto
+        logs_path = project_root / 'logs'
+        os.makedirs(logs_path, exist_ok=True)
+
+        # Define o caminho completo para o arquivo de log dentro da pasta de logs
+        log_file_path = logs_path / 'app.log'
+
+        # Cria um RotatingFileHandler para gerenciar o tamanho e a rotação dos arquivos de log
+        handler = RotatingFileHandler(
+            log_file_path,
+            maxBytes=10485760,  # Máximo de 10 MB por arquivo de log
+            backupCount=10,  # Mantém backup dos últimos 10 arquivos de log
+            encoding='utf-8'  # Define a codificação para UTF-8
+        )
+        # Define o formato das mensagens de log
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handler.setFormatter(formatter)
+
+        # A formatação da mensagem (msg % args) e a escrita em disco acontecem na thread do listener
+        _log_queue = queue.Queue(-1)
+        _queue_listener = QueueListener(_log_queue, handler, respect_handler_level=True)
+        _queue_listener.start()
+        _listener_pid = os.getpid()
+
+        # Garante que os registros pendentes na fila sejam gravados ao encerrar o processo
+        # (workers de multiprocessing saem por os._exit, sem atexit, mas executam os finalizadores)
+        atexit.register(_stop_listener, _queue_listener)
+        multiprocessing.util.Finalize(None, _stop_listener, args=(_queue_listener,), exitpriority=0)
+        return _log_queue
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que não formata a mensagem na thread chamadora.
+
+    O QueueHandler padrão chama `format()` antes de enfileirar; aqui o registro segue intacto
+    e o formatter é aplicado apenas pelo handler de arquivo, na thread do listener. Registros
+    com argumentos mutáveis (DataFrames, dicts, listas) têm a mensagem fixada na hora, para
+    não serem formatados depois com um estado diferente.
+    """
+    def prepare(self, record):
+        # Um único argumento dict vira o próprio `record.args` (formatação por chave): também é mutável
+        args = record.args or ()
+        if isinstance(args, dict) or any(not isinstance(arg, _IMMUTABLE_ARG_TYPES) for arg in args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        # Fila do processo atual (recriada após um fork), e não a capturada na criação do handler
+        _start_queue_listener().put_nowait(record)
+
 def get_logger(name):
     """
     Configura e retorna um logger para captura e armazenamento de logs do sistema.
-    
+
     Args:
         name (str): Nome do logger. Geralmente, é o nome do módulo ou componente.
-    
+
     Returns:
         logging.Logger: Instância configurada do logger.
-    
+
     Detalhes:
-        - Configura o logger para gravar informações com nível INFO ou superior.
-        - Usa RotatingFileHandler para gerenciar o tamanho e a rotação dos arquivos de log.
+        - Configura o logger com o nível de LOG_LEVEL (padrão INFO).
+        - Os registros são enfileirados e gravados por uma thread de fundo (QueueListener),
+          sem bloquear o chamador com I/O de disco ou formatação.
+        - Usa um único RotatingFileHandler compartilhado para gerenciar o tamanho e a rotação dos arquivos de log.
         - Armazena logs na pasta 'logs' na raiz do projeto, criando a pasta se não existir.
     """
     # Configura o nível de gravidade dos logs que serão capturados
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)  # Ou outro nível conforme necessário
-
-    # Define o caminho absoluto para a pasta de logs na raiz do projeto
-    project_root = Path(__file__).resolve().parents[2]  # Ajusta com base na estrutura do seu projeto
-    logs_path = project_root / 'logs'
-    os.makedirs(logs_path, exist_ok=True)
-
-    # Define o caminho completo para o arquivo de log dentro da pasta de logs
-    log_file_path = logs_path / 'app.log'
-
-    # Cria um RotatingFileHandler para gerenciar o tamanho e a rotação dos arquivos de log
-    handler = RotatingFileHandler(
-        log_file_path, 
-        maxBytes=10485760,  # Máximo de 10 MB por arquivo de log
-        backupCount=10,  # Mantém backup dos últimos 10 arquivos de log
-        encoding='utf-8'  # Define a codificação para UTF-8
-    )
-    # Define o formato das mensagens de log
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
+    logger.setLevel(_get_log_level())
+
+    log_queue = _start_queue_listener()
 
     # Adiciona o handler ao logger, garantindo que não haja duplicidade
     if not logger.handlers:
-        logger.addHandler(handler)
+        logger.addHandler(_DeferredQueueHandler(log_queue))
+
+    return logger
+
+class SampledLogger:
+    """
+    Registra apenas a primeira e, depois, uma a cada `every` mensagens de um laço por registro.
+
+    Útil em laços de gravação/extração, onde uma mensagem por registro dominaria o I/O.
+    A verificação de nível acontece antes de qualquer formatação.
+
+    Exemplo:
+        sampled = SampledLogger(logger, every=1000)
+        for idx, record in enumerate(values):
+            sampled.debug("Inserindo registro %d/%d", idx + 1, len(values))
+    """
+    def __init__(self, logger, every=1000):
+        self.logger = logger
+        self.every = every
+        self.count = 0
+
+    def log(self, level, msg, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        self.count += 1
+        if self.count == 1 or self.count % self.every == 0:
+            self.logger.log(level, msg, *args)
+
+    def debug(self, msg, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(logging.INFO, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(logging.WARNING, msg, *args)
 
-    return logger
\ No newline at end of file
+    def error(self, msg, *args):
+        self.log(logging.ERROR, msg, *args)
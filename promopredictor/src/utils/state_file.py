@@ -0,0 +1,59 @@
+# Este módulo define a gravação dos arquivos JSON de estado compartilhados entre workers
+# (agendador e política de retreino): leitura, mescla e substituição acontecem sob um lock
+# exclusivo de arquivo, para que gravações concorrentes não percam as entradas umas das outras.
+
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Lock exclusivo (bloqueante) sobre `<path>.lock`, válido entre processos da mesma máquina
+    e em sistemas de arquivos compartilhados com suporte a locks POSIX.
+    """
+    lock_path = Path(f"{path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def save_state(path: Path, state: dict, key=None) -> dict:
+    """
+    Grava o estado no arquivo JSON. Com `key`, apenas essa entrada é mesclada ao conteúdo atual
+    do arquivo (que outros workers podem ter alterado desde a leitura).
+
+    Returns:
+        dict: O estado gravado (o conteúdo mesclado, quando `key` é informado).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(path):
+        if key is not None and path.exists():
+            with open(path, encoding='utf-8') as f:
+                on_disk = json.load(f)
+            on_disk[str(key)] = state[str(key)]
+            state = on_disk
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+    return state
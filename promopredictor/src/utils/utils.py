@@ -1,13 +1,30 @@
 from src.services.database import db_manager
-from src.utils.logging_config import get_logger
+from src.utils.logging_config import get_logger, SampledLogger
+from sqlalchemy import bindparam, text
+import logging
 import pandas as pd
 
 # Inicializar o logger
 logger = get_logger(__name__)
 
+# Registra apenas 1 a cada N mensagens por registro no laço de inserção
+RECORD_LOG_SAMPLE_EVERY = 1000
+
+# Chave e colunas de valor da tabela de previsões
+PREDICTION_KEY = ['DATA', 'CodigoProduto']
+PREDICTION_VALUES = ['TotalUNVendidas', 'ValorTotalVendido', 'Promocao']
+# Casas decimais de cada coluna de valor, iguais à escala das colunas DECIMAL da tabela: os valores
+# são arredondados antes da gravação e do hash, para que o que foi gravado compare igual na próxima execução
+PREDICTION_DECIMALS = {'TotalUNVendidas': 2, 'ValorTotalVendido': 2, 'Promocao': 0}
+# Registros por lote nas gravações (executemany) e produtos por consulta na leitura do estado atual
+SYNC_BATCH_SIZE = 5000
+SYNC_READ_PRODUCTS = 1000
+
 def clear_predictions_table():
     """
     Limpa a tabela de previsões antes de inserir novas previsões.
+
+    Para regravar só o que mudou, prefira `sync_predictions`.
     """
     try:
         delete_query = "TRUNCATE indicadores_vendas_produtos_previsoes;"
@@ -16,63 +33,233 @@ def clear_predictions_table():
     except Exception as e:
         logger.error(f"Erro ao limpar a tabela de previsões: {e}")
 
+def build_upsert_query():
+    """
+    Monta o upsert da tabela de previsões conforme o dialeto do banco configurado.
+
+    O MariaDB usa ON DUPLICATE KEY UPDATE; bancos locais de teste (SQLite) usam ON CONFLICT.
+    """
+    insert = """
+    INSERT INTO indicadores_vendas_produtos_previsoes (DATA, CodigoProduto, TotalUNVendidas, ValorTotalVendido, Promocao)
+    VALUES (:DATA, :CodigoProduto, :TotalUNVendidas, :ValorTotalVendido, :Promocao)
+    """
+    if db_manager.engine.dialect.name == 'sqlite':
+        return insert + """
+    ON CONFLICT (DATA, CodigoProduto) DO UPDATE SET
+        TotalUNVendidas = excluded.TotalUNVendidas,
+        ValorTotalVendido = excluded.ValorTotalVendido,
+        Promocao = excluded.Promocao
+    """
+    return insert + """
+    ON DUPLICATE KEY UPDATE
+        TotalUNVendidas = VALUES(TotalUNVendidas),
+        ValorTotalVendido = VALUES(ValorTotalVendido),
+        Promocao = VALUES(Promocao)
+    """
+
+def round_predictions(df_pred: pd.DataFrame) -> pd.DataFrame:
+    """
+    Arredonda as colunas de valor das previsões para a escala das colunas da tabela.
+    """
+    df_pred = df_pred.copy()
+    df_pred[PREDICTION_VALUES] = df_pred[PREDICTION_VALUES].astype(float).round(PREDICTION_DECIMALS)
+    return df_pred
+
+def quantity_to_predictions(df_quantity: pd.DataFrame, df_price: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Converte previsões de quantidade (CodigoProduto, Data, Predicted_QuantidadeLiquida) para as
+    colunas da tabela de previsões.
+
+    O valor total vendido é a quantidade prevista vezes o valor unitário previsto (`forecast_prices`)
+    do mesmo produto/dia; sem previsão de preço ele fica nulo. As previsões não recebem um plano de
+    promoções, então Promocao é 0 (cenário sem promoção).
+    """
+    df = df_quantity[['CodigoProduto', 'Data', 'Predicted_QuantidadeLiquida']].copy()
+    df['Data'] = pd.to_datetime(df['Data'])
+    if df_price is not None and not df_price.empty:
+        price = df_price[['CodigoProduto', 'Data', 'Predicted_ValorUnitario']].copy()
+        price['Data'] = pd.to_datetime(price['Data'])
+        df = df.merge(price, on=['CodigoProduto', 'Data'], how='left')
+    else:
+        df['Predicted_ValorUnitario'] = float('nan')
+    return pd.DataFrame({
+        'DATA': df['Data'],
+        'CodigoProduto': df['CodigoProduto'],
+        'TotalUNVendidas': df['Predicted_QuantidadeLiquida'],
+        'ValorTotalVendido': df['Predicted_QuantidadeLiquida'] * df['Predicted_ValorUnitario'],
+        'Promocao': 0,
+    })
+
 def insert_predictions(df_pred):
     """
     Insere as previsões na tabela indicadores_vendas_produtos_previsoes com logs detalhados para depuração.
     """
     try:
-        # Garantir que 'CodigoProduto' contenha o valor original
-        df_pred = df_pred.copy()
+        # Garantir que 'CodigoProduto' contenha o valor original (cópia arredondada à escala da tabela)
+        df_pred = round_predictions(df_pred)
         
-        # Verificar e logar o conteúdo e tipos do DataFrame antes da inserção
-        logger.debug(f"DataFrame a ser inserido (primeiras 5 linhas):\n{df_pred.head()}")
-        logger.debug(f"Tipos de dados no DataFrame:\n{df_pred.dtypes}")
+        # Verificar e logar o conteúdo e tipos do DataFrame antes da inserção (só com DEBUG ativo)
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            logger.debug("DataFrame a ser inserido (primeiras 5 linhas):\n%s", df_pred.head())
+            logger.debug("Tipos de dados no DataFrame:\n%s", df_pred.dtypes)
 
         # Verificar se a coluna 'DATA' está no formato correto
         if not pd.api.types.is_datetime64_any_dtype(df_pred['DATA']):
             logger.debug("Coluna 'DATA' não está no formato datetime, convertendo para o formato correto.")
             df_pred['DATA'] = pd.to_datetime(df_pred['DATA'], errors='coerce')
-            logger.debug(f"Após conversão, tipos de dados:\n{df_pred.dtypes}")
+            logger.debug("Após conversão, tipos de dados:\n%s", df_pred.dtypes)
 
         # Verificar se há valores nulos na coluna 'DATA'
         if df_pred['DATA'].isnull().any():
             logger.error("Existem valores nulos ou inválidos na coluna 'DATA' após a conversão.")
-            logger.debug(df_pred[df_pred['DATA'].isnull()])
+            if debug_enabled:
+                logger.debug("%s", df_pred[df_pred['DATA'].isnull()])
             return
 
         # Converter DataFrame para lista de dicionários para inserção
         values = df_pred.to_dict(orient='records')
-        logger.debug(f"Registros prontos para inserção (primeiros 5 registros): {values[:5]}")
+        logger.debug("Registros prontos para inserção (primeiros 5 registros): %s", values[:5])
 
         # Verificar se há registros para inserir
         if not values:
             logger.warning("Não há registros disponíveis para inserção.")
             return
         
+        insert_query = build_upsert_query()
+        logger.debug("Query: %s", insert_query)
+
+        # Mensagens por registro são amostradas para não dominar o I/O do laço de gravação
+        sampled = SampledLogger(logger, every=RECORD_LOG_SAMPLE_EVERY)
+        sampled_errors = SampledLogger(logger, every=RECORD_LOG_SAMPLE_EVERY)
+        errors = 0
+
         for idx, record in enumerate(values):
             try:
-                logger.debug(f"Tentando inserir registro {idx + 1}/{len(values)}: {record}")
-                insert_query = """
-                INSERT INTO indicadores_vendas_produtos_previsoes (DATA, CodigoProduto, TotalUNVendidas, ValorTotalVendido, Promocao)
-                VALUES (:DATA, :CodigoProduto, :TotalUNVendidas, :ValorTotalVendido, :Promocao)
-                ON DUPLICATE KEY UPDATE
-                    TotalUNVendidas = VALUES(TotalUNVendidas),
-                    ValorTotalVendido = VALUES(ValorTotalVendido),
-                    Promocao = VALUES(Promocao)
-                """
-                # Log da query que está sendo executada e os parâmetros
-                logger.debug(f"Query: {insert_query}")
-                logger.debug(f"Parâmetros: {record}")
-                
                 # Executa a query com o registro específico e captura a resposta
                 response = db_manager.execute_query(insert_query, params=record)
-                logger.debug(f"Resposta do banco de dados para o registro {idx + 1}: {response}")
-                
-                logger.debug(f"Registro {idx + 1} inserido com sucesso: {record}")
+                sampled.debug("Registro %d/%d inserido: %s (resposta: %s)", idx + 1, len(values), record, response)
             except Exception as e:
-                logger.error(f"Erro ao inserir registro {idx + 1} ({record}): {e}")
+                errors += 1
+                sampled_errors.error("Erro ao inserir registro %d (%s): %s", idx + 1, record, e)
                 continue  # Continuar tentando com outros registros em caso de erro
 
-        logger.info("Previsões inseridas com sucesso.")
+        if errors:
+            logger.error("%d de %d registros falharam na inserção.", errors, len(values))
+        logger.info("Previsões inseridas com sucesso (%d registros).", len(values) - errors)
     except Exception as e:
         logger.error(f"Erro ao inserir previsões: {e}")
+
+def _row_hashes(df: pd.DataFrame) -> pd.Series:
+    """
+    Hash de cada linha (produto/dia) sobre as colunas de valor, na escala de PREDICTION_DECIMALS.
+    """
+    values = df[PREDICTION_VALUES].astype(float).round(PREDICTION_DECIMALS).fillna(0)
+    return pd.util.hash_pandas_object(values, index=False)
+
+def _normalize_keys(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df['DATA'] = pd.to_datetime(df['DATA'], errors='coerce')
+    df['CodigoProduto'] = df['CodigoProduto'].astype('int64')
+    return df
+
+def load_stored_predictions(connection, produtos=None) -> pd.DataFrame:
+    """
+    Lê as previsões gravadas (todas, ou só as dos produtos informados, em blocos de produtos).
+    """
+    query = f"SELECT {', '.join(PREDICTION_KEY + PREDICTION_VALUES)} FROM indicadores_vendas_produtos_previsoes"
+    if produtos is None:
+        return pd.read_sql(text(query), connection)
+
+    statement = text(query + " WHERE CodigoProduto IN :produtos").bindparams(bindparam('produtos', expanding=True))
+    produtos = [int(p) for p in produtos]
+    frames = [
+        pd.read_sql(statement, connection, params={'produtos': produtos[i:i + SYNC_READ_PRODUCTS]})
+        for i in range(0, len(produtos), SYNC_READ_PRODUCTS)
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=PREDICTION_KEY + PREDICTION_VALUES)
+
+def diff_predictions(df_new: pd.DataFrame, df_stored: pd.DataFrame):
+    """
+    Compara as previsões novas com as gravadas pela chave (DATA, CodigoProduto) e pelo hash das linhas.
+
+    Returns:
+        tuple: (linhas novas ou alteradas a gravar, chaves a remover).
+    """
+    new = _normalize_keys(df_new[PREDICTION_KEY + PREDICTION_VALUES])
+    new['_hash'] = _row_hashes(new).to_numpy()
+    stored = _normalize_keys(df_stored[PREDICTION_KEY + PREDICTION_VALUES])
+    stored['_hash'] = _row_hashes(stored).to_numpy()
+
+    merged = new.merge(stored[PREDICTION_KEY + ['_hash']], on=PREDICTION_KEY, how='outer',
+                       suffixes=('', '_gravado'), indicator=True)
+    changed = (merged['_merge'] == 'left_only') | (
+        (merged['_merge'] == 'both') & (merged['_hash'] != merged['_hash_gravado'])
+    )
+    upserts = merged.loc[changed, PREDICTION_KEY + PREDICTION_VALUES]
+    deletes = merged.loc[merged['_merge'] == 'right_only', PREDICTION_KEY]
+    return upserts, deletes
+
+def _execute_batches(connection, query, df: pd.DataFrame):
+    records = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+    for record in records:
+        record['DATA'] = record['DATA'].to_pydatetime()  # datetime nativo para o driver do banco
+    for i in range(0, len(records), SYNC_BATCH_SIZE):
+        connection.execute(text(query), records[i:i + SYNC_BATCH_SIZE])
+
+def sync_predictions(df_pred, scope='produtos'):
+    """
+    Grava na tabela de previsões apenas a diferença em relação ao que já está armazenado:
+    linhas novas ou alteradas (upsert) e linhas que deixaram de existir (delete), em lotes.
+
+    Substitui o ciclo `clear_predictions_table` + regravação completa: as previsões que não
+    mudaram entre as execuções não são reescritas.
+
+    Args:
+        df_pred (pd.DataFrame): Previsões com DATA, CodigoProduto, TotalUNVendidas, ValorTotalVendido e Promocao.
+        scope (str): 'produtos' remove apenas linhas antigas dos produtos presentes em `df_pred`;
+            'horizonte' restringe essa remoção às datas entre a primeira e a última de `df_pred`;
+            'tabela' espelha `df_pred` na tabela inteira (como o TRUNCATE seguido de inserção).
+
+    Returns:
+        dict: Contagem de linhas inseridas, alteradas, removidas e inalteradas.
+    """
+    if scope not in ('produtos', 'horizonte', 'tabela'):
+        raise ValueError(f"Escopo de sincronização desconhecido: {scope}")
+
+    # Arredondar antes do hash e da gravação: o valor comparado é o mesmo que fica na tabela
+    df_pred = round_predictions(_normalize_keys(df_pred))
+    if df_pred['DATA'].isnull().any():
+        logger.error("Existem valores nulos ou inválidos na coluna 'DATA'; sincronização cancelada.")
+        return None
+    df_pred = df_pred.drop_duplicates(subset=PREDICTION_KEY, keep='last')
+
+    produtos = None if scope == 'tabela' else df_pred['CodigoProduto'].unique().tolist()
+    with db_manager.engine.begin() as connection:
+        stored = load_stored_predictions(connection, produtos)
+        if scope == 'horizonte':
+            stored = stored[pd.to_datetime(stored['DATA']).between(df_pred['DATA'].min(), df_pred['DATA'].max())]
+        upserts, deletes = diff_predictions(df_pred, stored)
+
+        if not deletes.empty:
+            _execute_batches(
+                connection,
+                "DELETE FROM indicadores_vendas_produtos_previsoes WHERE DATA = :DATA AND CodigoProduto = :CodigoProduto",
+                deletes,
+            )
+        if not upserts.empty:
+            _execute_batches(connection, build_upsert_query(), upserts)
+
+    stored_keys = pd.MultiIndex.from_frame(_normalize_keys(stored[PREDICTION_KEY]))
+    inserted = int((~pd.MultiIndex.from_frame(upserts[PREDICTION_KEY]).isin(stored_keys)).sum())
+    summary = {
+        'inseridas': inserted,
+        'alteradas': len(upserts) - inserted,
+        'removidas': len(deletes),
+        'inalteradas': len(df_pred) - len(upserts),
+    }
+    logger.info(
+        f"Previsões sincronizadas: {summary['inseridas']} inseridas, {summary['alteradas']} alteradas, "
+        f"{summary['removidas']} removidas, {summary['inalteradas']} inalteradas."
+    )
+    return summary
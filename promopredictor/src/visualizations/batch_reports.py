@@ -0,0 +1,187 @@
+# Este módulo gera os relatórios de todos os produtos de uma vez: métricas (MAE/MAPE)
+# calculadas em uma única passada vetorizada, um painel-resumo único e, opcionalmente,
+# os gráficos por produto renderizados em paralelo.
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Backend não interativo: relatórios rodam sem display, inclusive em workers
+import matplotlib.pyplot as plt
+from pathlib import Path
+from src.utils.logging_config import get_logger
+from src.visualizations.generate_reports import generate_reports
+from src.visualizations.generate_reports_unit_price import generate_reports_unit_price
+
+logger = get_logger(__name__)
+
+BASE_DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+# Produtos com maior MAPE exibidos no gráfico do painel
+DASHBOARD_TOP_N = 30
+
+# (tipo, arquivo de predições, coluna real, coluna prevista)
+PREDICTION_SOURCES = [
+    ('quantity', "produto_{}_quantity_predictions.csv", 'Quantidade', 'Predicted_Quantidade'),
+    ('price', "produto_{}_unit_price_predictions.csv", 'ValorUnitarioMedio', 'Predicted_ValorUnitario'),
+]
+
+def _read_predictions(produtos, file_pattern, real_col, pred_col):
+    """
+    Lê as predições de vários produtos e empilha em um único DataFrame (CodigoProduto, real, previsto).
+    """
+    frames = []
+    for produto in produtos:
+        file_path = BASE_DATA_DIR / "predictions" / file_pattern.format(produto)
+        try:
+            df = pd.read_csv(file_path, usecols=lambda c: c in (real_col, pred_col))
+        except FileNotFoundError:
+            logger.warning(f"Arquivo de predições não encontrado: {file_path}")
+            continue
+        if real_col not in df.columns or pred_col not in df.columns:
+            logger.warning(f"Colunas {real_col}/{pred_col} ausentes em {file_path}.")
+            continue
+        df['CodigoProduto'] = int(produto)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=['CodigoProduto', real_col, pred_col])
+    return pd.concat(frames, ignore_index=True)
+
+def compute_metrics(produtos):
+    """
+    Calcula MAE e MAPE de quantidade e de valor unitário de todos os produtos em uma passada.
+
+    As fórmulas são as mesmas de generate_reports (quantidade) e generate_reports_unit_price
+    (valor unitário, com erro relativo 0 quando o valor real é 0). No MAPE de quantidade os dias
+    com quantidade real zero (comuns na granularidade diária) ficam de fora, em vez de gerar erro
+    relativo infinito, e são contados em `zeros_quantity`.
+
+    Args:
+        produtos (list): Códigos dos produtos.
+
+    Returns:
+        pd.DataFrame: Uma linha por produto com `mae_<tipo>`, `mape_<tipo>`, `linhas_<tipo>` e
+        `zeros_quantity`.
+    """
+    summary = pd.DataFrame(index=pd.Index([int(p) for p in produtos], name='CodigoProduto'))
+    for kind, file_pattern, real_col, pred_col in PREDICTION_SOURCES:
+        df = _read_predictions(produtos, file_pattern, real_col, pred_col)
+        real = df[real_col].to_numpy(dtype=np.float64)
+        abs_error = np.abs(real - df[pred_col].to_numpy(dtype=np.float64))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if kind == 'price':
+                rel_error = np.where(real == 0, 0, abs_error / real * 100)
+            else:
+                rel_error = np.where(real == 0, np.nan, np.abs(abs_error / real) * 100)
+
+        grouped = pd.DataFrame({
+            'CodigoProduto': df['CodigoProduto'].to_numpy(),
+            'abs_error': abs_error,
+            'rel_error': rel_error,
+            'zero_real': real == 0,
+        }).groupby('CodigoProduto')
+        summary[f'mae_{kind}'] = grouped['abs_error'].mean()
+        summary[f'mape_{kind}'] = grouped['rel_error'].mean()
+        summary[f'linhas_{kind}'] = grouped.size()
+        if kind == 'quantity':
+            summary['zeros_quantity'] = grouped['zero_real'].sum()
+    return summary.reset_index()
+
+def write_dashboard(summary: pd.DataFrame, reports_dir: Path = None):
+    """
+    Salva o resumo das métricas em CSV, uma tabela HTML e um único gráfico com os piores produtos.
+
+    Returns:
+        Path: Caminho do painel HTML.
+    """
+    reports_dir = Path(reports_dir or BASE_DATA_DIR / "reports")
+    reports_dir.mkdir(parents=True, exist_ok=True)
+
+    summary = summary.sort_values('mape_quantity', ascending=False, na_position='last')
+    summary.to_csv(reports_dir / "metrics_summary.csv", index=False)
+
+    chart_path = reports_dir / "metrics_summary.png"
+    top = summary.head(DASHBOARD_TOP_N).replace([np.inf, -np.inf], np.nan)
+    fig, axes = plt.subplots(1, 2, figsize=(16, max(4, 0.3 * len(top))))
+    for ax, kind, title in zip(axes, ['quantity', 'price'], ['Quantidade', 'Valor Unitário']):
+        ax.barh(top['CodigoProduto'].astype(str), top[f'mape_{kind}'].fillna(0))
+        ax.invert_yaxis()
+        ax.set_title(f'MAPE (%) - {title}')
+        ax.grid(True, axis='x')
+    fig.suptitle(f'Produtos com maior MAPE de quantidade (top {len(top)} de {len(summary)})')
+    fig.tight_layout()
+    fig.savefig(chart_path)
+    plt.close(fig)
+
+    html_path = reports_dir / "metrics_summary.html"
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(
+            "<html><head><meta charset='utf-8'><title>Resumo de métricas</title></head><body>"
+            f"<h1>Resumo de métricas ({len(summary)} produtos)</h1>"
+            f"<img src='{chart_path.name}'>"
+            + summary.to_html(index=False, float_format=lambda v: f"{v:.4f}", na_rep='-')
+            + "</body></html>"
+        )
+    logger.info(f"Painel de métricas salvo em {html_path}.")
+    return html_path
+
+def _render_product(produto):
+    """
+    Renderiza os dois gráficos de um produto (executado em um processo do pool).
+    """
+    generate_reports(produto, plot=True)
+    generate_reports_unit_price(produto, plot=True)
+    return produto
+
+def render_charts_parallel(produtos, max_workers=None):
+    """
+    Renderiza os gráficos por produto em um pool de processos.
+
+    Args:
+        produtos (list): Códigos dos produtos.
+        max_workers (int, optional): Número de processos. Padrão: número de CPUs.
+
+    Returns:
+        list: Produtos cujos gráficos falharam.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    failed = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_render_product, produto): produto for produto in produtos}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Erro ao gerar gráficos do produto {futures[future]}: {e}")
+                failed.append(futures[future])
+    logger.info(f"Gráficos de {len(produtos) - len(failed)} produtos gerados com {max_workers} processos.")
+    return failed
+
+def generate_all_reports(produtos, metrics_only=True, max_workers=None):
+    """
+    Gera os relatórios de todos os produtos: métricas vetorizadas, painel-resumo e, fora do
+    modo somente-métricas, os gráficos por produto em paralelo.
+
+    Args:
+        produtos (list): Códigos dos produtos.
+        metrics_only (bool): Não gera os gráficos por produto.
+        max_workers (int, optional): Processos usados na renderização dos gráficos.
+
+    Returns:
+        dict: {produto: {'quantity': {'mae', 'mape'}, 'price': {'mae', 'mape'}}}.
+    """
+    summary = compute_metrics(produtos)
+    write_dashboard(summary)
+
+    if not metrics_only:
+        render_charts_parallel(produtos, max_workers=max_workers)
+
+    metrics = {}
+    for row in summary.itertuples(index=False):
+        metrics[row.CodigoProduto] = {
+            kind: {'mae': getattr(row, f'mae_{kind}'), 'mape': getattr(row, f'mape_{kind}')}
+            for kind, *_ in PREDICTION_SOURCES
+            if getattr(row, f'linhas_{kind}') > 0
+        }
+    return metrics
@@ -1,4 +1,6 @@
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Backend não interativo: relatórios rodam sem display, inclusive em workers
 import matplotlib.pyplot as plt
 from pathlib import Path
 from src.utils.logging_config import get_logger
@@ -7,14 +9,18 @@ logger = get_logger(__name__)
 
 BASE_DATA_DIR = Path(__file__).parent.parent.parent / "data"
 
-def generate_reports(produto_id):
+def generate_reports(produto_id, plot=True):
     """
     Gera gráficos comparando valores reais e previstos e salva como imagens.
 
     Args:
         produto_id (int): Código do produto.
+        plot (bool): Salva o gráfico PNG; com False apenas calcula as métricas.
+
+    Returns:
+        dict: MAE e MAPE das predições, ou None se não for possível calculá-los.
     """
-    file_path = BASE_DATA_DIR / "predictions" / f"produto_{produto_id}_predictions.csv"
+    file_path = BASE_DATA_DIR / "predictions" / f"produto_{produto_id}_quantity_predictions.csv"
     logger.info(f"Lendo dados de predições de {file_path}.")
     
     try:
@@ -42,6 +48,9 @@ def generate_reports(produto_id):
     logger.info(f"- MAE (Mean Absolute Error): {mae:.4f}")
     logger.info(f"- MAPE (Mean Absolute Percentage Error): {mape:.2f}%")
 
+    if not plot:
+        return {'mae': mae, 'mape': mape}
+
     # Criar o diretório para salvar os relatórios, se necessário
     reports_dir = BASE_DATA_DIR / "reports"
     reports_dir.mkdir(parents=True, exist_ok=True)
@@ -64,5 +73,7 @@ def generate_reports(produto_id):
     # Fechar a figura para evitar consumo excessivo de memória em execuções repetidas
     plt.close()
 
+    return {'mae': mae, 'mape': mape}
+
 if __name__ == "__main__":
     generate_reports()
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Backend não interativo: relatórios rodam sem display, inclusive em workers
 import matplotlib.pyplot as plt
 from pathlib import Path
 from src.utils.logging_config import get_logger
@@ -8,12 +10,16 @@ logger = get_logger(__name__)
 
 BASE_DATA_DIR = Path(__file__).parent.parent.parent / "data"
 
-def generate_reports_unit_price(produto_id):
+def generate_reports_unit_price(produto_id, plot=True):
     """
     Gera relatório de ValorUnitarioMedio vs Predicted_ValorUnitario para um produto específico.
 
     Args:
         produto_id (int): Código do produto.
+        plot (bool): Salva o gráfico PNG; com False apenas calcula as métricas.
+
+    Returns:
+        dict: MAE e MAPE das predições, ou None se não for possível calculá-los.
     """
 
     file_path = BASE_DATA_DIR / "predictions" / f"produto_{produto_id}_unit_price_predictions.csv"
@@ -54,6 +60,9 @@ def generate_reports_unit_price(produto_id):
     logger.info(f"MAE (ValorUnitario): {mae:.4f}")
     logger.info(f"MAPE (ValorUnitario): {mape:.2f}%")
 
+    if not plot:
+        return {'mae': mae, 'mape': mape}
+
     # Plotar
     plt.figure(figsize=(12, 6))
     plt.plot(df['Data'], df['ValorUnitarioMedio'], label='Real', marker='o')
@@ -67,6 +76,7 @@ def generate_reports_unit_price(produto_id):
     plt.close()
 
     logger.info(f"Relatório de valor unitário salvo em {output_path}")
+    return {'mae': mae, 'mape': mape}
 
 if __name__ == "__main__":
     generate_reports_unit_price()
@@ -0,0 +1,43 @@
+# Testes de equivalência entre o motor Polars e o pré-processamento pandas: os dois motores
+# devem gerar os mesmos datasets de quantidade e de preço a partir do mesmo CSV bruto.
+
+import pytest
+
+pl = pytest.importorskip('polars')
+
+import pandas as pd
+from src.data_processing import polars_engine
+from src.data_processing.unified_pipeline import build_datasets
+
+# Extrato bruto de um produto no formato de `extract_raw_data`, com os casos que a limpeza trata:
+# venda anterior a 2019, 'Hora' como timedelta textual, linha sem hora, venda e item cancelados,
+# devolução, quantidade zero, valores ausentes e dias sem venda entre as vendas
+RAW_CSV = """\
+CodigoVenda,Data,Hora,Status,VendaCancelada,TotalPedido,DescontoGeral,AcrescimoGeral,TotalCusto,CodigoProduto,Quantidade,ValorUnitario,ValorTotal,Desconto,Acrescimo,ItemCancelado,QuantDevolvida,PrecoemPromocao,CodigoSecao,ValorCusto
+1,2018-12-30,0 days 10:00:00,f,0,20.0,0.0,0.0,10.0,1,2,10.0,20.0,0.0,0.0,0,0,0,3,5.0
+2,2023-01-02,0 days 08:15:00,f,0,30.0,0.0,0.0,15.0,1,3,10.0,30.0,0.0,0.0,0,0,0,3,5.0
+3,2023-01-02,0 days 08:40:00,f,0,10.0,1.5,0.0,5.0,1,1,10.0,10.0,0.5,0.0,0,0,0,3,5.0
+4,2023-01-02,0 days 17:05:00,x,1,12.0,0.0,0.0,5.5,1,1,12.0,12.0,0.0,0.0,1,0,1,3,
+5,2023-01-03,0 days 09:30:00,f,0,50.0,0.0,2.0,25.0,1,5,10.0,50.0,0.0,1.0,0,1,0,3,5.0
+6,2023-01-05,0 days 11:00:00,f,0,0.0,0.0,0.0,0.0,1,0,10.0,0.0,0.0,0.0,0,0,0,3,5.0
+7,2023-01-05,0 days 11:20:00,f,0,36.0,,0.0,15.0,1,4,9.0,36.0,0.0,0.0,0,0,1,3,5.5
+8,2023-01-06,,f,0,9.0,0.0,0.0,5.0,1,1,9.0,9.0,0.0,0.0,0,0,0,3,5.5
+9,2023-01-09,0 days 19:45:00,f,0,18.0,0.0,0.0,11.0,1,2,9.0,18.0,0.0,0.0,0,0,0,3,5.5
+"""
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    path = tmp_path / "raw_produto_1.csv"
+    path.write_text(RAW_CSV, encoding='utf-8')
+    return path
+
+@pytest.mark.parametrize('granularity', ['sale', 'day', 'hour'])
+def test_polars_engine_matches_pandas(raw_csv, granularity):
+    expected = build_datasets(pd.read_csv(raw_csv), granularity)
+    actual = polars_engine.build_datasets(raw_csv, granularity)
+
+    for left, right in zip(expected, actual):
+        pd.testing.assert_frame_equal(
+            left.reset_index(drop=True), right.reset_index(drop=True),
+            check_dtype=False, check_exact=False, rtol=1e-9
+        )